@@ -0,0 +1,36 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job, OutgoingEmail
+
+
+def requeue(modeladmin, request, queryset):
+    queryset.update(
+        status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+        locked_until=None, locked_by='',
+    )
+
+
+requeue.short_description = 'Вернуть в очередь'
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'priority', 'attempts', 'run_at', 'created'
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = (
+        'name', 'payload', 'attempts', 'locked_until', 'locked_by',
+        'last_error', 'created',
+    )
+    actions = (requeue,)
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'status', 'attempts', 'send_at', 'created')
+    list_filter = ('status',)
+    readonly_fields = ('payload', 'attempts', 'last_error', 'created')
+
+
+admin.site.register(Job, JobAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import mail, signals  # noqa: F401
+
+        # Фоновые задачи регистрируются при импорте core.mail и модулей
+        # <app>.jobs.
+        autodiscover_modules('jobs')
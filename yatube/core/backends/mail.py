@@ -0,0 +1,21 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from core import mail
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который только ставит письма в очередь.
+
+    Запрос не ждёт почтовый сервер: письма сохраняются в OutgoingEmail,
+    а отправляет их фоновая задача через EMAIL_DELIVERY_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        try:
+            return mail.queue_messages(email_messages)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
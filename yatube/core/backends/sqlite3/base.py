@@ -0,0 +1,42 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, который умеет начинать транзакцию с BEGIN IMMEDIATE.
+
+    Обычный BEGIN откладывает захват блокировки до первой записи, и две
+    пишущие транзакции узнают о конфликте только посреди работы. С
+    BEGIN IMMEDIATE блокировка на запись берётся сразу, а ожидание
+    укладывается в busy_timeout. Режим включает core.db.run_write.
+
+    Ключ 'FOREIGN_KEYS': False в настройках базы отключает проверку
+    внешних ключей. Это нужно шардам: они хранят строки, которые
+    ссылаются на пользователей и группы из другой базы.
+    """
+
+    begin_immediate = False
+
+    @property
+    def foreign_keys(self):
+        return self.settings_dict.get('FOREIGN_KEYS', True)
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        if not self.foreign_keys:
+            conn.execute('PRAGMA foreign_keys = OFF')
+        return conn
+
+    def enable_constraint_checking(self):
+        if self.foreign_keys:
+            return super().enable_constraint_checking()
+        return True
+
+    def check_constraints(self, table_names=None):
+        if self.foreign_keys:
+            super().check_constraints(table_names)
+
+    def _start_transaction_under_autocommit(self):
+        if self.begin_immediate:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,118 @@
+import atexit
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from core import metrics
+
+buffers = []
+
+
+def replace(old, new):
+    return new
+
+
+class WriteBuffer:
+    """Изменения, накопленные в памяти процесса и записываемые пачкой.
+
+    add() только обновляет словарь под блокировкой, без обращения к БД.
+    Раз в WRITE_BUFFER_FLUSH_INTERVAL секунд (по окончании запроса, см.
+    core.signals), при накоплении WRITE_BUFFER_MAX_SIZE ключей и при
+    выходе процесса накопленное передаётся в flush_func одним вызовом.
+    Значения одного ключа сливаются функцией merge(old, new). Если
+    запись не удалась, изменения возвращаются в буфер.
+    """
+
+    def __init__(self, name, flush_func, merge=replace):
+        self.name = name
+        self.flush_func = flush_func
+        self.merge = merge
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.reset_process()
+        buffers.append(self)
+
+    def reset_process(self):
+        self.pid = os.getpid()
+        self.items = {}
+
+    def check_fork(self):
+        # Изменения родителя запишет сам родитель.
+        if os.getpid() != self.pid:
+            self.reset_process()
+
+    def add(self, key, value):
+        with self.lock:
+            self.check_fork()
+            if key in self.items:
+                value = self.merge(self.items[key], value)
+            self.items[key] = value
+            full = len(self.items) >= settings.WRITE_BUFFER_MAX_SIZE
+        if full or settings.WRITE_BUFFER_FLUSH_INTERVAL <= 0:
+            self.flush()
+
+    def get(self, key, default=None):
+        """Ещё не записанное значение ключа в этом процессе."""
+        with self.lock:
+            self.check_fork()
+            return self.items.get(key, default)
+
+    def __len__(self):
+        with self.lock:
+            self.check_fork()
+            return len(self.items)
+
+    def restore(self, items):
+        with self.lock:
+            for key, value in items.items():
+                if key in self.items:
+                    value = self.merge(value, self.items[key])
+                self.items[key] = value
+
+    def flush(self):
+        """Записывает накопленное и возвращает число записанных ключей."""
+        with self.flush_lock:
+            with self.lock:
+                self.check_fork()
+                items, self.items = self.items, {}
+                self.last_flush = time.monotonic()
+            if not items:
+                return 0
+            try:
+                self.flush_func(items)
+            except Exception:
+                self.restore(items)
+                metrics.BUFFER_FLUSHES.inc(self.name, 'error')
+                raise
+            metrics.BUFFER_FLUSHES.inc(self.name, 'ok')
+            metrics.BUFFER_FLUSH_SIZE.observe(len(items), self.name)
+            return len(items)
+
+    def maybe_flush(self):
+        elapsed = time.monotonic() - self.last_flush
+        if elapsed < settings.WRITE_BUFFER_FLUSH_INTERVAL:
+            return
+        try:
+            self.flush()
+        except Exception:
+            # Изменения остались в буфере, попробуем со следующим запросом.
+            pass
+
+
+def maybe_flush_all():
+    for buffer in buffers:
+        buffer.maybe_flush()
+
+
+def flush_all():
+    for buffer in buffers:
+        try:
+            buffer.flush()
+        except Exception:
+            pass
+
+
+atexit.register(flush_all)
@@ -0,0 +1,386 @@
+import math
+import pickle
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core.metrics import record_cache, record_recompute
+
+MISSING = object()
+
+# Защита от одновременного пересчёта ключей (get_or_compute).
+STAMPEDE_LOCK_TIMEOUT = 10
+STAMPEDE_STALE_GRACE = 60
+STAMPEDE_POLL_INTERVAL = 0.05
+
+
+class L1Store:
+    """Ограниченный LRU-кеш процесса, общий для всех потоков."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.seen_seq = None
+        self.seen_epoch = None
+        self.next_sync = 0
+        self.missing_seq = None
+        self.missing_since = 0
+        self.stats = {
+            'l1': {'hits': 0, 'misses': 0},
+            'l2': {'hits': 0, 'misses': 0},
+        }
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return MISSING
+            expires, pickled = item
+            if expires <= now:
+                del self.data[key]
+                return MISSING
+            self.data.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, expires):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.data[key] = (expires, pickled)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def evict(self, keys):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def count(self, tier, hit):
+        with self.lock:
+            self.stats[tier]['hits' if hit else 'misses'] += 1
+
+
+_l1_stores = {}
+_l1_stores_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """Кеш из двух уровней: LRU в памяти процесса (L1) и общий L2.
+
+    L2 — любой другой кеш из settings.CACHES (OPTIONS['L2_CACHE']), общий
+    для всех процессов: файловый, БД или memcached. Запись идёт в L2,
+    а ключ публикуется в журнал инвалидации — кольцевой буфер в самом L2.
+    Каждый процесс не чаще раза в SYNC_INTERVAL секунд читает журнал и
+    выбрасывает из своего L1 изменённые ключи. Если журнал потерян или
+    переполнен, L1 очищается целиком. Ячейку, которой ещё нет (номер
+    уже выдан, но запись не дошла), процесс дочитывает при следующей
+    синхронизации. Запись живёт в L1 не дольше
+    L1_TIMEOUT секунд, что ограничивает устаревание и в худшем случае.
+
+    Ключи с префиксами из OPTIONS['L2_ONLY_PREFIXES'] хранятся только
+    в L2 и не попадают в журнал. Это часто изменяемые счётчики: каждый
+    их incr занимал бы ячейку журнала, и пачка таких записей переполняла
+    бы его, очищая L1 во всех процессах.
+    """
+
+    log_prefix = '__l1inv__'
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.name = name or 'default'
+        self.l2_alias = options['L2_CACHE']
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.sync_interval = options.get('SYNC_INTERVAL', 0.5)
+        self.log_size = options.get('LOG_SIZE', 256)
+        self.l2_only_prefixes = tuple(options.get('L2_ONLY_PREFIXES', ()))
+        with _l1_stores_lock:
+            self.l1 = _l1_stores.setdefault(
+                self.name, L1Store(options.get('L1_MAX_ENTRIES', 1000))
+            )
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    # Журнал инвалидации
+
+    def seq_key(self):
+        return f'{self.log_prefix}:{self.name}:seq'
+
+    def epoch_key(self):
+        return f'{self.log_prefix}:{self.name}:epoch'
+
+    def slot_key(self, seq):
+        return f'{self.log_prefix}:{self.name}:{seq % self.log_size}'
+
+    def publish(self, keys):
+        if not keys:
+            return
+        self.l1.evict(keys)
+        l2 = self.l2
+        try:
+            seq = l2.incr(self.seq_key())
+        except ValueError:
+            l2.add(self.seq_key(), 0, timeout=None)
+            seq = l2.incr(self.seq_key())
+        l2.set(self.slot_key(seq), (seq, list(keys)), timeout=None)
+
+    def sync(self):
+        l1 = self.l1
+        now = time.monotonic()
+        if now < l1.next_sync:
+            return
+        l1.next_sync = now + self.sync_interval
+        l2 = self.l2
+        state = l2.get_many([self.seq_key(), self.epoch_key()])
+        seq = state.get(self.seq_key(), 0)
+        epoch = state.get(self.epoch_key())
+        seen_seq, seen_epoch = l1.seen_seq, l1.seen_epoch
+        l1.seen_seq, l1.seen_epoch = seq, epoch
+        if seen_seq is None or seq == seen_seq and epoch == seen_epoch:
+            return
+        if (epoch != seen_epoch or seq < seen_seq
+                or seq - seen_seq > self.log_size):
+            l1.clear()
+            return
+        wanted = range(seen_seq + 1, seq + 1)
+        slots = l2.get_many([self.slot_key(n) for n in wanted])
+        stale = []
+        for n in wanted:
+            entry = slots.get(self.slot_key(n))
+            if entry is None:
+                if self.slot_late(n):
+                    continue
+                # publish увеличивает seq раньше, чем пишет ячейку:
+                # запись n ещё в пути, дочитаем её в следующий раз.
+                l1.seen_seq = n - 1
+                break
+            if entry[0] != n:
+                # Ячейку уже занял номер на круг новее — журнал переполнен.
+                l1.clear()
+                return
+            stale.extend(entry[1])
+        l1.evict(stale)
+
+    def slot_late(self, seq):
+        """Ячейки seq нет дольше L1_TIMEOUT, и ждать её больше незачем.
+
+        Записи L1, которые она инвалидировала бы, положены до выдачи
+        номера и к этому времени уже истекли сами.
+        """
+        l1 = self.l1
+        now = time.monotonic()
+        if l1.missing_seq != seq:
+            l1.missing_seq, l1.missing_since = seq, now
+            return False
+        return now - l1.missing_since > self.l1_timeout
+
+    def l2_only(self, key):
+        return key.startswith(self.l2_only_prefixes)
+
+    def l1_expires(self, timeout):
+        expires = time.time() + self.l1_timeout
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            expires = min(expires, backend_timeout)
+        return expires
+
+    def record(self, tier, hit):
+        self.l1.count(tier, hit)
+        record_cache(f'{self.name}:{tier}', hit)
+
+    # API кеша Django
+
+    def get(self, key, default=None, version=None):
+        if self.l2_only(key):
+            return self.l2.get(key, default, version)
+        self.sync()
+        l1_key = self.make_key(key, version)
+        value = self.l1.get(l1_key)
+        self.record('l1', value is not MISSING)
+        if value is not MISSING:
+            return value
+        value = self.l2.get(key, MISSING, version)
+        self.record('l2', value is not MISSING)
+        if value is MISSING:
+            return default
+        self.l1.set(l1_key, value, self.l1_expires(DEFAULT_TIMEOUT))
+        return value
+
+    def get_many(self, keys, version=None):
+        self.sync()
+        found = {}
+        missed = []
+        for key in keys:
+            if self.l2_only(key):
+                missed.append(key)
+                continue
+            value = self.l1.get(self.make_key(key, version))
+            self.record('l1', value is not MISSING)
+            if value is MISSING:
+                missed.append(key)
+            else:
+                found[key] = value
+        if missed:
+            from_l2 = self.l2.get_many(missed, version)
+            expires = self.l1_expires(DEFAULT_TIMEOUT)
+            for key in missed:
+                if self.l2_only(key):
+                    continue
+                self.record('l2', key in from_l2)
+                if key in from_l2:
+                    self.l1.set(self.make_key(key, version), from_l2[key],
+                                expires)
+            found.update(from_l2)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, self.l2_timeout(timeout), version)
+        if self.l2_only(key):
+            return
+        l1_key = self.make_key(key, version)
+        self.publish([l1_key])
+        self.l1.set(l1_key, value, self.l1_expires(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, self.l2_timeout(timeout), version)
+        if added and not self.l2_only(key):
+            self.publish([self.make_key(key, version)])
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, self.l2_timeout(timeout), version)
+        data = {
+            key: value for key, value in data.items()
+            if not self.l2_only(key)
+        }
+        self.publish([self.make_key(key, version) for key in data])
+        expires = self.l1_expires(timeout)
+        for key, value in data.items():
+            if key not in failed:
+                self.l1.set(self.make_key(key, version), value, expires)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.l2.touch(key, self.l2_timeout(timeout), version)
+        if not self.l2_only(key):
+            self.publish([self.make_key(key, version)])
+        return touched
+
+    def delete(self, key, version=None):
+        self.l2.delete(key, version)
+        if not self.l2_only(key):
+            self.publish([self.make_key(key, version)])
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(keys, version)
+        self.publish([
+            self.make_key(key, version) for key in keys
+            if not self.l2_only(key)
+        ])
+
+    def has_key(self, key, version=None):
+        if self.l2_only(key):
+            return self.l2.has_key(key, version)
+        self.sync()
+        if self.l1.get(self.make_key(key, version)) is not MISSING:
+            return True
+        return self.l2.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version)
+        if not self.l2_only(key):
+            self.publish([self.make_key(key, version)])
+        return value
+
+    def clear(self):
+        self.l2.clear()
+        self.l2.set(self.epoch_key(), uuid.uuid4().hex, timeout=None)
+        self.l1.clear()
+
+    def close(self, **kwargs):
+        # L2 закрывает сам close_caches, если поток к нему обращался.
+        # Обращение к caches здесь создало бы L2 посреди обхода caches.all().
+        pass
+
+    def l2_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def stats(self):
+        """Счётчики попаданий по уровням для этого процесса."""
+        with self.l1.lock:
+            result = {
+                tier: dict(counts) for tier, counts in self.l1.stats.items()
+            }
+            result['l1']['size'] = len(self.l1.data)
+        for counts in result.values():
+            requests = counts['hits'] + counts['misses']
+            counts['hit_ratio'] = counts['hits'] / requests if requests else 0
+        return result
+
+
+def get_or_compute(cache, key, compute, timeout, beta=1.0,
+                   lock_timeout=STAMPEDE_LOCK_TIMEOUT):
+    """Достаёт значение из кеша, пересчитывая его ровно одним процессом.
+
+    В кеше хранится конверт (значение, время пересчёта, срок годности),
+    а сама запись живёт дольше срока годности на STAMPEDE_STALE_GRACE.
+    Незадолго до истечения срока значение с некоторой вероятностью
+    пересчитывается заранее (алгоритм XFetch), поэтому ключи не истекают
+    у всех одновременно. Пересчёт выполняет только тот, кто захватил
+    блокировку; остальные в это время получают устаревшее значение,
+    а если его нет — ждут результат не дольше lock_timeout секунд.
+    """
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    if isinstance(entry, tuple) and len(entry) == 3:
+        value, delta, expires = entry
+        early = delta * beta * -math.log(1 - random.random())
+        if time.time() + early < expires:
+            return value
+        if not cache.add(lock_key, 1, lock_timeout):
+            record_recompute('stale')
+            return value
+        record_recompute('early' if time.time() < expires else 'expired')
+        return store_computed(cache, key, lock_key, compute, timeout)
+
+    if cache.add(lock_key, 1, lock_timeout):
+        record_recompute('miss')
+        return store_computed(cache, key, lock_key, compute, timeout)
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(STAMPEDE_POLL_INTERVAL)
+        entry = cache.get(key)
+        if isinstance(entry, tuple) and len(entry) == 3:
+            record_recompute('waited')
+            return entry[0]
+    record_recompute('lock_timeout')
+    return compute()
+
+
+def store_computed(cache, key, lock_key, compute, timeout):
+    try:
+        started = time.time()
+        value = compute()
+        delta = time.time() - started
+        cache.set(
+            key, (value, delta, time.time() + timeout),
+            timeout + STAMPEDE_STALE_GRACE
+        )
+        return value
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,7 @@
+from core.middleware.cache_control import is_shared_page
+
+
+def shared_page(request):
+    # На общих страницах шаблон не обращается к пользователю: личные
+    # части размечаются data-viewer и показываются скриптом viewer.js.
+    return {'shared_page': is_shared_page(request)}
@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+from django.db.models import F
+
+from core import metrics
+from core.models import Sequence
+
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+
+
+def write_lock(using):
+    # RLock: колбэки on_commit выполняются, пока блокировка ещё взята,
+    # и могут сами вызвать run_write.
+    with _write_locks_lock:
+        return _write_locks.setdefault(using, threading.RLock())
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def backoff_delay(attempt):
+    """Задержка перед повтором: экспонента с полным случайным разбросом."""
+    ceiling = min(
+        settings.DB_WRITE_MAX_BACKOFF,
+        settings.DB_WRITE_BACKOFF * 2 ** (attempt - 1),
+    )
+    return random.uniform(0, ceiling)
+
+
+def run_write(name, func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Выполняет func(*args, **kwargs) как короткую пишущую транзакцию.
+
+    Внутри процесса записи в одну базу выстраиваются в очередь на общей
+    блокировке, между процессами их разводит BEGIN IMMEDIATE. Если база
+    всё же занята, транзакция повторяется не больше DB_WRITE_ATTEMPTS
+    раз с растущей случайной паузой. Вложенный вызов внутри уже открытой
+    транзакции выполняется как обычный atomic без повторов: откатить
+    и повторить можно только транзакцию целиком.
+    """
+    connection = connections[using]
+    if connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            return func(*args, **kwargs)
+
+    attempts = settings.DB_WRITE_ATTEMPTS
+    lock = write_lock(using)
+    started = time.perf_counter()
+    for attempt in range(1, attempts + 1):
+        waited = time.perf_counter()
+        with lock:
+            metrics.DB_WRITE_QUEUE_WAIT.observe(
+                time.perf_counter() - waited, name
+            )
+            try:
+                connection.begin_immediate = True
+                with transaction.atomic(using=using):
+                    connection.begin_immediate = False
+                    result = func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_lock_error(error):
+                    raise
+                if attempt == attempts:
+                    metrics.DB_WRITES.inc(name, 'failed')
+                    raise
+                metrics.DB_WRITES.inc(name, 'retry')
+            else:
+                metrics.DB_WRITES.inc(name, 'ok')
+                metrics.DB_WRITE_DURATION.observe(
+                    time.perf_counter() - started, name
+                )
+                return result
+            finally:
+                connection.begin_immediate = False
+        time.sleep(backoff_delay(attempt))
+
+
+def next_value(name, using=DEFAULT_DB_ALIAS):
+    """Возвращает следующее значение счётчика name."""
+    def bump():
+        sequences = Sequence.objects.using(using).filter(name=name)
+        if not sequences.update(value=F('value') + 1):
+            Sequence.objects.using(using).create(name=name, value=1)
+        return sequences.values_list('value', flat=True).get()
+
+    return run_write('sequence', bump, using=using)
@@ -0,0 +1,65 @@
+import threading
+
+_state = threading.local()
+
+
+class IdentityMap:
+    """Объекты моделей, уже загруженные в рамках одного запроса.
+
+    Один и тот же объект (например, автор поста) внутри запроса
+    загружается из БД один раз, а все ссылки на него указывают на один
+    экземпляр Python.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.lookups = {}
+
+    def get(self, model, pk):
+        return self.objects.get((model._meta.label, pk))
+
+    def add(self, obj):
+        key = (obj._meta.label, obj.pk)
+        return self.objects.setdefault(key, obj)
+
+    def get_by(self, model, field, value):
+        pk = self.lookups.get((model._meta.label, field, value))
+        return None if pk is None else self.get(model, pk)
+
+    def add_by(self, obj, field):
+        obj = self.add(obj)
+        self.lookups[(obj._meta.label, field, getattr(obj, field))] = obj.pk
+        return obj
+
+
+class NullIdentityMap(IdentityMap):
+    """Заглушка вне запроса: ничего не запоминает."""
+
+    def add(self, obj):
+        return obj
+
+    def add_by(self, obj, field):
+        return obj
+
+
+def activate():
+    _state.identity_map = IdentityMap()
+
+
+def deactivate():
+    _state.identity_map = None
+
+
+def current():
+    return getattr(_state, 'identity_map', None) or NullIdentityMap()
+
+
+def share_related(objects, *fields):
+    """Подменяет связанные объекты на экземпляры из identity map."""
+    identity_map = current()
+    for obj in objects:
+        for field in fields:
+            related = getattr(obj, field)
+            if related is not None:
+                setattr(obj, field, identity_map.add(related))
+    return objects
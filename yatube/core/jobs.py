@@ -0,0 +1,181 @@
+import datetime as dt
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core import metrics
+from core.db import run_write
+from core.models import Job
+
+registry = {}
+
+
+def job(name, priority=0, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу с именем name.
+
+    Аргументы задачи хранятся в JSON, поэтому передавать нужно id
+    объектов, а не сами объекты. Задача может выполниться повторно
+    (после ошибки или истёкшей аренды) и должна это переносить.
+    """
+    def decorator(func):
+        registry[name] = {
+            'func': func,
+            'priority': priority,
+            'max_attempts': max_attempts or settings.JOB_MAX_ATTEMPTS,
+        }
+        func.delay = lambda *args, **kwargs: enqueue(name, *args, **kwargs)
+        return func
+    return decorator
+
+
+def enqueue(name, *args, **kwargs):
+    """Ставит задачу name в очередь и возвращает Job.
+
+    При JOB_QUEUE_EAGER задача выполняется сразу, а не в очереди.
+    """
+    return schedule(name, timezone.now(), *args, **kwargs)
+
+
+def schedule(name, run_at, *args, **kwargs):
+    """Ставит задачу name в очередь на время run_at."""
+    options = registry[name]
+    if settings.JOB_QUEUE_EAGER and run_at <= timezone.now():
+        options['func'](*args, **kwargs)
+        return None
+    job = Job(
+        name=name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        priority=options['priority'],
+        max_attempts=options['max_attempts'],
+        run_at=run_at,
+    )
+    run_write('job_enqueue', job.save)
+    return job
+
+
+def is_queued(name, before=None):
+    """Есть ли задача name в очереди; с before — со сроком не позже него."""
+    queued = Job.objects.filter(name=name, status=Job.QUEUED)
+    if before is not None:
+        queued = queued.filter(run_at__lte=before)
+    return queued.exists()
+
+
+def retry_delay(attempts):
+    return min(
+        settings.JOB_MAX_RETRY_DELAY,
+        settings.JOB_RETRY_DELAY * 2 ** (attempts - 1),
+    )
+
+
+def available(now):
+    # Задача с истёкшей арендой осталась от упавшего исполнителя.
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(
+        status=Job.RUNNING, locked_until__lt=now
+    )
+
+
+def claim(worker_id):
+    """Берёт в аренду самую приоритетную готовую задачу или None."""
+    def take():
+        now = timezone.now()
+        pk = Job.objects.filter(available(now)).order_by(
+            '-priority', 'run_at', 'pk'
+        ).values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        Job.objects.filter(pk=pk).update(
+            status=Job.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + dt.timedelta(
+                seconds=settings.JOB_LEASE_SECONDS
+            ),
+            attempts=F('attempts') + 1,
+        )
+        return Job.objects.get(pk=pk)
+
+    return run_write('job_claim', take)
+
+
+def execute(job):
+    started = time.perf_counter()
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Аренда истекла на последней попытке.')
+        payload = json.loads(job.payload)
+        registry[job.name]['func'](*payload['args'], **payload['kwargs'])
+    except Exception:
+        result = fail(job, traceback.format_exc())
+    else:
+        run_write(
+            'job_done',
+            Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete,
+        )
+        result = 'ok'
+    metrics.JOBS.inc(job.name, result)
+    metrics.JOB_DURATION.observe(time.perf_counter() - started, job.name)
+    return result
+
+
+def fail(job, error):
+    if job.attempts < job.max_attempts:
+        changes = {
+            'status': Job.QUEUED,
+            'run_at': timezone.now() + dt.timedelta(
+                seconds=retry_delay(job.attempts)
+            ),
+        }
+        result = 'retry'
+    else:
+        changes = {'status': Job.DEAD}
+        result = 'dead'
+    run_write(
+        'job_failed',
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update,
+        locked_until=None, last_error=error, **changes,
+    )
+    return result
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def run_pending(stop=None, once=True, poll_interval=None):
+    """Выполняет готовые задачи, пока не выставлен stop.
+
+    С once=True возвращается, когда готовых задач не осталось. Возвращает
+    количество взятых задач.
+    """
+    if stop is None:
+        stop = threading.Event()
+    if poll_interval is None:
+        poll_interval = settings.JOB_POLL_INTERVAL
+    ident = worker_id()
+    done = 0
+    while not stop.is_set():
+        job = claim(ident)
+        if job is not None:
+            execute(job)
+            done += 1
+        elif once:
+            break
+        else:
+            stop.wait(poll_interval)
+    return done
+
+
+def work(stop, once=False, poll_interval=None):
+    """Цикл исполнителя в отдельном потоке или процессе."""
+    try:
+        run_pending(stop, once, poll_interval)
+    finally:
+        connections.close_all()
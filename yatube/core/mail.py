@@ -0,0 +1,173 @@
+import datetime as dt
+import json
+import time
+import traceback
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from core.db import run_write
+from core.jobs import enqueue, is_queued, job, retry_delay, schedule
+from core.models import OutgoingEmail
+
+SEND_JOB = 'core.send_queued_email'
+
+
+def serialize(message):
+    if message.attachments:
+        raise ValueError('Письма с вложениями очередь не поддерживает.')
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    })
+
+
+def deserialize(payload):
+    data = json.loads(payload)
+    alternatives = data.pop('alternatives')
+    message = EmailMultiAlternatives(**data)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+def queue_messages(messages):
+    """Сохраняет письма в очередь и ставит задачу отправки."""
+    now = timezone.now()
+    emails = [
+        OutgoingEmail(payload=serialize(message), send_at=now)
+        for message in messages
+    ]
+
+    def save():
+        OutgoingEmail.objects.bulk_create(emails)
+        # Одной готовой задачи достаточно: она отправит все письма. Повтор,
+        # отложенный после ошибки, новые письма ждать не должны.
+        if not is_queued(SEND_JOB, before=now):
+            enqueue(SEND_JOB)
+
+    run_write('email_enqueue', save)
+    return len(emails)
+
+
+class RateLimiter:
+    """Выдерживает паузу, чтобы не отправлять больше rate писем в секунду.
+
+    rate = 0 снимает ограничение.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = 0
+
+    def wait(self):
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+def claim_batch(size):
+    def take():
+        now = timezone.now()
+        pks = list(
+            OutgoingEmail.objects.filter(
+                Q(status=OutgoingEmail.QUEUED, send_at__lte=now)
+                | Q(status=OutgoingEmail.SENDING, locked_until__lt=now)
+            ).order_by('send_at', 'pk').values_list('pk', flat=True)[:size]
+        )
+        OutgoingEmail.objects.filter(pk__in=pks).update(
+            status=OutgoingEmail.SENDING,
+            locked_until=now + dt.timedelta(
+                seconds=settings.EMAIL_LEASE_SECONDS
+            ),
+            attempts=F('attempts') + 1,
+        )
+        return list(
+            OutgoingEmail.objects.filter(pk__in=pks).order_by('send_at', 'pk')
+        )
+
+    return run_write('email_claim', take)
+
+
+def send_batch(emails, limiter):
+    """Отправляет пачку писем через одно соединение.
+
+    Возвращает id отправленных писем и пары (письмо, ошибка).
+    """
+    sent, errors = [], []
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    try:
+        connection.open()
+    except Exception:
+        error = traceback.format_exc()
+        return sent, [(email, error) for email in emails]
+    try:
+        for email in emails:
+            limiter.wait()
+            try:
+                connection.send_messages([deserialize(email.payload)])
+            except Exception:
+                errors.append((email, traceback.format_exc()))
+            else:
+                sent.append(email.pk)
+    finally:
+        connection.close()
+    return sent, errors
+
+
+def fail(email, error):
+    changes = {'locked_until': None, 'last_error': error}
+    if email.attempts < settings.EMAIL_MAX_ATTEMPTS:
+        changes['status'] = OutgoingEmail.QUEUED
+        changes['send_at'] = timezone.now() + dt.timedelta(
+            seconds=retry_delay(email.attempts)
+        )
+    else:
+        changes['status'] = OutgoingEmail.FAILED
+    OutgoingEmail.objects.filter(pk=email.pk).update(**changes)
+
+
+def finish(sent, errors):
+    OutgoingEmail.objects.filter(pk__in=sent).delete()
+    for email, error in errors:
+        fail(email, error)
+
+
+def send_queued():
+    """Отправляет письма, срок которых подошёл, пачками по EMAIL_BATCH_SIZE.
+
+    Возвращает количество отправленных писем и писем с ошибкой.
+    """
+    limiter = RateLimiter(settings.EMAIL_RATE_LIMIT)
+    sent_total = failed_total = 0
+    while True:
+        batch = claim_batch(settings.EMAIL_BATCH_SIZE)
+        if not batch:
+            break
+        sent, errors = send_batch(batch, limiter)
+        run_write('email_sent', finish, sent, errors)
+        sent_total += len(sent)
+        failed_total += len(errors)
+
+    # Письма, отложенные до повтора, отправит задача на это время.
+    retry_at = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.QUEUED
+    ).aggregate(Min('send_at'))['send_at__min']
+    if retry_at is not None and not is_queued(SEND_JOB, before=retry_at):
+        schedule(SEND_JOB, retry_at)
+    return sent_total, failed_total
+
+
+@job(SEND_JOB, priority=5)
+def send_queued_email():
+    send_queued()
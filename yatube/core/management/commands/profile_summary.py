@@ -0,0 +1,112 @@
+import io
+import os
+import pstats
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.middleware.profiling import list_profiles
+
+MAX_DEPTH = 64
+
+
+def frame_label(func):
+    filename, lineno, name = func
+    if filename == '~':
+        label = name
+    else:
+        label = '{} ({}:{})'.format(name, os.path.basename(filename), lineno)
+    return label.replace(';', ',')
+
+
+def collapse_stats(stats, min_us=1):
+    """Восстанавливает стеки из графа вызовов cProfile.
+
+    cProfile хранит только пары «вызывающий — вызываемый», поэтому время
+    вызываемой функции делится между путями пропорционально
+    накопленному времени каждого ребра графа.
+    """
+    children = defaultdict(list)
+    roots = []
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            roots.append(func)
+        for caller, (_, _, _, edge_ct) in callers.items():
+            children[caller].append((func, edge_ct))
+
+    stacks = Counter()
+
+    def walk(func, path, share):
+        total_ct = stats[func][3]
+        ratio = share / total_ct if total_ct else 0
+        path = path + (func,)
+        own_us = int(stats[func][2] * ratio * 1e6)
+        if own_us >= min_us:
+            stacks[';'.join(frame_label(f) for f in path)] += own_us
+        if len(path) >= MAX_DEPTH:
+            return
+        for callee, edge_ct in children[func]:
+            child_share = edge_ct * ratio
+            if callee not in path and child_share * 1e6 >= min_us:
+                walk(callee, path, child_share)
+
+    for root in roots:
+        walk(root, (), stats[root][3])
+    return stacks
+
+
+class Command(BaseCommand):
+    help = (
+        'Объединяет профили медленных запросов в сводку: collapsed-стеки '
+        'для flamegraph.pl/speedscope или таблицу самых дорогих функций.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=None,
+            help='Каталог с .prof файлами (по умолчанию PROFILER_DIR).'
+        )
+        parser.add_argument(
+            '--view', default=None,
+            help='Учитывать только профили указанной view, например '
+                 'posts:index.'
+        )
+        parser.add_argument(
+            '--format', choices=('collapsed', 'top'), default='collapsed',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=30,
+            help='Количество строк для формата top.'
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help='Файл для записи результата (по умолчанию stdout).'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.PROFILER_DIR
+        profiles = list_profiles(directory)
+        if options['view']:
+            marker = '-{}-'.format(options['view'].replace(':', '-'))
+            profiles = [
+                path for path in profiles
+                if marker in os.path.basename(path)
+            ]
+        if not profiles:
+            raise CommandError(f'В каталоге {directory} нет профилей.')
+
+        output = io.StringIO()
+        stats = pstats.Stats(*profiles, stream=output)
+        if options['format'] == 'top':
+            stats.sort_stats('cumulative').print_stats(options['limit'])
+        else:
+            for stack, weight in sorted(collapse_stats(stats.stats).items()):
+                output.write(f'{stack} {weight}\n')
+
+        if options['output']:
+            with open(options['output'], 'w') as result:
+                result.write(output.getvalue())
+        else:
+            self.stdout.write(output.getvalue(), ending='')
+        self.stderr.write(f'Обработано профилей: {len(profiles)}')
@@ -0,0 +1,47 @@
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из '
+        'DATABASE_REPLICAS через online backup API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Алиасы реплик (по умолчанию все из DATABASE_REPLICAS).'
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('Реплики не настроены: DATABASE_REPLICAS пуст.')
+        source = settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+        for alias in aliases:
+            if alias not in settings.DATABASES:
+                raise CommandError(f'Неизвестная база {alias}.')
+            target = settings.DATABASES[alias]['NAME']
+            # Соединение самой реплики закрываем, чтобы оно не держало
+            # старый файл, который сейчас будет перезаписан.
+            connections[alias].close()
+            self.copy(source, target)
+            self.stdout.write(f'{alias}: {target} обновлена.')
+
+    def copy(self, source, target):
+        tmp = target + '.tmp'
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(tmp)
+        try:
+            # Копия не должна зависеть от WAL-файлов основной базы.
+            src.backup(dst)
+            dst.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp, target)
@@ -0,0 +1,73 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди пулом потоков или процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Размер пула (по умолчанию JOB_WORKERS).'
+        )
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default=None,
+            help='Потоки или процессы (по умолчанию JOB_WORKER_POOL).'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Пауза при пустой очереди в секундах.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        size = options['workers'] or settings.JOB_WORKERS
+        pool = options['pool'] or settings.JOB_WORKER_POOL
+        if pool == 'process':
+            # Дочерние процессы наследуют настроенный Django через fork,
+            # но не должны делить с родителем открытые соединения.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            spawn = context.Process
+        else:
+            stop = threading.Event()
+            spawn = threading.Thread
+        workers = [
+            spawn(
+                target=jobs.work,
+                args=(stop, options['once'], options['poll_interval']),
+                daemon=True,
+            )
+            for _ in range(size)
+        ]
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        self.stdout.write(f'Исполнителей: {size} ({pool}).')
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                # join с таймаутом, чтобы Ctrl+C прерывал ожидание.
+                while worker.is_alive():
+                    worker.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write('Исполнители остановлены.')
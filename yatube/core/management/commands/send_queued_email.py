@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core import mail
+from core.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutgoingEmail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Вернуть в очередь письма, которые не удалось отправить.'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            OutgoingEmail.objects.filter(
+                status=OutgoingEmail.FAILED
+            ).update(status=OutgoingEmail.QUEUED, attempts=0)
+        sent, failed = mail.send_queued()
+        self.stdout.write(f'Отправлено писем: {sent}, с ошибкой: {failed}.')
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = (
+    'CREATE TABLE post ('
+    'id INTEGER PRIMARY KEY, author_id INTEGER, text TEXT, pub_date REAL)'
+)
+READ_SQL = (
+    'SELECT id, author_id, text FROM post '
+    'ORDER BY pub_date DESC LIMIT 10'
+)
+WRITE_SQL = 'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)'
+
+
+class Worker(threading.Thread):
+    """Поток, который до истечения срока выполняет чтения или записи.
+
+    В режиме без постоянных соединений каждая операция открывает новое
+    соединение, как Django с CONN_MAX_AGE = 0.
+    """
+
+    def __init__(self, path, pragmas, persistent, write, deadline):
+        super().__init__(daemon=True)
+        self.path = path
+        self.pragmas = pragmas
+        self.persistent = persistent
+        self.write = write
+        self.deadline = deadline
+        self.ops = 0
+        self.errors = 0
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def operation(self, connection):
+        if self.write:
+            with connection:
+                connection.execute(
+                    WRITE_SQL, (self.ident % 100, 'x' * 200, time.time())
+                )
+        else:
+            connection.execute(READ_SQL).fetchall()
+
+    def run(self):
+        connection = self.connect() if self.persistent else None
+        while time.monotonic() < self.deadline:
+            current = connection or self.connect()
+            try:
+                self.operation(current)
+                self.ops += 1
+            except sqlite3.OperationalError:
+                self.errors += 1
+            finally:
+                if not self.persistent:
+                    current.close()
+        if connection is not None:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при одновременных '
+        'чтениях и записях: настройки по умолчанию против SQLITE_PRAGMAS '
+        'и постоянных соединений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration', type=float, default=5,
+            help='Длительность каждого прогона в секундах.'
+        )
+        parser.add_argument(
+            '--rows', type=int, default=10000,
+            help='Количество строк в таблице перед прогоном.'
+        )
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('default', {}, False),
+            ('tuned', settings.SQLITE_PRAGMAS, True),
+        )
+        results = {}
+        for name, pragmas, persistent in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.prepare(path, options['rows'])
+                results[name] = self.run(path, pragmas, persistent, options)
+            reads, writes, errors = results[name]
+            duration = options['duration']
+            self.stdout.write(
+                f'{name:8} чтений/с: {reads / duration:10.1f}  '
+                f'записей/с: {writes / duration:8.1f}  ошибок: {errors}'
+            )
+
+        base, tuned = results['default'], results['tuned']
+        total_base = base[0] + base[1]
+        if total_base:
+            speedup = (tuned[0] + tuned[1]) / total_base
+            self.stdout.write(f'Ускорение: x{speedup:.2f}')
+
+    def prepare(self, path, rows):
+        connection = sqlite3.connect(path)
+        with connection:
+            connection.execute(SCHEMA)
+            connection.execute('CREATE INDEX post_pub_date ON post (pub_date)')
+            connection.executemany(
+                WRITE_SQL,
+                ((n % 100, 'x' * 200, n) for n in range(rows))
+            )
+        connection.close()
+
+    def run(self, path, pragmas, persistent, options):
+        deadline = time.monotonic() + options['duration']
+        workers = [
+            Worker(path, pragmas, persistent, False, deadline)
+            for _ in range(options['readers'])
+        ] + [
+            Worker(path, pragmas, persistent, True, deadline)
+            for _ in range(options['writers'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        reads = sum(w.ops for w in workers if not w.write)
+        writes = sum(w.ops for w in workers if w.write)
+        errors = sum(w.errors for w in workers)
+        return reads, writes, errors
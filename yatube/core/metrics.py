@@ -0,0 +1,408 @@
+import atexit
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Значения завершившихся процессов копятся в одном файле, чтобы счётчики
+# не уменьшались после перезапуска воркеров.
+RETIRED_FILE = 'retired.json'
+LOCK_FILE = 'metrics.lock'
+PROCESS_FILE_RE = re.compile(r'^(\d+)-\d+\.json$')
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        self.registry.add(self, labelvalues, amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        self.registry.observe(self, labelvalues, value)
+
+
+class Registry:
+    """Хранилище метрик процесса.
+
+    Значения копятся в памяти процесса. Если задан METRICS_DIR, каждый
+    процесс периодически сбрасывает свои значения в собственный файл
+    каталога, а /metrics суммирует файлы всех процессов — так счётчики
+    корректно агрегируются под многопроцессным WSGI-сервером.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.values = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.reset_process()
+
+    def reset_process(self):
+        self.pid = os.getpid()
+        self.filename = f'{self.pid}-{int(time.time() * 1000)}.json'
+        self.values = {}
+
+    def check_fork(self):
+        # После fork дочерний процесс не должен повторно отдавать
+        # значения, накопленные родителем.
+        if os.getpid() != self.pid:
+            self.reset_process()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=LATENCY_BUCKETS):
+        return self.register(
+            Histogram(self, name, documentation, labelnames, buckets)
+        )
+
+    def add(self, metric, labelvalues, amount):
+        key = (metric.name, labelvalues)
+        with self.lock:
+            self.check_fork()
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, metric, labelvalues, value):
+        key = (metric.name, labelvalues)
+        index = bisect_left(metric.buckets, value)
+        with self.lock:
+            self.check_fork()
+            state = self.values.get(key)
+            if state is None:
+                # Счётчики по корзинам, корзина +Inf и сумма наблюдений.
+                state = self.values[key] = [0] * (len(metric.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            self.check_fork()
+            return {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in self.values.items()
+            }
+
+    def maybe_flush(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self.last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+        self.flush(directory)
+
+    def flush(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        write_values(
+            os.path.join(directory, self.filename), self.snapshot()
+        )
+
+    def retire(self, directory, filenames):
+        """Переносит значения из файлов процессов в RETIRED_FILE."""
+        with locked(directory, fcntl.LOCK_EX):
+            retired = os.path.join(directory, RETIRED_FILE)
+            total = read_values(retired)
+            paths = [os.path.join(directory, name) for name in filenames]
+            for path in paths:
+                for key, value in read_values(path).items():
+                    merge_value(total, key, value)
+            write_values(retired, total)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def flush_on_exit(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        self.flush(directory)
+        self.retire(directory, [self.filename])
+
+    def collect(self):
+        """Возвращает значения, просуммированные по всем процессам.
+
+        Файлы процессов, которых уже нет (воркер перезапущен или убит),
+        переносятся в RETIRED_FILE, так что каталог не растёт, а их
+        значения не теряются и не считаются дважды.
+        """
+        directory = settings.METRICS_DIR
+        if not directory:
+            return self.snapshot()
+        self.flush(directory)
+        dead = [
+            filename for filename in os.listdir(directory)
+            if not process_alive(file_pid(filename))
+        ]
+        if dead:
+            self.retire(directory, dead)
+        total = {}
+        with locked(directory, fcntl.LOCK_SH):
+            for filename in os.listdir(directory):
+                if not filename.endswith('.json'):
+                    continue
+                path = os.path.join(directory, filename)
+                for key, value in read_values(path).items():
+                    merge_value(total, key, value)
+        return total
+
+    def render(self):
+        return render_text(self.metrics, self.collect())
+
+
+def file_pid(filename):
+    match = PROCESS_FILE_RE.match(filename)
+    return int(match.group(1)) if match else None
+
+
+def process_alive(pid):
+    if pid is None:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def locked(directory, mode):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_values(path):
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    total = {}
+    for name, labelvalues, value in data:
+        merge_value(total, (name, tuple(labelvalues)), value)
+    return total
+
+
+def write_values(path, values):
+    data = [
+        [name, list(labelvalues), value]
+        for (name, labelvalues), value in values.items()
+    ]
+    with open(path + '.tmp', 'w') as file:
+        json.dump(data, file)
+    os.replace(path + '.tmp', path)
+
+
+def merge_value(total, key, value):
+    current = total.get(key)
+    if current is None:
+        total[key] = value
+    elif isinstance(current, list):
+        total[key] = [a + b for a, b in zip(current, value)]
+    else:
+        total[key] = current + value
+
+
+def format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n')
+        )
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_text(metrics, values):
+    """Формирует текстовый формат экспозиции Prometheus."""
+    by_metric = {}
+    for (name, labelvalues), value in sorted(values.items()):
+        by_metric.setdefault(name, []).append((labelvalues, value))
+
+    lines = []
+    for name, metric in sorted(metrics.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for labelvalues, value in by_metric.get(name, ()):
+            labels = format_labels(metric.labelnames, labelvalues)
+            if metric.type == 'counter':
+                lines.append(f'{name}{labels} {format_value(value)}')
+                continue
+            cumulative = 0
+            bounds = metric.buckets + (float('+inf'),)
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                le = '+Inf' if bound == float('+inf') else format_value(bound)
+                bucket_labels = format_labels(
+                    metric.labelnames, labelvalues, [('le', le)]
+                )
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{name}_sum{labels} {format_value(value[-1])}')
+            lines.append(f'{name}_count{labels} {cumulative}')
+    lines.extend(render_cache_ratio(values))
+    return '\n'.join(lines) + '\n'
+
+
+def render_cache_ratio(values):
+    totals = {}
+    for (name, labelvalues), value in values.items():
+        if name == CACHE_REQUESTS.name:
+            cache_name, result = labelvalues
+            hits, requests = totals.get(cache_name, (0, 0))
+            if result == 'hit':
+                hits += value
+            totals[cache_name] = (hits, requests + value)
+    if not totals:
+        return []
+    name = 'yatube_cache_hit_ratio'
+    lines = [
+        f'# HELP {name} Доля попаданий в кеш',
+        f'# TYPE {name} gauge',
+    ]
+    for cache_name, (hits, requests) in sorted(totals.items()):
+        labels = format_labels(('cache',), (cache_name,))
+        lines.append(f'{name}{labels} {format_value(hits / requests)}')
+    return lines
+
+
+registry = Registry()
+# Последний интервал процесса иначе потерялся бы при остановке.
+atexit.register(registry.flush_on_exit)
+
+REQUEST_LATENCY = registry.histogram(
+    'yatube_http_request_duration_seconds',
+    'Время обработки запроса по имени URL',
+    ('view',),
+)
+RESPONSE_SIZE = registry.histogram(
+    'yatube_http_response_size_bytes',
+    'Размер тела ответа по имени URL',
+    ('view',),
+    SIZE_BUCKETS,
+)
+RESPONSES = registry.counter(
+    'yatube_http_responses_total',
+    'Количество ответов по имени URL и статусу',
+    ('view', 'status'),
+)
+DB_QUERIES = registry.histogram(
+    'yatube_db_queries_per_request',
+    'Количество SQL-запросов на один HTTP-запрос',
+    ('view',),
+    QUERY_COUNT_BUCKETS,
+)
+DB_DURATION = registry.histogram(
+    'yatube_db_duration_seconds',
+    'Суммарное время SQL-запросов на один HTTP-запрос',
+    ('view',),
+)
+CACHE_REQUESTS = registry.counter(
+    'yatube_cache_requests_total',
+    'Обращения к кешу с разбивкой на попадания и промахи',
+    ('cache', 'result'),
+)
+CACHE_RECOMPUTES = registry.counter(
+    'yatube_cache_recomputes_total',
+    'Пересчёты и отдача устаревших значений в get_or_compute',
+    ('reason',),
+)
+DB_WRITES = registry.counter(
+    'yatube_db_write_attempts_total',
+    'Попытки пишущих транзакций: успех, повтор из-за блокировки, отказ',
+    ('name', 'result'),
+)
+DB_WRITE_DURATION = registry.histogram(
+    'yatube_db_write_duration_seconds',
+    'Время пишущей транзакции вместе с ожиданием и повторами',
+    ('name',),
+)
+DB_WRITE_QUEUE_WAIT = registry.histogram(
+    'yatube_db_write_queue_wait_seconds',
+    'Ожидание очереди записей внутри процесса',
+    ('name',),
+)
+JOBS = registry.counter(
+    'yatube_jobs_total',
+    'Выполнения фоновых задач: успех, повтор, перевод в DEAD',
+    ('name', 'result'),
+)
+JOB_DURATION = registry.histogram(
+    'yatube_job_duration_seconds',
+    'Время выполнения фоновой задачи',
+    ('name',),
+)
+BUFFER_FLUSHES = registry.counter(
+    'yatube_write_buffer_flushes_total',
+    'Сбросы буферов записи в БД: успех или ошибка',
+    ('buffer', 'result'),
+)
+BUFFER_FLUSH_SIZE = registry.histogram(
+    'yatube_write_buffer_flush_size',
+    'Число ключей, записанных одним сбросом буфера',
+    ('buffer',),
+    BATCH_SIZE_BUCKETS,
+)
+
+
+def record_cache(cache_name, hit):
+    CACHE_REQUESTS.inc(cache_name, 'hit' if hit else 'miss')
+
+
+def record_recompute(reason):
+    CACHE_RECOMPUTES.inc(reason)
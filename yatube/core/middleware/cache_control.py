@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+
+def is_shared_page(request):
+    """Страница из SHARED_PAGE_VIEWS: одна копия для всех пользователей."""
+    match = request.resolver_match
+    return match is not None and match.view_name in settings.SHARED_PAGE_VIEWS
+
+
+class CacheControlMiddleware:
+    """Выставляет Cache-Control по политикам из CACHE_CONTROL_POLICIES.
+
+    Политика задаётся для имени URL и применяется к успешным ответам
+    на GET и HEAD. Анонимам отдаётся публичный ответ с max-age,
+    stale-while-revalidate и stale-if-error из политики, авторизованным
+    пользователям — приватный ответ, который нужно перепроверять.
+    Страница зависит от cookie сессии, поэтому добавляется Vary: Cookie.
+    Общие страницы (SHARED_PAGE_VIEWS) от пользователя не зависят:
+    они публичны для всех и без Vary. Заголовки, выставленные самой
+    view, не меняются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        match = request.resolver_match
+        if (match is None or request.method not in ('GET', 'HEAD')
+                or response.status_code != 200
+                or response.has_header('Cache-Control')):
+            return response
+        policy = settings.CACHE_CONTROL_POLICIES.get(match.view_name)
+        if policy is None:
+            return response
+
+        if is_shared_page(request):
+            patch_cache_control(response, public=True, **policy)
+            return response
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, **policy)
+        patch_vary_headers(response, ('Cookie',))
+        return response
@@ -0,0 +1,15 @@
+from core import identity
+
+
+class IdentityMapMiddleware:
+    """Создаёт identity map на время обработки запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        identity.activate()
+        try:
+            return self.get_response(request)
+        finally:
+            identity.deactivate()
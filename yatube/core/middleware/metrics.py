@@ -0,0 +1,47 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from core import metrics
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Снимает метрики запроса: время, размер ответа, статус и SQL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        metrics.REQUEST_LATENCY.observe(elapsed, view)
+        metrics.RESPONSES.inc(view, str(response.status_code))
+        metrics.DB_QUERIES.observe(queries.count, view)
+        metrics.DB_DURATION.observe(queries.duration, view)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view)
+        metrics.registry.maybe_flush()
+        return response
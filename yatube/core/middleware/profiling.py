@@ -0,0 +1,99 @@
+import cProfile
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+
+
+class SamplingProfilerMiddleware:
+    """Профилирует выборку запросов и сохраняет профили медленных из них.
+
+    Включается настройкой PROFILER_ENABLED. Профилируются только view
+    из пространств имён PROFILER_NAMESPACES, с вероятностью
+    PROFILER_SAMPLE_RATE. Если запрос обрабатывался дольше
+    PROFILER_SLOW_MS, профиль сохраняется в PROFILER_DIR, где хранятся
+    не более PROFILER_MAX_FILES последних файлов.
+    """
+
+    # cProfile не умеет работать в нескольких потоках одновременно,
+    # поэтому одновременно профилируется не больше одного запроса.
+    _lock = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler = getattr(request, '_sampling_profiler', None)
+            if profiler is not None:
+                self.finish(request, profiler, started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Здесь профилировщик только включается: view вызывает сам
+        # обработчик Django, чтобы работали ATOMIC_REQUESTS,
+        # process_view следующих middleware и process_exception.
+        if not self.should_profile(request):
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None
+        request._sampling_profiler = profiler = cProfile.Profile()
+        profiler.enable()
+        return None
+
+    def finish(self, request, profiler, started):
+        try:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= settings.PROFILER_SLOW_MS:
+                self.save_profile(
+                    profiler, request.resolver_match.view_name, elapsed_ms
+                )
+        finally:
+            del request._sampling_profiler
+            self._lock.release()
+
+    def should_profile(self, request):
+        if not settings.PROFILER_ENABLED:
+            return False
+        namespaces = request.resolver_match.namespaces
+        if not namespaces or namespaces[0] not in settings.PROFILER_NAMESPACES:
+            return False
+        return random.random() < settings.PROFILER_SAMPLE_RATE
+
+    def save_profile(self, profiler, view_name, elapsed_ms):
+        directory = settings.PROFILER_DIR
+        os.makedirs(directory, exist_ok=True)
+        filename = '{}-{}-{}ms.prof'.format(
+            int(time.time() * 1000), view_name.replace(':', '-'),
+            int(elapsed_ms)
+        )
+        path = os.path.join(directory, filename)
+        # Пишем во временный файл, чтобы profile_summary
+        # никогда не прочитал недописанный профиль.
+        profiler.dump_stats(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        rotate_profiles(directory, settings.PROFILER_MAX_FILES)
+
+
+def list_profiles(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith('.prof')
+    )
+
+
+def rotate_profiles(directory, max_files):
+    profiles = list_profiles(directory)
+    for path in profiles[:max(len(profiles) - max_files, 0)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+
+from core import routers
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaMiddleware:
+    """Направляет чтения view из REPLICA_VIEWS на реплики.
+
+    После запроса, который что-то записал, клиент получает cookie, и
+    следующие REPLICA_PIN_SECONDS секунд все его запросы читают из
+    основной базы: пользователь сразу видит свой пост, комментарий или
+    подписку, даже если реплика ещё не догнала основную базу. Метод
+    запроса не важен: подписка, например, оформляется GET-запросом.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        try:
+            response = self.get_response(request)
+            if routers.wrote():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE,
+                    str(int(time.time()) + settings.REPLICA_PIN_SECONDS),
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            return response
+        finally:
+            routers.reset()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in SAFE_METHODS
+                and request.resolver_match.view_name in settings.REPLICA_VIEWS
+                and not self.pinned(request)):
+            routers.use_replicas()
+
+    def pinned(self, request):
+        try:
+            until = int(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0))
+        except ValueError:
+            return False
+        return time.time() < until
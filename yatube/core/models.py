@@ -0,0 +1,93 @@
+from django.db import models
+
+
+class Sequence(models.Model):
+    """Счётчик для выдачи идентификаторов, уникальных между базами."""
+
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.value}'
+
+
+class Job(models.Model):
+    """Задача фоновой очереди, которую выполняет команда run_worker.
+
+    Исполнитель берёт задачу в аренду до locked_until. Если он упал,
+    не завершив задачу, после окончания аренды её заберёт другой. После
+    max_attempts неудачных попыток задача остаётся в статусе DEAD для
+    разбора; выполненные задачи удаляются.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DEAD = 'dead'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DEAD, 'Не выполнена'),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.TextField(default='{}')
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk}'
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='job_claim_idx',
+            ),
+        ]
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди отправки (core.backends.mail.QueuedEmailBackend).
+
+    payload — поля EmailMessage в JSON. Отправленные письма удаляются,
+    письма, которые не удалось отправить за EMAIL_MAX_ATTEMPTS попыток,
+    остаются в статусе FAILED.
+    """
+
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (SENDING, 'Отправляется'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    payload = models.TextField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    send_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'Письмо #{self.pk}'
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'send_at'], name='email_send_idx'
+            ),
+        ]
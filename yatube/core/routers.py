@@ -0,0 +1,91 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+# Сессии и пользователи читаются лениво, в том числе до view, а реплика
+# может не знать о только что созданной или удалённой сессии: тогда
+# пользователь выглядел бы анонимным или не вышедшим из аккаунта.
+PRIMARY_ONLY_APPS = ('sessions', 'auth', 'contenttypes')
+
+
+def use_replicas(enabled=True):
+    """Разрешает чтение с реплик в текущем потоке."""
+    _state.use_replicas = enabled
+    _state.wrote = False
+
+
+def reset():
+    _state.use_replicas = False
+    _state.wrote = False
+
+
+def wrote():
+    """Была ли в текущем потоке запись в основную базу."""
+    return getattr(_state, 'wrote', False)
+
+
+@contextmanager
+def primary():
+    """Читает из основной базы внутри блока, даже если реплики разрешены.
+
+    Для значений, которые надолго кладутся в общий кеш: прочитанные с
+    отстающей реплики, они оставались бы устаревшими до истечения кеша.
+    """
+    enabled = getattr(_state, 'use_replicas', False)
+    _state.use_replicas = False
+    try:
+        yield
+    finally:
+        _state.use_replicas = enabled
+
+
+class ReplicaRouter:
+    """Отправляет чтения на реплики из DATABASE_REPLICAS, записи — в default.
+
+    Реплики используются, только если это разрешено для текущего потока
+    через use_replicas(): остальной код, в том числе админка и команды,
+    всегда читает из основной базы. После первой записи в потоке чтения
+    тоже возвращаются в основную базу, чтобы не видеть устаревших данных.
+    """
+
+    def db_for_read(self, model, **hints):
+        if self.elsewhere(hints):
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        replicas = settings.DATABASE_REPLICAS
+        if (replicas and getattr(_state, 'use_replicas', False)
+                and not wrote()):
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if self.elsewhere(hints):
+            return None
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def elsewhere(self, hints):
+        # Объекты из других баз (например, migrate --database) остаются
+        # в своей базе, как без маршрутизатора.
+        instance = hints.get('instance')
+        db = instance._state.db if instance is not None else None
+        return db is not None and db not in (
+            DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS
+        )
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
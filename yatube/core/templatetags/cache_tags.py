@@ -0,0 +1,59 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.cache import get_or_compute
+
+register = template.Library()
+
+
+class StampedeCacheNode(CacheNode):
+    def render(self, context):
+        try:
+            expire_time = int(self.expire_time_var.resolve(context))
+        except (template.VariableDoesNotExist, ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                '"stampede_cache" tag needs an integer timeout'
+            )
+        if self.cache_name:
+            cache_name = self.cache_name.resolve(context)
+        else:
+            cache_name = 'template_fragments'
+        try:
+            fragment_cache = caches[cache_name]
+        except InvalidCacheBackendError:
+            fragment_cache = caches['default']
+
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        cache_key = make_template_fragment_key(self.fragment_name, vary_on)
+        return get_or_compute(
+            fragment_cache, cache_key,
+            lambda: self.nodelist.render(context),
+            expire_time,
+        )
+
+
+@register.tag
+def stampede_cache(parser, token):
+    """Аналог {% cache %} с защитой от одновременного пересчёта.
+
+    {% stampede_cache 20 sidebar page_obj.number %}
+        ...
+    {% endstampede_cache %}
+    """
+    nodelist = parser.parse(('endstampede_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.'
+        )
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens[-1][len('using='):])
+        tokens = tokens[:-1]
+    return StampedeCacheNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(t) for t in tokens[3:]], cache_name,
+    )
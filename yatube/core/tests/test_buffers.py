@@ -0,0 +1,55 @@
+import operator
+
+from django.test import SimpleTestCase, override_settings
+
+from core.buffers import WriteBuffer, buffers
+
+
+@override_settings(WRITE_BUFFER_FLUSH_INTERVAL=60, WRITE_BUFFER_MAX_SIZE=3)
+class WriteBufferTest(SimpleTestCase):
+    def setUp(self):
+        self.written = []
+        self.buffer = WriteBuffer('test', self.written.append, operator.add)
+
+    def tearDown(self):
+        buffers.remove(self.buffer)
+
+    def test_merges_values_until_flush(self):
+        self.buffer.add('a', 1)
+        self.buffer.add('a', 2)
+        self.buffer.add('b', 1)
+        self.assertEqual(self.written, [])
+        self.assertEqual(self.buffer.get('a'), 3)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.written, [{'a': 3, 'b': 1}])
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_flushes_when_full(self):
+        for key in 'abc':
+            self.buffer.add(key, 1)
+        self.assertEqual(self.written, [{'a': 1, 'b': 1, 'c': 1}])
+
+    def test_maybe_flush_waits_for_interval(self):
+        self.buffer.add('a', 1)
+        self.buffer.maybe_flush()
+        self.assertEqual(self.written, [])
+        with override_settings(WRITE_BUFFER_FLUSH_INTERVAL=0):
+            self.buffer.maybe_flush()
+        self.assertEqual(self.written, [{'a': 1}])
+
+    def test_failed_flush_keeps_changes(self):
+        def fail(items):
+            self.buffer.add('a', 10)
+            raise RuntimeError('БД недоступна')
+
+        self.buffer.flush_func = fail
+        self.buffer.add('a', 1)
+        with self.assertRaises(RuntimeError):
+            self.buffer.flush()
+        # Изменения, пришедшие во время записи, не потерялись.
+        self.assertEqual(self.buffer.get('a'), 11)
+
+    def test_forked_process_drops_parent_changes(self):
+        self.buffer.add('a', 1)
+        self.buffer.pid = -1
+        self.assertEqual(len(self.buffer), 0)
@@ -0,0 +1,192 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import L1Store, TwoTierCache, get_or_compute
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'two_tier': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'two_tier_test',
+        'OPTIONS': {
+            'L2_CACHE': 'l2',
+            'L1_MAX_ENTRIES': 3,
+            'SYNC_INTERVAL': 0,
+            'L2_ONLY_PREFIXES': ('counter:',),
+        },
+    },
+    'l2': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two_tier_test_l2',
+    },
+}
+
+
+@override_settings(CACHES=CACHES)
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['two_tier']
+        self.cache.clear()
+        self.cache.l1.stats = {
+            'l1': {'hits': 0, 'misses': 0},
+            'l2': {'hits': 0, 'misses': 0},
+        }
+        # Второй процесс: тот же L2, но собственный L1.
+        self.other = TwoTierCache('two_tier_test', CACHES['two_tier'])
+        self.other.l1 = L1Store(3)
+
+    def test_l1_serves_repeated_reads(self):
+        """Повторное чтение обслуживается из L1."""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.other.get('key'), 'value')
+        self.assertEqual(self.other.get('key'), 'value')
+        stats = self.other.stats()
+        self.assertEqual(stats['l1']['hits'], 1)
+        self.assertEqual(stats['l2']['hits'], 1)
+
+    def test_write_invalidates_other_process(self):
+        """Запись в одном процессе инвалидирует L1 другого."""
+        self.cache.set('key', 'old')
+        self.assertEqual(self.other.get('key'), 'old')
+        self.cache.set('key', 'new')
+        self.assertEqual(self.other.get('key'), 'new')
+        self.cache.delete('key')
+        self.assertIsNone(self.other.get('key'))
+
+    def test_clear_invalidates_other_process(self):
+        """clear() в одном процессе очищает L1 другого."""
+        self.cache.set('key', 'value')
+        self.other.get('key')
+        self.cache.clear()
+        self.assertIsNone(self.other.get('key'))
+
+    def test_overflowed_log_clears_l1(self):
+        """Если журнал инвалидации переполнен, L1 очищается целиком."""
+        self.cache.set('key', 'old')
+        self.other.get('key')
+        self.cache.l2.set('key', 'new')
+        self.cache.l2.incr(self.cache.seq_key(), self.cache.log_size + 1)
+        self.assertEqual(self.other.get('key'), 'new')
+
+    def test_slot_in_flight_keeps_l1(self):
+        """Номер выдан, а ячейка ещё не записана: L1 не очищается."""
+        self.cache.set('key', 'value')
+        self.cache.set('other', 'old')
+        self.other.get('key')
+        self.other.get('other')
+        # Другой процесс между incr и записью ячейки.
+        seq = self.cache.l2.incr(self.cache.seq_key())
+        self.cache.l2.set('other', 'new')
+        self.assertEqual(self.other.get('key'), 'value')
+        self.assertEqual(self.other.stats()['l1']['hits'], 1)
+
+        key = self.cache.make_key('other')
+        self.cache.l2.set(self.cache.slot_key(seq), (seq, [key]), None)
+        self.assertEqual(self.other.get('other'), 'new')
+        self.assertEqual(self.other.get('key'), 'value')
+
+    def test_lost_slot_skipped_after_l1_timeout(self):
+        """Ячейку, потерянную дольше L1_TIMEOUT, процесс пропускает."""
+        self.other.l1_timeout = 0
+        self.cache.set('key', 'old')
+        self.other.get('key')
+        self.cache.l2.incr(self.cache.seq_key())
+        self.other.get('key')
+        self.other.get('key')
+        self.cache.set('key', 'new')
+        self.assertEqual(self.other.get('key'), 'new')
+        self.assertEqual(
+            self.other.l1.seen_seq, self.cache.l2.get(self.cache.seq_key())
+        )
+
+    def test_counters_do_not_overflow_log(self):
+        """Пачка incr счётчиков не очищает L1 других процессов."""
+        self.cache.set('key', 'value')
+        self.other.get('key')
+        for i in range(self.cache.log_size + 10):
+            self.cache.set(f'counter:{i}', 0)
+            self.cache.incr(f'counter:{i}')
+        self.assertEqual(self.other.get('key'), 'value')
+        self.assertEqual(self.other.stats()['l1']['hits'], 1)
+        self.assertEqual(self.other.get('counter:0'), 1)
+        self.cache.incr('counter:0')
+        self.assertEqual(self.other.get('counter:0'), 2)
+
+    def test_l1_bounded(self):
+        """L1 хранит не больше L1_MAX_ENTRIES записей."""
+        self.cache.set_many({f'key{i}': i for i in range(5)})
+        self.assertEqual(self.cache.stats()['l1']['size'], 3)
+        self.assertEqual(self.cache.get_many(['key0', 'key4']),
+                         {'key0': 0, 'key4': 4})
+
+
+@override_settings(CACHES=CACHES)
+class StampedeProtectionTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        time.sleep(0.05)
+        return f'value{self.calls}'
+
+    def test_concurrent_miss_computed_once(self):
+        """При одновременном промахе значение считается один раз."""
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                get_or_compute(self.cache, 'key', self.compute, 20)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['value1'] * 8)
+
+    def test_stale_value_served_during_rebuild(self):
+        """Пока ключ пересчитывается, отдаётся устаревшее значение."""
+        self.cache.set('key', ('stale', 0.01, time.time() - 1))
+        self.cache.add('key:lock', 1)
+        self.assertEqual(
+            get_or_compute(self.cache, 'key', self.compute, 20), 'stale'
+        )
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_value_rebuilt(self):
+        """Истёкшее значение пересчитывается при свободной блокировке."""
+        self.cache.set('key', ('stale', 0.01, time.time() - 1))
+        self.assertEqual(
+            get_or_compute(self.cache, 'key', self.compute, 20), 'value1'
+        )
+        self.assertIsNone(self.cache.get('key:lock'))
+
+    def test_fresh_value_not_rebuilt(self):
+        """Свежее значение отдаётся без пересчёта."""
+        get_or_compute(self.cache, 'key', self.compute, 20)
+        get_or_compute(self.cache, 'key', self.compute, 20)
+        self.assertEqual(self.calls, 1)
+
+    def test_fragment_tag(self):
+        """Тег stampede_cache кеширует фрагмент шаблона."""
+        template = Template(
+            '{% load cache_tags %}'
+            '{% stampede_cache 20 test_fragment num %}{{ text }}'
+            '{% endstampede_cache %}'
+        )
+        first = template.render(Context({'num': 1, 'text': 'первый'}))
+        second = template.render(Context({'num': 1, 'text': 'второй'}))
+        other = template.render(Context({'num': 2, 'text': 'второй'}))
+        self.assertEqual(first, 'первый')
+        self.assertEqual(second, 'первый')
+        self.assertEqual(other, 'второй')
@@ -0,0 +1,66 @@
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import metrics
+from core.db import run_write
+
+
+class FlakyWrite:
+    def __init__(self, failures, message='database is locked'):
+        self.failures = failures
+        self.message = message
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OperationalError(self.message)
+        return 'ok'
+
+
+def write_count(name, result):
+    return metrics.registry.snapshot().get(
+        (metrics.DB_WRITES.name, (name, result)), 0
+    )
+
+
+@override_settings(DB_WRITE_ATTEMPTS=3, DB_WRITE_BACKOFF=0)
+class RunWriteTest(TransactionTestCase):
+    def test_starts_immediate_transaction(self):
+        """Пишущая транзакция начинается с BEGIN IMMEDIATE."""
+        with CaptureQueriesContext(connection) as queries:
+            run_write('test_immediate', lambda: None)
+        self.assertIn('BEGIN IMMEDIATE', [q['sql'] for q in queries])
+        self.assertFalse(connection.begin_immediate)
+
+    def test_retries_on_lock(self):
+        """Блокировка базы приводит к повтору транзакции."""
+        func = FlakyWrite(failures=2)
+        self.assertEqual(run_write('test_retry', func), 'ok')
+        self.assertEqual(func.calls, 3)
+        self.assertEqual(write_count('test_retry', 'retry'), 2)
+        self.assertEqual(write_count('test_retry', 'ok'), 1)
+
+    def test_gives_up_after_attempts(self):
+        """После DB_WRITE_ATTEMPTS неудач ошибка пробрасывается."""
+        func = FlakyWrite(failures=10)
+        with self.assertRaises(OperationalError):
+            run_write('test_failed', func)
+        self.assertEqual(func.calls, 3)
+        self.assertEqual(write_count('test_failed', 'failed'), 1)
+
+    def test_other_errors_are_not_retried(self):
+        """Ошибки, не связанные с блокировкой, не повторяются."""
+        func = FlakyWrite(failures=1, message='no such table: posts_post')
+        with self.assertRaises(OperationalError):
+            run_write('test_other', func)
+        self.assertEqual(func.calls, 1)
+
+    def test_nested_call_is_not_retried(self):
+        """Внутри открытой транзакции повтор невозможен."""
+        func = FlakyWrite(failures=1)
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                run_write('test_nested', func)
+        self.assertEqual(func.calls, 1)
@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+
+from core.hll import HyperLogLog
+
+
+class HyperLogLogTest(SimpleTestCase):
+    def sketch(self, values):
+        sketch = HyperLogLog()
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def test_small_counts_are_exact(self):
+        self.assertEqual(HyperLogLog().count(), 0)
+        self.assertEqual(self.sketch(['a', 'b', 'a', 'c']).count(), 3)
+
+    def test_estimate_within_error(self):
+        count = self.sketch(f'user:{n}' for n in range(20000)).count()
+        self.assertAlmostEqual(count, 20000, delta=20000 * 0.1)
+
+    def test_merge_equals_union(self):
+        left = self.sketch(range(0, 3000))
+        right = self.sketch(range(2000, 5000))
+        left.merge(right)
+        self.assertEqual(
+            left.to_bytes(), self.sketch(range(0, 5000)).to_bytes()
+        )
+
+    def test_round_trip(self):
+        sketch = self.sketch(range(100))
+        self.assertEqual(len(sketch.to_bytes()), 1024)
+        restored = HyperLogLog.from_bytes(sketch.to_bytes())
+        self.assertEqual(restored.count(), sketch.count())
+
+    def test_different_precision_not_merged(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(11))
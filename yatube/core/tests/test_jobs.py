@@ -0,0 +1,98 @@
+import datetime as dt
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+calls = []
+
+
+@jobs.job('tests.record')
+def record(value, suffix=''):
+    calls.append(f'{value}{suffix}')
+
+
+@jobs.job('tests.urgent', priority=10)
+def urgent():
+    calls.append('urgent')
+
+
+@jobs.job('tests.broken', max_attempts=2)
+def broken():
+    raise ValueError('сломано')
+
+
+@override_settings(JOB_RETRY_DELAY=60, JOB_LEASE_SECONDS=30)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_job_runs_and_is_removed(self):
+        record.delay('a', suffix='!')
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, ['a!'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_priority_order(self):
+        record.delay('first')
+        urgent.delay()
+        jobs.run_pending()
+        self.assertEqual(calls, ['urgent', 'first'])
+
+    def test_failed_job_is_retried_later(self):
+        broken.delay()
+        self.assertEqual(jobs.run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('сломано', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        # Повтор ещё не наступил.
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_job_goes_dead_after_max_attempts(self):
+        broken.delay()
+        for _ in range(2):
+            Job.objects.update(run_at=timezone.now())
+            jobs.run_pending()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.DEAD)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_expired_lease_is_reclaimed(self):
+        record.delay('lost')
+        job = jobs.claim('crashed-worker')
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertIsNone(jobs.claim('other'))
+        Job.objects.update(
+            locked_until=timezone.now() - dt.timedelta(seconds=1)
+        )
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, ['lost'])
+
+    @override_settings(JOB_QUEUE_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        record.delay('now')
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Job.objects.exists())
+
+
+class RunWorkerCommandTest(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_thread_pool_drains_queue(self):
+        for value in range(5):
+            record.delay(value)
+        out = io.StringIO()
+        call_command('run_worker', workers=2, once=True, stdout=out)
+        self.assertEqual(sorted(calls), ['0', '1', '2', '3', '4'])
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('Исполнителей: 2 (thread)', out.getvalue())
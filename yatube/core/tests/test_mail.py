@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail as django_mail
+from django.core.mail import EmailMultiAlternatives, send_mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs, mail
+from core.models import Job, OutgoingEmail
+
+User = get_user_model()
+
+
+class CountingBackend(EmailBackend):
+    """locmem-бэкенд, который считает соединения и роняет адреса bad@."""
+
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(address.startswith('bad@') for address in message.to):
+                raise ConnectionError('550 mailbox unavailable')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.backends.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='core.tests.test_mail.CountingBackend',
+    EMAIL_RATE_LIMIT=0,
+    EMAIL_BATCH_SIZE=2,
+    EMAIL_MAX_ATTEMPTS=2,
+    JOB_RETRY_DELAY=60,
+)
+class QueuedEmailTest(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def test_password_reset_is_queued(self):
+        """Сброс пароля не отправляет письмо в запросе."""
+        User.objects.create_user(
+            username='user', email='user@example.com', password='secret'
+        )
+        response = Client().post(
+            reverse('users:password_reset_form'),
+            {'email': 'user@example.com'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(django_mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        self.assertEqual(Job.objects.get().name, mail.SEND_JOB)
+
+        jobs.run_pending()
+        self.assertEqual(len(django_mail.outbox), 1)
+        self.assertEqual(django_mail.outbox[0].to, ['user@example.com'])
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_messages_are_sent_in_batches(self):
+        for n in range(5):
+            send_mail('Тема', 'Текст', 'from@example.com', [f'{n}@e.com'])
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(mail.send_queued(), (5, 0))
+        self.assertEqual(CountingBackend.opened, 3)
+        self.assertEqual(len(django_mail.outbox), 5)
+
+    def test_alternatives_survive_queue(self):
+        message = EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            headers={'X-Tag': 'reset'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.send()
+        mail.send_queued()
+        sent = django_mail.outbox[0]
+        self.assertEqual(sent.alternatives, [('<p>Текст</p>', 'text/html')])
+        self.assertEqual(sent.extra_headers, {'X-Tag': 'reset'})
+
+    def test_failed_message_is_retried_then_failed(self):
+        send_mail('Тема', 'Текст', 'from@example.com', ['bad@example.com'])
+        send_mail('Тема', 'Текст', 'from@example.com', ['ok@example.com'])
+        Job.objects.all().delete()
+        self.assertEqual(mail.send_queued(), (1, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.QUEUED)
+        self.assertIn('550', email.last_error)
+        # Повтор запланирован отдельной задачей на время send_at.
+        retry = Job.objects.get(run_at=email.send_at)
+        self.assertEqual(retry.name, mail.SEND_JOB)
+
+        OutgoingEmail.objects.update(send_at=email.created)
+        self.assertEqual(mail.send_queued(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.FAILED)
+
+    def test_new_mail_does_not_wait_for_retry(self):
+        """Письмо после неудачной отправки уходит сразу, а не с повтором."""
+        send_mail('Тема', 'Текст', 'from@example.com', ['bad@example.com'])
+        self.assertEqual(jobs.run_pending(), 1)
+        send_mail('Тема', 'Текст', 'from@example.com', ['ok@example.com'])
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(
+            [message.to for message in django_mail.outbox],
+            [['ok@example.com']],
+        )
+        self.assertIn('bad@example.com', OutgoingEmail.objects.get().payload)
+
+
+class RateLimiterTest(SimpleTestCase):
+    def test_waits_between_messages(self):
+        limiter = mail.RateLimiter(rate=2)
+        with mock.patch('core.mail.time') as clock:
+            clock.monotonic.return_value = 100.0
+            for _ in range(3):
+                limiter.wait()
+        self.assertEqual(
+            [call.args[0] for call in clock.sleep.call_args_list], [0.5, 1.0]
+        )
+
+
+class FileDeliveryTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_file_backend_receives_queued_mail(self):
+        with self.settings(
+            EMAIL_BACKEND='core.backends.mail.QueuedEmailBackend',
+            EMAIL_DELIVERY_BACKEND=(
+                'django.core.mail.backends.filebased.EmailBackend'
+            ),
+            EMAIL_FILE_PATH=self.directory,
+            EMAIL_RATE_LIMIT=0,
+        ):
+            send_mail('Тема', 'Текст', 'from@example.com', ['to@e.com'])
+            self.assertEqual(os.listdir(self.directory), [])
+            mail.send_queued()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
@@ -0,0 +1,128 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+User = get_user_model()
+
+
+class MetricsEndpointTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_metrics(self):
+        response = self.client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_view_metrics_exposed(self):
+        """После запроса к index в /metrics есть метрики этой view."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        body = self.get_metrics()
+        self.assertIn('# TYPE yatube_http_request_duration_seconds '
+                      'histogram', body)
+        self.assertIn('yatube_http_request_duration_seconds_bucket{'
+                      'view="posts:index",le="+Inf"}', body)
+        self.assertIn('yatube_http_responses_total{'
+                      'view="posts:index",status="200"}', body)
+        self.assertIn('yatube_db_queries_per_request_count{'
+                      'view="posts:index"}', body)
+        self.assertIn('yatube_cache_hit_ratio{cache="default:l1"}', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=())
+    def test_metrics_forbidden_for_other_hosts(self):
+        """/metrics недоступен с адресов вне METRICS_ALLOWED_IPS."""
+        response = self.client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 403)
+
+
+class RegistryTest(TestCase):
+    def setUp(self):
+        self.registry = metrics.Registry()
+        self.counter = self.registry.counter('test_total', 'Тест', ('kind',))
+        self.histogram = self.registry.histogram(
+            'test_seconds', 'Тест', buckets=(0.1, 1)
+        )
+
+    def test_histogram_buckets_cumulative(self):
+        """Корзины гистограммы выводятся накопительно."""
+        for value in (0.05, 0.5, 0.7, 3):
+            self.histogram.observe(value)
+        body = self.registry.render()
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', body)
+        self.assertIn('test_seconds_bucket{le="1"} 3', body)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 4', body)
+        self.assertIn('test_seconds_count 4', body)
+        self.assertIn('test_seconds_sum 4.25', body)
+
+    def test_label_values_escaped(self):
+        """Кавычки в значениях меток экранируются."""
+        self.counter.inc('a"b')
+        self.assertIn('test_total{kind="a\\"b"} 1', self.registry.render())
+
+    def test_multiprocess_values_summed(self):
+        """Значения из файлов других процессов суммируются."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(METRICS_DIR=directory):
+            self.counter.inc('x', amount=2)
+            self.registry.flush(directory)
+            # Имитируем второй процесс с собственным файлом.
+            os.rename(
+                os.path.join(directory, self.registry.filename),
+                os.path.join(directory, 'other.json'),
+            )
+            self.registry.reset_process()
+            self.counter.inc('x', amount=3)
+            body = self.registry.render()
+        self.assertIn('test_total{kind="x"} 5', body)
+
+    def test_dead_process_files_are_retired(self):
+        """Файл завершившегося процесса сворачивается в retired.json."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        dead = subprocess.Popen(['true'])
+        dead.wait()
+        with override_settings(METRICS_DIR=directory):
+            self.counter.inc('x', amount=2)
+            self.registry.flush(directory)
+            os.rename(
+                os.path.join(directory, self.registry.filename),
+                os.path.join(directory, f'{dead.pid}-1.json'),
+            )
+            self.registry.reset_process()
+            self.counter.inc('x', amount=3)
+            body = self.registry.render()
+            self.assertIn('test_total{kind="x"} 5', body)
+            self.assertFalse(
+                os.path.exists(os.path.join(directory, f'{dead.pid}-1.json'))
+            )
+            # Повторный сбор не считает старые значения дважды.
+            self.assertIn('test_total{kind="x"} 5', self.registry.render())
+
+    def test_exit_flush_keeps_last_values(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(METRICS_DIR=directory):
+            self.counter.inc('x', amount=4)
+            self.registry.flush_on_exit()
+            self.assertNotIn(self.registry.filename, os.listdir(directory))
+            self.registry.reset_process()
+            body = self.registry.render()
+        self.assertIn('test_total{kind="x"} 4', body)
@@ -0,0 +1,114 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware.profiling import list_profiles
+from posts.models import Post
+
+User = get_user_model()
+
+PROFILER_DIR = tempfile.mkdtemp()
+
+
+class RecordingMiddleware:
+    """Запоминает, какие хуки middleware вызвал обработчик Django."""
+
+    calls = []
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.calls.append('process_view')
+
+    def process_exception(self, request, exception):
+        self.calls.append('process_exception')
+
+
+@override_settings(
+    PROFILER_ENABLED=True,
+    PROFILER_SAMPLE_RATE=1.0,
+    PROFILER_SLOW_MS=0,
+    PROFILER_DIR=PROFILER_DIR,
+    PROFILER_MAX_FILES=2,
+)
+class SamplingProfilerTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PROFILER_DIR, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(PROFILER_DIR, ignore_errors=True)
+
+    def test_slow_request_profile_saved(self):
+        """Профиль медленного запроса сохраняется на диск."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        profiles = list_profiles(PROFILER_DIR)
+        self.assertEqual(len(profiles), 1)
+        self.assertIn('posts-index', os.path.basename(profiles[0]))
+
+    def test_view_runs_through_handler(self):
+        """Профилируемую view вызывает обработчик, а не профилировщик."""
+        RecordingMiddleware.calls = []
+        middleware = settings.MIDDLEWARE + [
+            'core.tests.test_profiling.RecordingMiddleware'
+        ]
+        with override_settings(MIDDLEWARE=middleware):
+            response = self.client.get(
+                reverse('posts:post_detail', args=[0])
+            )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            RecordingMiddleware.calls, ['process_view', 'process_exception']
+        )
+        self.assertEqual(len(list_profiles(PROFILER_DIR)), 1)
+
+    def test_other_namespaces_not_profiled(self):
+        """Запросы вне posts и users не профилируются."""
+        self.client.get(reverse('about:author'))
+        self.assertEqual(list_profiles(PROFILER_DIR), [])
+
+    @override_settings(PROFILER_SLOW_MS=60000)
+    def test_fast_request_profile_dropped(self):
+        """Профиль быстрого запроса не сохраняется."""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(list_profiles(PROFILER_DIR), [])
+
+    def test_profiles_rotated(self):
+        """В каталоге хранится не больше PROFILER_MAX_FILES профилей."""
+        for _ in range(4):
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(len(list_profiles(PROFILER_DIR)), 2)
+
+    def test_profile_summary_collapsed(self):
+        """profile_summary выдаёт collapsed-стеки с view в стеке."""
+        self.client.get(reverse('posts:index'))
+        output = os.path.join(PROFILER_DIR, 'summary.txt')
+        call_command('profile_summary', output=output, stderr=io.StringIO())
+        with open(output) as summary:
+            lines = summary.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, weight = line.rsplit(' ', 1)
+            self.assertTrue(weight.isdigit())
+        self.assertTrue(
+            any('index (views.py:' in line for line in lines)
+        )
@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import routers
+from core.management.commands.refresh_replicas import Command
+from core.routers import ReplicaRouter
+from posts.models import Notification, Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.addCleanup(routers.reset)
+
+    def test_reads_go_to_primary_by_default(self):
+        """Без use_replicas чтения идут в основную базу."""
+        routers.reset()
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_go_to_replica_when_enabled(self):
+        """С use_replicas чтения идут на реплику, записи — в default."""
+        routers.use_replicas()
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_reads_return_to_primary_after_write(self):
+        """После записи чтения в том же потоке идут в основную базу."""
+        routers.use_replicas()
+        self.router.db_for_write(Post)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_primary_block_reads_from_primary(self):
+        """Внутри primary() чтения идут в default, после — снова на реплику."""
+        routers.use_replicas()
+        with routers.primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_sessions_and_users_read_from_primary(self):
+        """Сессии, пользователи и типы контента не читаются с реплики."""
+        routers.use_replicas()
+        for model in (Session, User, ContentType):
+            self.assertEqual(self.router.db_for_read(model), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaMiddlewareTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_author')
+        self.post = Post.objects.create(text='Тестовый пост', author=self.user)
+
+    def replica_queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = method(url, **kwargs)
+        return response, len(queries)
+
+    def test_read_views_use_replica(self):
+        """Страницы из REPLICA_VIEWS читают с реплики."""
+        response, count = self.replica_queries(
+            self.client.get, reverse('posts:index')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(count, 0)
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент временно читает из основной базы."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Комментарий'},
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+        response, count = self.replica_queries(
+            self.client.get,
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        self.assertContains(response, 'Комментарий')
+        self.assertEqual(count, 0)
+
+    def test_follow_pins_client_to_primary(self):
+        """Подписка GET-запросом тоже переводит чтения на основную базу."""
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[self.user.username])
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+        response, count = self.replica_queries(
+            self.client.get,
+            reverse('posts:profile', args=[self.user.username]),
+        )
+        self.assertEqual(count, 0)
+        self.assertContains(response, 'Отписаться')
+
+    def stale(self, *tables):
+        """Обёртка запросов реплики, которая не видит строк таблиц."""
+        def wrapper(execute, sql, params, many, context):
+            if any(table in sql for table in tables):
+                sql = f'SELECT * FROM ({sql}) WHERE 0'
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def test_login_is_seen_with_stale_replica(self):
+        """Сессия, которой ещё нет на реплике, всё равно находится."""
+        self.client.force_login(self.user)
+
+        stale = self.stale('django_session', 'auth_user')
+        with connections['replica'].execute_wrapper(stale):
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_unread_count_is_cached_from_primary(self):
+        """Счётчик уведомлений не кешируется с отстающей реплики."""
+        cache.clear()
+        Notification.objects.create(
+            user=self.user, author=self.user, post_id=self.post.pk
+        )
+        self.client.force_login(self.user)
+        stale = self.stale(Notification._meta.db_table)
+        with connections['replica'].execute_wrapper(stale):
+            response = self.client.get(reverse('posts:notifications_unread'))
+        self.assertEqual(response.json(), {'unread': 1})
+
+    def test_latest_posts_are_cached_from_primary(self):
+        """Список новых постов не заполняется с отстающей реплики."""
+        cache.clear()
+        stale = self.stale(Post._meta.db_table)
+        with connections['replica'].execute_wrapper(stale):
+            response = self.client.get(reverse('posts:index_new_posts'))
+        self.assertEqual(response.json()['ids'], [self.post.pk])
+
+    def test_safe_requests_do_not_pin(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+class RefreshReplicasTest(SimpleTestCase):
+    def test_copy_replaces_replica_file(self):
+        """Реплика становится копией основной базы."""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            connection = sqlite3.connect(source)
+            with connection:
+                connection.execute('CREATE TABLE item (id INTEGER)')
+                connection.execute('INSERT INTO item VALUES (1)')
+            connection.close()
+
+            Command().copy(source, target)
+
+            replica = sqlite3.connect(target)
+            rows = replica.execute('SELECT id FROM item').fetchall()
+            replica.close()
+            self.assertEqual(rows, [(1,)])
+            self.assertFalse(os.path.exists(target + '.tmp'))
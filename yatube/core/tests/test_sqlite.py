@@ -0,0 +1,33 @@
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+
+class SQLitePragmasTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connection(self):
+        """Новое соединение получает настройки из SQLITE_PRAGMAS."""
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        # 1 — NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -65536)
+
+
+class SQLiteBenchmarkTest(SimpleTestCase):
+    def test_benchmark_reports_both_profiles(self):
+        """Бенчмарк выводит результаты для обоих профилей настроек."""
+        out = io.StringIO()
+        call_command(
+            'sqlite_benchmark', readers=2, writers=1, duration=0.2, rows=100,
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('default', output)
+        self.assertIn('tuned', output)
+        self.assertIn('Ускорение', output)
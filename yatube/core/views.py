@@ -1,4 +1,11 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+
+from .metrics import registry
 
 
 def page_not_found(request, exception):
@@ -17,3 +24,19 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@never_cache
+def csrf_token(request):
+    # Токен для форм, которые отрисованы без {% csrf_token %}, чтобы
+    # страницу с формой можно было кешировать и отдавать всем.
+    return JsonResponse({'token': get_token(request)})
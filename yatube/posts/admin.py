@@ -1,6 +1,22 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
 
-from .models import Group, Post, Comment
+from . import services
+from .models import ArchivedPost, DeletionTask, Group, Post, Comment, User
+
+
+def delete_in_background(modeladmin, request, queryset):
+    for obj in queryset:
+        services.schedule_deletion(obj)
+    modeladmin.message_user(
+        request,
+        f'Удаление поставлено в очередь: {len(queryset)}. '
+        'Ход выполнения виден в списке задач удаления.',
+        messages.SUCCESS,
+    )
+
+
+delete_in_background.short_description = 'Удалить в фоне'
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +25,25 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    actions = (delete_in_background,)
+
+    # Посты удаляются пометкой, строки и каскад удалит purge_deleted.
+    def delete_model(self, request, obj):
+        services.delete_post(obj)
+
+    def delete_queryset(self, request, queryset):
+        for post in queryset:
+            services.delete_post(post)
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title',)
+    actions = (delete_in_background,)
+
+
+class BackgroundDeletionUserAdmin(UserAdmin):
+    actions = (delete_in_background,)
 
 
 class CommentAdmin(admin.ModelAdmin):
@@ -16,7 +51,44 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ('text', 'post',)
     list_filter = ('created',)
 
+    # Комментарии удаляются пометкой, строки удалит purge_deleted.
+    def delete_model(self, request, obj):
+        services.delete_comment(obj)
+
+    def delete_queryset(self, request, queryset):
+        for comment in queryset:
+            services.delete_comment(comment)
+
+
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'archived_at')
+    search_fields = ('text',)
+    list_filter = ('pub_date',)
+
+
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'target', 'label', 'status', 'processed', 'total', 'progress',
+        'created', 'updated',
+    )
+    list_filter = ('status', 'target')
+    readonly_fields = (
+        'target', 'object_id', 'label', 'status', 'total', 'processed',
+        'error', 'created', 'updated',
+    )
+
+    def progress(self, obj):
+        return f'{obj.progress}%'
+    progress.short_description = 'Выполнено'
+
+    def has_add_permission(self, request):
+        return False
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
+admin.site.register(DeletionTask, DeletionTaskAdmin)
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeletionUserAdmin)
@@ -0,0 +1,79 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from . import dates
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+
+class ChainedFeed:
+    """Несколько лент подряд, например горячие посты и затем архивные.
+
+    Поддерживает протокол Paginator: count() и срезы. Срез читает только
+    те ленты, которые в него попадают.
+    """
+
+    def __init__(self, *feeds):
+        self.feeds = feeds
+        self.counts = None
+
+    def count(self):
+        if self.counts is None:
+            self.counts = [feed.count() for feed in self.feeds]
+        return sum(self.counts)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        self.count()
+        start, stop = index.start or 0, index.stop
+        result = []
+        for feed, size in zip(self.feeds, self.counts):
+            if stop is not None and stop <= 0:
+                break
+            if start < size:
+                end = size if stop is None else min(stop, size)
+                result.extend(feed[start:end])
+            start = max(start - size, 0)
+            if stop is not None:
+                stop -= size
+        return result
+
+
+def archive_batch(posts, using=DEFAULT_DB_ALIAS):
+    """Переносит посты с комментариями в архив и удаляет их из posts_post.
+
+    Архив лежит в default, посты — в using (шард или та же default).
+    Удаление идёт через ORM, поэтому сигналы убирают посты из лент
+    и кеша страниц. Помесячные счётчики учитывают и архивные посты,
+    поэтому вычтенное сигналами возвращается обратно.
+    """
+    comments = Comment.objects.using(using).filter(post__in=posts)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), \
+            transaction.atomic(using=using):
+        ArchivedPost.objects.bulk_create([
+            ArchivedPost(
+                id=post.pk,
+                text=post.text,
+                pub_date=post.pub_date,
+                author_id=post.author_id,
+                group_id=post.group_id,
+                image=post.image.name,
+            )
+            for post in posts
+        ], ignore_conflicts=True)
+        ArchivedComment.objects.bulk_create([
+            ArchivedComment(
+                id=comment.pk,
+                text=comment.text,
+                post_id=comment.post_id,
+                author_id=comment.author_id,
+                created=comment.created,
+            )
+            for comment in comments
+        ], ignore_conflicts=True)
+        Post.objects.using(using).filter(
+            pk__in=[post.pk for post in posts]
+        ).delete()
+        dates.record_posts(posts, 1)
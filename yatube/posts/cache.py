@@ -0,0 +1,70 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import get_or_compute
+from core.middleware.cache_control import is_shared_page
+
+PAGE_GENERATION_KEY = 'posts:page_generation'
+
+
+class Uncacheable(Exception):
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def page_generation():
+    return cache.get(PAGE_GENERATION_KEY, 0)
+
+
+def bump_page_generation():
+    """Инвалидирует все закешированные страницы разом."""
+    try:
+        cache.incr(PAGE_GENERATION_KEY)
+    except ValueError:
+        cache.set(PAGE_GENERATION_KEY, 1, timeout=None)
+
+
+def page_cache_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'posts:page:{page_generation()}:{path}'
+
+
+def anonymous_cache_page(view_func):
+    """Кеширует страницу целиком для анонимных пользователей.
+
+    Авторизованные пользователи получают свежую страницу, потому что
+    шапка и форма комментария зависят от пользователя. Общие страницы
+    (SHARED_PAGE_VIEWS) кешируются одной копией для всех. Ключ кеша
+    включает поколение страниц, которое увеличивается при любом
+    изменении постов, комментариев, групп и пользователей.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.ANONYMOUS_PAGE_CACHE_TIMEOUT
+        if (not timeout or request.method != 'GET'
+                or (not is_shared_page(request)
+                    and request.user.is_authenticated)):
+            return view_func(request, *args, **kwargs)
+
+        rendered = []
+
+        def render_page():
+            response = view_func(request, *args, **kwargs)
+            rendered.append(response)
+            if response.status_code != 200 or response.streaming:
+                raise Uncacheable(response)
+            return response
+
+        try:
+            response = get_or_compute(
+                cache, page_cache_key(request), render_page, timeout
+            )
+        except Uncacheable as error:
+            return error.response
+        response['X-Page-Cache'] = 'MISS' if rendered else 'HIT'
+        return response
+    return wrapper
@@ -0,0 +1,69 @@
+import datetime as dt
+from collections import Counter
+from itertools import groupby
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import Http404
+from django.utils import timezone
+
+from .models import PostMonthCount
+
+
+def month_start(value):
+    """Первый день месяца публикации в текущем часовом поясе."""
+    return timezone.localtime(value).date().replace(day=1)
+
+
+def month_bounds(year, month):
+    """Границы месяца [start, end) для выборки постов по pub_date."""
+    if not 1 <= month <= 12 or not dt.MINYEAR < year < dt.MAXYEAR:
+        raise Http404('Такого месяца нет.')
+    start = dt.datetime(year, month, 1)
+    end = dt.datetime(year + month // 12, month % 12 + 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def months_by_year(month_counts):
+    """Группирует непустые месяцы по годам, от новых к старым."""
+    rows = month_counts.filter(count__gt=0).order_by('-month')
+    return [
+        (year, list(months))
+        for year, months in groupby(rows, key=lambda row: row.month.year)
+    ]
+
+
+def change(owner, month, delta):
+    rows = PostMonthCount.objects.filter(month=month, **owner)
+    if delta < 0:
+        rows.filter(count__gte=-delta).update(count=F('count') + delta)
+        return
+    if rows.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            PostMonthCount.objects.create(month=month, count=delta, **owner)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        rows.update(count=F('count') + delta)
+
+
+def record_posts(posts, delta):
+    """Добавляет (delta=1) или вычитает (delta=-1) посты из счётчиков."""
+    changes = Counter()
+    for post in posts:
+        month = month_start(post.pub_date)
+        changes[('author_id', post.author_id, month)] += delta
+        if post.group_id:
+            changes[('group_id', post.group_id, month)] += delta
+    for (field, object_id, month), total in changes.items():
+        if total:
+            change({field: object_id}, month, total)
+
+
+def move_group(post, previous_group_id):
+    month = month_start(post.pub_date)
+    if previous_group_id:
+        change({'group_id': previous_group_id}, month, -1)
+    if post.group_id:
+        change({'group_id': post.group_id}, month, 1)
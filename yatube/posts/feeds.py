@@ -0,0 +1,248 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import routers
+
+from .models import Post
+
+OBJECTS_VERSION_KEY = 'posts:objects_version'
+
+# Блокировка закешированного списка id на время его изменения.
+UPDATE_LOCK_TIMEOUT = 5
+UPDATE_POLL_INTERVAL = 0.01
+
+
+def feed_key(name):
+    return f'posts:feed:{name}'
+
+
+def latest_key(name):
+    return f'posts:latest:{name}'
+
+
+def post_keys(ids):
+    version = cache.get(OBJECTS_VERSION_KEY, 0)
+    return {f'posts:post:{version}:{pk}': pk for pk in ids}
+
+
+def hydrate(ids):
+    """Возвращает посты по списку id в том же порядке.
+
+    Посты берутся из кеша одним get_many, а промахи дочитываются одним
+    запросом по первичному ключу и кладутся обратно в кеш.
+    """
+    keys = post_keys(ids)
+    found = {
+        keys[key]: post for key, post in cache.get_many(list(keys)).items()
+    }
+    missing = [pk for pk in ids if pk not in found]
+    if missing:
+        loaded = Post.objects.select_related(
+            'author', 'group'
+        ).in_bulk_across_shards(missing)
+        found.update(loaded)
+        cache.set_many(
+            {key: loaded[pk] for key, pk in keys.items() if pk in loaded},
+            settings.POST_CACHE_TIMEOUT,
+        )
+    return [found[pk] for pk in ids if pk in found]
+
+
+class CachedFeed:
+    """Лента постов в виде закешированного упорядоченного списка id.
+
+    Хранится не больше FEED_CACHE_SIZE самых свежих id. Страницы внутри
+    этого окна собираются из кеша постов, более глубокие страницы
+    читаются обычным запросом. Поддерживает протокол, который нужен
+    Paginator: count() и срезы.
+    """
+
+    def __init__(self, name, queryset):
+        self.key = feed_key(name)
+        self.queryset = queryset
+
+    def ids(self):
+        ids = cache.get(self.key)
+        if ids is None:
+            ids = self.queryset.pks(settings.FEED_CACHE_SIZE)
+            cache.set(self.key, ids, settings.FEED_CACHE_TIMEOUT)
+        return ids
+
+    def count(self):
+        ids = self.ids()
+        if len(ids) < settings.FEED_CACHE_SIZE:
+            return len(ids)
+        return self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids()
+        if index.stop is not None and index.stop <= len(ids):
+            return hydrate(ids[index])
+        return list(
+            self.queryset.select_related('author', 'group')[index]
+        )
+
+
+def feed_or_queryset(name, queryset):
+    if not settings.FEED_CACHE_TIMEOUT:
+        return queryset
+    return CachedFeed(name, queryset)
+
+
+def index_feed():
+    return feed_or_queryset(
+        'index',
+        Post.objects.select_related('group', 'author').across_shards()
+    )
+
+
+def group_feed(group):
+    return feed_or_queryset(
+        f'group:{group.pk}',
+        Post.objects.filter(group=group).select_related('author', 'group')
+        .across_shards()
+    )
+
+
+def author_feed(author):
+    return feed_or_queryset(
+        f'author:{author.pk}',
+        Post.objects.select_related('author', 'group').for_author(author)
+    )
+
+
+def latest_ids(name, queryset):
+    """Id не больше LATEST_POSTS_SIZE самых новых постов ленты.
+
+    Список хранится в кеше и пополняется сигналами при создании постов,
+    так что опрос ленты на новые посты обычно не обращается к БД.
+    Заполняется он из основной базы: пост, которого ещё нет на реплике,
+    сигнал уже не добавит, и он пропал бы из списка до конца таймаута.
+    """
+    ids = cache.get(latest_key(name))
+    if ids is None:
+        with routers.primary():
+            ids = queryset.pks(settings.LATEST_POSTS_SIZE)
+        cache.set(latest_key(name), ids, settings.LATEST_POSTS_TIMEOUT)
+    return ids
+
+
+def newer_than(ids, since):
+    """Id постов новее since и признак того, что в списке не все такие.
+
+    Id выдаются по возрастанию и на шардах (make_pk), поэтому пост новее,
+    если его id больше.
+    """
+    newer = [pk for pk in ids if pk > since]
+    more = len(ids) >= settings.LATEST_POSTS_SIZE and len(newer) == len(ids)
+    return newer, more
+
+
+def index_latest():
+    return latest_ids('index', Post.objects.across_shards())
+
+
+def group_latest(group_id):
+    return latest_ids(
+        f'group:{group_id}',
+        Post.objects.filter(group_id=group_id).across_shards(),
+    )
+
+
+def post_feed_names(post):
+    names = ['index', f'author:{post.author_id}']
+    if post.group_id:
+        names.append(f'group:{post.group_id}')
+    return names
+
+
+def update_ids(key, change, timeout):
+    """Меняет закешированный список id под блокировкой.
+
+    Без неё два поста, созданные одновременно, прочитали бы один и тот
+    же список, и один id потерялся бы до истечения кеша. change получает
+    список и возвращает новый или None, если список надо удалить. Если
+    блокировку не удалось получить за UPDATE_LOCK_TIMEOUT, список
+    удаляется и перестраивается при следующем чтении.
+    """
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + UPDATE_LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, UPDATE_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            cache.delete(key)
+            return
+        time.sleep(UPDATE_POLL_INTERVAL)
+    try:
+        ids = cache.get(key)
+        if ids is None:
+            return
+        ids = change(ids)
+        if ids is None:
+            cache.delete(key)
+        else:
+            cache.set(key, ids, timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def prepend(key, pk, size, timeout):
+    def change(ids):
+        if pk in ids:
+            return ids
+        return [pk] + ids[:size - 1]
+    update_ids(key, change, timeout)
+
+
+def add_to_feeds(post):
+    # Новый пост всегда самый свежий, поэтому встаёт в начало списка.
+    for name in post_feed_names(post):
+        prepend(
+            feed_key(name), post.pk,
+            settings.FEED_CACHE_SIZE, settings.FEED_CACHE_TIMEOUT,
+        )
+        prepend(
+            latest_key(name), post.pk,
+            settings.LATEST_POSTS_SIZE, settings.LATEST_POSTS_TIMEOUT,
+        )
+
+
+def remove_from_feeds(post):
+    cache.delete_many([latest_key(name) for name in post_feed_names(post)])
+
+    def change(ids):
+        if post.pk not in ids:
+            return ids
+        if len(ids) >= settings.FEED_CACHE_SIZE:
+            # Полный список нечем дополнить — перестроим его при чтении.
+            return None
+        return [pk for pk in ids if pk != post.pk]
+
+    for name in post_feed_names(post):
+        update_ids(feed_key(name), change, settings.FEED_CACHE_TIMEOUT)
+
+
+def invalidate_group_feeds(*group_ids):
+    cache.delete_many([
+        key(f'group:{group_id}')
+        for group_id in group_ids if group_id
+        for key in (feed_key, latest_key)
+    ])
+
+
+def forget_post(post):
+    cache.delete_many(list(post_keys([post.pk])))
+
+
+def bump_objects_version():
+    """Сбрасывает кеш всех постов, например после смены имени автора."""
+    try:
+        cache.incr(OBJECTS_VERSION_KEY)
+    except ValueError:
+        cache.set(OBJECTS_VERSION_KEY, 1, timeout=None)
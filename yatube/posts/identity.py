@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from core import identity
+
+from .models import Group, User
+
+
+def username_key(username):
+    return f'posts:username:{username}'
+
+
+def get_user_or_404(request, username):
+    """Находит пользователя по username не больше одного раза за запрос.
+
+    Текущий пользователь запроса возвращается без обращения к БД.
+    Соответствие username → pk хранится в общем кеше, поэтому в новом
+    запросе пользователь читается по первичному ключу.
+    """
+    identity_map = identity.current()
+    user = identity_map.get_by(User, 'username', username)
+    if user is not None:
+        return user
+    if (request.user.is_authenticated
+            and request.user.username == username):
+        return identity_map.add_by(request.user, 'username')
+
+    pk = cache.get(username_key(username))
+    if pk is not None:
+        user = identity_map.get(User, pk)
+        if user is None:
+            user = User.objects.filter(pk=pk, username=username).first()
+    if user is None:
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise Http404('No User matches the given query.')
+        cache.set(
+            username_key(username), user.pk, settings.USERNAME_CACHE_TIMEOUT
+        )
+    return identity_map.add_by(user, 'username')
+
+
+def group_slug_key(slug):
+    return f'posts:group_slug:{slug}'
+
+
+def get_group_pk_or_404(slug):
+    """pk группы по slug из общего кеша, без обращения к БД."""
+    pk = cache.get(group_slug_key(slug))
+    if pk is None:
+        pk = Group.objects.filter(slug=slug).values_list(
+            'pk', flat=True
+        ).first()
+        if pk is None:
+            raise Http404('No Group matches the given query.')
+        cache.set(group_slug_key(slug), pk, settings.GROUP_SLUG_CACHE_TIMEOUT)
+    return pk
+
+
+def get_group_or_404(slug):
+    identity_map = identity.current()
+    group = identity_map.get_by(Group, 'slug', slug)
+    if group is None:
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            raise Http404('No Group matches the given query.')
+        group = identity_map.add_by(group, 'slug')
+    return group
+
+
+def forget_username(username):
+    cache.delete(username_key(username))
+
+
+def forget_group_slug(slug):
+    cache.delete(group_slug_key(slug))
@@ -0,0 +1,35 @@
+from sorl.thumbnail import get_thumbnail
+
+from core.jobs import job
+
+from . import notifications, services
+from .models import DeletionTask, Post
+
+# Те же параметры, что у {% thumbnail %} в шаблонах постов.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+@job('posts.run_deletion', priority=-10)
+def run_deletion(task_id):
+    claimed = DeletionTask.objects.filter(
+        pk=task_id, status=DeletionTask.PENDING
+    ).update(status=DeletionTask.RUNNING)
+    if claimed:
+        services.run_task(DeletionTask.objects.get(pk=task_id))
+
+
+@job('posts.make_thumbnail', priority=10)
+def make_thumbnail(post_id):
+    """Готовит миниатюру картинки поста до первого показа в ленте."""
+    try:
+        post = Post.objects.get_by_pk(post_id)
+    except Post.DoesNotExist:
+        return
+    if post.image:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+@job('posts.notify_followers')
+def notify_followers(post_id, author_id):
+    notifications.notify_followers(post_id, author_id)
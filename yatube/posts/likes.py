@@ -0,0 +1,145 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+
+from core.buffers import WriteBuffer
+from core.db import run_write
+
+from .models import Like, PostCounter
+
+# Размер пачки в одной транзакции: пары (user, post) попадают в IN.
+SAVE_BATCH_SIZE = 250
+
+
+def likes_key(post_id):
+    return f'posts:likes:{post_id}'
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def add_to_counters(deltas):
+    for post_id, delta in deltas.items():
+        if not delta:
+            continue
+        updated = PostCounter.objects.filter(post_id=post_id).update(
+            likes=F('likes') + delta
+        )
+        if not updated:
+            PostCounter.objects.create(post_id=post_id, likes=max(delta, 0))
+
+
+def save_batch(changes):
+    """Записывает пачку лайков и сдвигает счётчики на разницу.
+
+    Лайк засчитывается, только если пары ещё нет в таблице, снятие —
+    только если она есть, так что повторы не искажают счётчик.
+    """
+    existing = set(Like.objects.filter(
+        user_id__in={user_id for user_id, _ in changes},
+        post_id__in={post_id for _, post_id in changes},
+    ).values_list('user_id', 'post_id'))
+    added = [
+        key for key, liked in changes.items()
+        if liked and key not in existing
+    ]
+    removed = [
+        key for key, liked in changes.items()
+        if not liked and key in existing
+    ]
+    Like.objects.bulk_create(
+        [Like(user_id=user_id, post_id=post_id) for user_id, post_id in added]
+    )
+    for user_id, post_id in removed:
+        Like.objects.filter(user_id=user_id, post_id=post_id).delete()
+    deltas = Counter(post_id for _, post_id in added)
+    deltas.subtract(post_id for _, post_id in removed)
+    add_to_counters(deltas)
+    return deltas
+
+
+def save_likes(changes):
+    """Записывает накопленные лайки {(user_id, post_id): поставлен ли}."""
+    items = list(changes.items())
+    changed = set()
+    for batch in chunks(items, SAVE_BATCH_SIZE):
+        deltas = run_write('likes', save_batch, dict(batch))
+        changed.update(post_id for post_id, delta in deltas.items() if delta)
+    cache.delete_many([likes_key(post_id) for post_id in changed])
+
+
+buffer = WriteBuffer('likes', save_likes)
+
+
+def set_liked(user, post_id, liked=True):
+    # Повторные нажатия в пределах интервала сливаются в одно изменение.
+    buffer.add((user.pk, post_id), liked)
+
+
+def is_liked(user, post_id):
+    if not user.is_authenticated:
+        return False
+    pending = buffer.get((user.pk, post_id))
+    if pending is not None:
+        return pending
+    return Like.objects.filter(user=user, post_id=post_id).exists()
+
+
+def like_counts(ids):
+    """Число лайков постов {post_id: count} из кеша или PostCounter."""
+    keys = {likes_key(pk): pk for pk in ids}
+    counts = {
+        keys[key]: count for key, count in cache.get_many(list(keys)).items()
+    }
+    missing = [pk for pk in ids if pk not in counts]
+    if missing:
+        loaded = dict(PostCounter.objects.filter(
+            post_id__in=missing
+        ).values_list('post_id', 'likes'))
+        loaded = {pk: loaded.get(pk, 0) for pk in missing}
+        counts.update(loaded)
+        cache.set_many(
+            {likes_key(pk): count for pk, count in loaded.items()},
+            settings.LIKE_COUNT_TIMEOUT,
+        )
+    return counts
+
+
+def attach_counts(posts):
+    """Проставляет постам страницы like_count одним обращением к кешу."""
+    posts = list(posts)
+    counts = like_counts([post.pk for post in posts])
+    for post in posts:
+        post.like_count = counts[post.pk]
+    return posts
+
+
+def set_counters(post_ids, counts):
+    for post_id in post_ids:
+        updated = PostCounter.objects.filter(post_id=post_id).update(
+            likes=counts.get(post_id, 0)
+        )
+        if not updated and counts.get(post_id):
+            PostCounter.objects.create(post_id=post_id, likes=counts[post_id])
+
+
+def recount(post_ids):
+    """Пересчитывает счётчики постов по таблице лайков."""
+    for batch in chunks(list(post_ids), SAVE_BATCH_SIZE):
+        counts = dict(
+            Like.objects.filter(post_id__in=batch).values('post_id')
+            .annotate(count=Count('pk')).values_list('post_id', 'count')
+        )
+        run_write('likes', set_counters, batch, counts)
+        cache.delete_many([likes_key(post_id) for post_id in batch])
+
+
+def forget_posts(post_ids):
+    """Удаляет лайки и счётчики удалённых постов."""
+    Like.objects.filter(post_id__in=post_ids).delete()
+    PostCounter.objects.filter(post_id__in=post_ids).delete()
+    cache.delete_many([likes_key(post_id) for post_id in post_ids])
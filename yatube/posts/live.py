@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Comment
+
+
+def comments_version_key(post_id):
+    return f'posts:comments_version:{post_id}'
+
+
+def comments_version(post_id):
+    return cache.get(comments_version_key(post_id), 0)
+
+
+def bump_comments_version(post_id):
+    try:
+        cache.incr(comments_version_key(post_id))
+    except ValueError:
+        cache.set(comments_version_key(post_id), 1, timeout=None)
+
+
+def comments_after(post, cursor):
+    """Комментарии к посту с id больше cursor, от новых к старым.
+
+    Id комментариев растут и на шардах (make_pk), поэтому курсор —
+    id самого нового комментария, который уже есть у клиента.
+    """
+    return list(
+        Comment.objects.using(post._state.db)
+        .filter(post=post, pk__gt=cursor)
+        .select_related('author')
+    )
+
+
+def wait_for_comments(post, cursor, timeout):
+    """Ждёт до timeout секунд комментарии новее cursor.
+
+    Пока новых комментариев нет, раз в COMMENT_POLL_INTERVAL читается
+    только версия комментариев поста из кеша; к БД запрос идёт, когда
+    версия изменилась.
+    """
+    version = comments_version(post.pk)
+    comments = comments_after(post, cursor)
+    deadline = time.monotonic() + timeout
+    while not comments and time.monotonic() < deadline:
+        time.sleep(settings.COMMENT_POLL_INTERVAL)
+        current = comments_version(post.pk)
+        if current != version:
+            version = current
+            comments = comments_after(post, cursor)
+    return comments
@@ -0,0 +1,49 @@
+import datetime as dt
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from posts import sharding
+from posts.archive import archive_batch
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты старше POST_ARCHIVE_AFTER_DAYS дней вместе '
+        'с комментариями в архивные таблицы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Возраст поста в днях (по умолчанию '
+                 'POST_ARCHIVE_AFTER_DAYS).'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Выполнить VACUUM, чтобы вернуть освободившееся место.'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] or settings.POST_ARCHIVE_AFTER_DAYS
+        cutoff = timezone.now() - dt.timedelta(days=days)
+        total = 0
+        for alias in sharding.shards() or [DEFAULT_DB_ALIAS]:
+            old_posts = Post.objects.using(alias).filter(
+                pub_date__lt=cutoff
+            ).order_by('pk')
+            while True:
+                batch = list(old_posts[:options['batch_size']])
+                if not batch:
+                    break
+                archive_batch(batch, using=alias)
+                total += len(batch)
+                self.stdout.write(f'{alias}: перенесено постов: {total}')
+            if options['vacuum']:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('VACUUM')
+        self.stdout.write(f'Перенесено в архив постов: {total}.')
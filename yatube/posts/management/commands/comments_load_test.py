@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.models import Comment, Post, User
+
+from .warm_caches import build_environ
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест долгого опроса комментариев: --pollers клиентов '
+        'держат открытые запросы к одному посту, которые обслуживает пул '
+        'из --threads потоков (как один воркер gunicorn с gthread), а '
+        'писатель добавляет комментарий раз в --interval секунд. Выводит '
+        'число ответов и задержку доставки комментария до клиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pollers', type=int, default=100,
+                            help='Сколько клиентов держат открытый опрос.')
+        parser.add_argument('--threads', type=int, default=100,
+                            help='Потоков у воркера.')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность теста в секундах.')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Пауза между комментариями в секундах.')
+        parser.add_argument('--timeout', type=float, default=10,
+                            help='Параметр timeout каждого опроса.')
+        parser.add_argument('--host', default='localhost',
+                            help='Значение заголовка Host для запросов.')
+
+    def handle(self, *args, **options):
+        author = User.objects.create_user(
+            username=f'comments_load_test_{int(time.time())}'
+        )
+        post = Post.objects.create(text='Нагрузочный тест', author=author)
+        self.url = reverse('posts:comment_stream', args=[post.pk])
+        self.created = set()
+        self.delays = []
+        self.polls = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        stop = threading.Event()
+        handler = WSGIHandler()
+        try:
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                pollers = [
+                    threading.Thread(
+                        target=self.poll,
+                        args=(pool, handler, stop, options),
+                    )
+                    for _ in range(options['pollers'])
+                ]
+                for poller in pollers:
+                    poller.start()
+                self.write(post, author, stop, options)
+                stop.set()
+                for poller in pollers:
+                    poller.join()
+        finally:
+            Comment.all_objects.using(post._state.db).filter(
+                post=post
+            ).delete()
+            post.delete()
+            author.delete()
+
+        expected = len(self.created) * options['pollers']
+        self.stdout.write(
+            f'Клиентов: {options["pollers"]}, потоков: {options["threads"]}, '
+            f'комментариев: {len(self.created)}.\n'
+            f'Ответов: {self.polls}, ошибок: {self.errors}, доставлено '
+            f'комментариев: {len(self.delays)} из {expected}.\n'
+            f'Задержка доставки, с: p50 {percentile(self.delays, 0.5):.3f}, '
+            f'p95 {percentile(self.delays, 0.95):.3f}, '
+            f'max {max(self.delays, default=0):.3f}.'
+        )
+
+    def write(self, post, author, stop, options):
+        deadline = time.monotonic() + options['duration']
+        while time.monotonic() < deadline:
+            stop.wait(options['interval'])
+            comment = Comment.objects.create(
+                post=post, author=author, text='Комментарий'
+            )
+            self.created.add(comment.pk)
+
+    def poll(self, pool, handler, stop, options):
+        cursor = 0
+        # После остановки писателя клиент дочитывает последние комментарии.
+        while not (stop.is_set() and cursor >= max(self.created, default=0)):
+            url = f'{self.url}?after={cursor}&timeout={options["timeout"]}'
+            status, body = pool.submit(
+                self.fetch, handler, url, options['host']
+            ).result()
+            received = timezone.now()
+            with self.lock:
+                self.polls += 1
+                if not status.startswith('200'):
+                    self.errors += 1
+                    if stop.is_set():
+                        return
+                    continue
+                data = json.loads(body)
+                for comment in data['comments']:
+                    self.delays.append((
+                        received - parse_datetime(comment['created'])
+                    ).total_seconds())
+            cursor = data['cursor']
+
+    def fetch(self, handler, url, host):
+        status = []
+
+        def start_response(response_status, headers, exc_info=None):
+            status.append(response_status)
+
+        response = handler(build_environ(url, host), start_response)
+        try:
+            body = b''.join(response)
+        finally:
+            response.close()
+            close_old_connections()
+        return status[0], body
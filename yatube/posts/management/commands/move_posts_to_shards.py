@@ -0,0 +1,80 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+
+from core.models import Sequence
+from posts import dates, sharding
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты и комментарии из default на шарды POST_SHARDS '
+        'пакетами, сохраняя их id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError('Шарды не настроены: POST_SHARDS пуст.')
+        posts = Post.all_objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+        moved = 0
+        while True:
+            batch = list(posts[:options['batch_size']])
+            if not batch:
+                break
+            self.move(batch)
+            moved += len(batch)
+            self.stdout.write(f'Перенесено постов: {moved}')
+
+        self.advance_sequence(Post)
+        self.advance_sequence(Comment)
+        # Списки лент и закешированные страницы собраны из постов default.
+        cache.clear()
+        self.stdout.write(f'Готово, перенесено постов: {moved}.')
+
+    def move(self, batch):
+        comments = defaultdict(list)
+        for comment in Comment.all_objects.using(DEFAULT_DB_ALIAS).filter(
+            post__in=batch
+        ):
+            comments[comment.post_id].append(comment)
+
+        by_shard = defaultdict(list)
+        for post in batch:
+            by_shard[sharding.shard_for_author(post.author_id)].append(post)
+        for alias, posts in by_shard.items():
+            with transaction.atomic(using=alias):
+                Post.all_objects.using(alias).bulk_create(posts)
+                Comment.all_objects.using(alias).bulk_create([
+                    comment for post in posts for comment in comments[post.pk]
+                ])
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            Comment.all_objects.using(DEFAULT_DB_ALIAS).filter(
+                post__in=batch
+            ).delete()
+            Post.all_objects.using(DEFAULT_DB_ALIAS).filter(
+                pk__in=[post.pk for post in batch]
+            ).delete()
+        # Удаление из default вычло посты из помесячных счётчиков, хотя
+        # они никуда не исчезли.
+        dates.record_posts([post for post in batch if not post.is_deleted], 1)
+
+    def advance_sequence(self, model):
+        # Новые id не должны совпасть с перенесёнными.
+        highest = max(
+            model.all_objects.using(alias).aggregate(Max('pk'))['pk__max'] or 0
+            for alias in sharding.shards()
+        )
+        sequence, _ = Sequence.objects.get_or_create(
+            name=model._meta.label_lower
+        )
+        value = highest // len(sharding.shards()) + 1
+        if sequence.value < value:
+            sequence.value = value
+            sequence.save(update_fields=['value'])
@@ -0,0 +1,31 @@
+import datetime as dt
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import services
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пакетами посты и комментарии, помеченные удалёнными, '
+        'вместе с картинками постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Сколько дней хранить помеченные строки (по умолчанию '
+                 'PURGE_DELETED_AFTER_DAYS).'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = settings.PURGE_DELETED_AFTER_DAYS
+        before = timezone.now() - dt.timedelta(days=days)
+        posts, comments = services.purge_deleted(before)
+        self.stdout.write(
+            f'Удалено постов: {posts}, комментариев: {comments}.'
+        )
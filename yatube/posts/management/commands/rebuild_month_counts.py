@@ -0,0 +1,44 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from posts import sharding
+from posts.models import ArchivedPost, Post, PostMonthCount
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает помесячные счётчики постов авторов и групп '
+        'по горячим и архивным постам.'
+    )
+
+    def handle(self, *args, **options):
+        sources = [
+            Post.objects.using(alias)
+            for alias in sharding.shards() or [DEFAULT_DB_ALIAS]
+        ]
+        sources.append(ArchivedPost.objects.all())
+
+        totals = Counter()
+        for posts in sources:
+            for field in ('author', 'group'):
+                rows = posts.filter(**{f'{field}__isnull': False}).annotate(
+                    month=TruncMonth('pub_date')
+                ).values(field, 'month').annotate(
+                    total=Count('pk')
+                ).order_by()
+                for row in rows:
+                    month = timezone.localtime(row['month']).date()
+                    totals[(f'{field}_id', row[field], month)] += row['total']
+
+        with transaction.atomic():
+            PostMonthCount.objects.all().delete()
+            PostMonthCount.objects.bulk_create(
+                PostMonthCount(month=month, count=total, **{field: pk})
+                for (field, pk, month), total in totals.items()
+            )
+        self.stdout.write(f'Пересчитано счётчиков: {len(totals)}.')
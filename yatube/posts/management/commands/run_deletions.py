@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import services
+from posts.models import DeletionTask
+
+
+class Command(BaseCommand):
+    help = 'Выполняет удаления из очереди DeletionTask.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry', action='store_true',
+            help='Вернуть в очередь задачи с ошибкой и задачи, прерванные '
+                 'перезапуском процесса.'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry']:
+            DeletionTask.objects.filter(
+                status__in=(DeletionTask.FAILED, DeletionTask.RUNNING)
+            ).update(status=DeletionTask.PENDING, error='')
+        done = services.run_pending()
+        failed = DeletionTask.objects.filter(
+            status=DeletionTask.FAILED
+        ).count()
+        self.stdout.write(f'Выполнено задач: {done}, с ошибкой: {failed}.')
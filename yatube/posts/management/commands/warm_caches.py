@@ -0,0 +1,132 @@
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Count
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from posts.jobs import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+from posts.models import Group, Post, User
+
+
+def build_environ(url, host):
+    path, _, query = url.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'HTTP_HOST': host,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кеши после деплоя: запрашивает первые страницы ленты, '
+        'самые активные группы и профили самых популярных авторов через '
+        'WSGI-обработчик и заранее создаёт миниатюры для постов на них. '
+        'Имеет смысл, когда кеш общий для процессов (L2 в settings.CACHES).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3,
+                            help='Сколько страниц главной прогреть.')
+        parser.add_argument('--groups', type=int, default=10,
+                            help='Сколько самых активных групп прогреть.')
+        parser.add_argument('--profiles', type=int, default=10,
+                            help='Сколько профилей с наибольшим числом '
+                                 'подписчиков прогреть.')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Размер пула потоков.')
+        parser.add_argument('--host', default='localhost',
+                            help='Значение заголовка Host для запросов.')
+
+    def handle(self, *args, **options):
+        per_page = settings.NUM_OF_POSTS
+        targets = []
+        posts = Post.objects.select_related('author', 'group')
+        feed = posts.across_shards()
+        for page in range(1, options['pages'] + 1):
+            targets.append((
+                f"{reverse('posts:index')}?page={page}",
+                feed[(page - 1) * per_page:page * per_page],
+            ))
+
+        groups = Group.objects.annotate(
+            num_posts=Count('posts')
+        ).order_by('-num_posts')[:options['groups']]
+        for group in groups:
+            targets.append((
+                reverse('posts:group_list', args=[group.slug]),
+                feed.filter(group=group)[:per_page],
+            ))
+
+        authors = User.objects.annotate(
+            num_followers=Count('following')
+        ).order_by('-num_followers')[:options['profiles']]
+        for author in authors:
+            targets.append((
+                reverse('posts:profile', args=[author.username]),
+                posts.for_author(author)[:per_page],
+            ))
+
+        images = {
+            post.image.name: post.image
+            for _, page_posts in targets
+            for post in page_posts
+            if post.image
+        }
+        handler = WSGIHandler()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            thumbnails = list(pool.map(self.make_thumbnail, images.values()))
+            results = list(pool.map(
+                lambda url: self.fetch(handler, url, options['host']),
+                [url for url, _ in targets]
+            ))
+
+        failed = [(url, status) for url, status in results
+                  if not status.startswith('200')]
+        for url, status in failed:
+            self.stderr.write(f'{url}: {status}')
+        self.stdout.write(
+            f'Прогрето страниц: {len(results) - len(failed)} '
+            f'из {len(results)}, миниатюр: {sum(thumbnails)}.'
+        )
+
+    def fetch(self, handler, url, host):
+        status = []
+
+        def start_response(response_status, headers, exc_info=None):
+            status.append(response_status)
+
+        response = handler(build_environ(url, host), start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return url, status[0]
+
+    def make_thumbnail(self, image):
+        try:
+            get_thumbnail(image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+            return 1
+        except Exception as error:
+            self.stderr.write(f'{image.name}: {error}')
+            return 0
+        finally:
+            close_old_connections()
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_archivedpost_archivedcomment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostMonthCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='postmonthcount',
+            name='author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='month_counts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='postmonthcount',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='month_counts', to='posts.Group'),
+        ),
+        migrations.AddConstraint(
+            model_name='postmonthcount',
+            constraint=models.UniqueConstraint(fields=('author', 'month'), name='unique_author_month'),
+        ),
+        migrations.AddConstraint(
+            model_name='postmonthcount',
+            constraint=models.UniqueConstraint(fields=('group', 'month'), name='unique_group_month'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_like_postcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postcounter',
+            name='viewers',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='postcounter',
+            name='views',
+            field=models.IntegerField(default=0),
+        ),
+    ]
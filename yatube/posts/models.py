@@ -1,6 +1,11 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import UniqueConstraint
+from django.utils import timezone
+
+from . import sharding
 
 User = get_user_model()
 
@@ -14,7 +19,95 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(sharding.ShardedQuerySet):
+    """Запросы к постам с учётом шардирования.
+
+    Без шардов (POST_SHARDS пуст) методы сводятся к обычным запросам.
+    """
+
+    def for_author(self, author):
+        posts = self.filter(author=author)
+        if sharding.enabled():
+            return posts.using(sharding.shard_for_author(author.pk))
+        return posts
+
+    def across_shards(self):
+        # Запрос, уже привязанный к базе (for_author), остаётся на ней.
+        if not sharding.enabled() or self._db is not None:
+            return self
+        return sharding.ShardedFeed(
+            self.using(alias) for alias in sharding.shards()
+        )
+
+    def followed_by(self, user):
+        if not sharding.enabled():
+            return self.filter(author__following__user=user)
+        by_shard = defaultdict(list)
+        authors = Follow.objects.filter(user=user).values_list(
+            'author_id', flat=True
+        )
+        for author_id in authors:
+            by_shard[sharding.shard_for_author(author_id)].append(author_id)
+        return sharding.ShardedFeed(
+            self.using(alias).filter(author_id__in=ids)
+            for alias, ids in by_shard.items()
+        )
+
+    def pks(self, limit):
+        return list(self.values_list('pk', flat=True)[:limit])
+
+    def get_by_pk(self, pk):
+        if not sharding.enabled():
+            return self.get(pk=pk)
+        for alias in sharding.shards_for_pk(pk):
+            post = self.using(alias).filter(pk=pk).first()
+            if post is not None:
+                return post
+        raise self.model.DoesNotExist(f'Пост {pk} не найден на шардах.')
+
+    def in_bulk_across_shards(self, ids):
+        if not sharding.enabled():
+            return self.in_bulk(ids)
+        found = {}
+        by_shard = defaultdict(list)
+        for pk in ids:
+            by_shard[sharding.shards_for_pk(pk)[0]].append(pk)
+        for alias, pks in by_shard.items():
+            found.update(self.using(alias).in_bulk(pks))
+        for alias in sharding.shards():
+            missing = [pk for pk in ids if pk not in found]
+            if not missing:
+                break
+            found.update(self.using(alias).in_bulk(missing))
+        return found
+
+
+class LiveManager(models.Manager):
+    """Менеджер, который не показывает помеченные удалёнными строки.
+
+    Помеченные строки доступны через all_objects, пока их не удалит
+    команда purge_deleted.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class SoftDeleteModel(models.Model):
+    is_deleted = models.BooleanField(default=False, editable=False)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def soft_delete(self, using=None):
+        """Помечает строку удалённой, не трогая связанные объекты."""
+        self.is_deleted = True
+        self.deleted_at = timezone.now()
+        self.save(using=using, update_fields=['is_deleted', 'deleted_at'])
+
+    class Meta:
+        abstract = True
+
+
+class Post(SoftDeleteModel):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
@@ -35,14 +128,38 @@ class Post(models.Model):
         blank=True
     )
 
+    objects = LiveManager.from_queryset(PostQuerySet)()
+    all_objects = PostQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.text[:15]
 
     class Meta:
         ordering = ['-pub_date']
+        # Частичные индексы содержат только живые посты: ленты фильтруют
+        # is_deleted = 0 и не читают помеченные строки. Последний индекс
+        # нужен purge_deleted.
+        indexes = [
+            models.Index(
+                fields=['-pub_date'], name='post_live_date_idx',
+                condition=models.Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_group_date_idx',
+                condition=models.Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=['author', '-pub_date'], name='post_author_date_idx',
+                condition=models.Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=['deleted_at'], name='post_deleted_idx',
+                condition=models.Q(is_deleted=True),
+            ),
+        ]
 
 
-class Comment(models.Model):
+class Comment(SoftDeleteModel):
     text = models.TextField()
     post = models.ForeignKey(
         Post,
@@ -56,11 +173,24 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = LiveManager.from_queryset(sharding.ShardedQuerySet)()
+    all_objects = sharding.ShardedQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.text
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created'], name='comment_post_created_idx',
+                condition=models.Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=['deleted_at'], name='comment_deleted_idx',
+                condition=models.Q(is_deleted=True),
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -80,3 +210,227 @@ class Follow(models.Model):
             fields=['user', 'author'],
             name='unique_following'
         )
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый в архив командой archive_posts.
+
+    id совпадает с id исходного поста, поэтому старые ссылки продолжают
+    работать. Внешние ключи без ограничений в БД: архив не участвует
+    в каскадном удалении и чистится сигналами.
+    """
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_posts'
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.text[:15]
+
+    class Meta:
+        ordering = ['-pub_date']
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='archived_comments'
+    )
+    created = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return self.text
+
+    class Meta:
+        ordering = ['-created']
+
+
+class PostMonthCount(models.Model):
+    """Число постов автора или группы за месяц.
+
+    Задан ровно один из author и group. Счётчики меняются сигналами при
+    создании, переносе между группами и удалении постов и учитывают
+    архивные посты; пересчитать их с нуля можно командой
+    rebuild_month_counts.
+    """
+
+    author = models.ForeignKey(
+        User,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='month_counts'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='month_counts'
+    )
+    month = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f'{self.author or self.group} {self.month:%Y-%m}: {self.count}'
+
+    class Meta:
+        ordering = ['-month']
+        constraints = [
+            UniqueConstraint(
+                fields=['author', 'month'], name='unique_author_month'
+            ),
+            UniqueConstraint(
+                fields=['group', 'month'], name='unique_group_month'
+            ),
+        ]
+
+
+class DeletionTask(models.Model):
+    """Удаление объекта с большим каскадом, выполняемое пакетами."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершено'),
+        (FAILED, 'Ошибка'),
+    )
+    TARGET_CHOICES = (
+        ('post', 'Пост'),
+        ('user', 'Пользователь'),
+        ('group', 'Группа'),
+    )
+
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    object_id = models.IntegerField()
+    label = models.CharField(max_length=200)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.get_target_display()} {self.label}'
+
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, self.processed * 100 // self.total)
+
+    class Meta:
+        ordering = ['-created']
+
+
+class Notification(models.Model):
+    """Уведомление подписчику о новом посте автора.
+
+    post_id без внешнего ключа: пост может лежать на шарде.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    post_id = models.IntegerField()
+    is_read = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created']
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'post_id'], name='unique_notification'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created'], name='notification_user_idx'
+            ),
+            models.Index(
+                fields=['user'], name='notification_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+        ]
+
+
+class Like(models.Model):
+    """Лайк поста; уникальность пары не даёт засчитать лайк дважды.
+
+    post_id без внешнего ключа: пост может лежать на шарде.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes'
+    )
+    post_id = models.IntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['user', 'post_id'], name='unique_like'),
+        ]
+        indexes = [
+            models.Index(fields=['post_id'], name='like_post_idx'),
+        ]
+
+
+class PostCounter(models.Model):
+    """Денормализованные счётчики поста.
+
+    Обновляются пачками из буферов процесса (posts.likes,
+    posts.tracking), а не отдельным UPDATE posts_post на каждое действие.
+    viewers — скетч HyperLogLog уникальных зрителей (core.hll).
+    """
+
+    post_id = models.IntegerField(primary_key=True)
+    likes = models.IntegerField(default=0)
+    views = models.IntegerField(default=0)
+    viewers = models.BinaryField(default=b'')
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from core import routers
+from core.db import run_write
+
+from .models import Follow, Notification
+
+
+def unread_key(user_id):
+    return f'posts:notifications:unread:{user_id}'
+
+
+def unread_count(user):
+    """Число непрочитанных уведомлений: из кеша, при промахе — из БД.
+
+    Промах считается по основной базе: bump_unread прибавляет к
+    закешированному числу, и отставание реплики сохранилось бы на всё
+    время NOTIFICATION_COUNT_TIMEOUT.
+    """
+    count = cache.get(unread_key(user.pk))
+    if count is None:
+        with routers.primary():
+            count = Notification.objects.filter(
+                user=user, is_read=False
+            ).count()
+        cache.set(
+            unread_key(user.pk), count, settings.NOTIFICATION_COUNT_TIMEOUT
+        )
+    return count
+
+
+def bump_unread(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(unread_key(user_id))
+        except ValueError:
+            # Счётчика нет в кеше — его посчитает unread_count.
+            pass
+
+
+def mark_read(user):
+    run_write(
+        'notifications_read',
+        Notification.objects.filter(user=user, is_read=False).update,
+        is_read=True,
+    )
+    cache.set(unread_key(user.pk), 0, settings.NOTIFICATION_COUNT_TIMEOUT)
+
+
+def notify_followers(post_id, author_id):
+    """Раздаёт уведомление о посте подписчикам автора пакетами.
+
+    Подписки читаются по возрастанию pk по NOTIFICATION_BATCH_SIZE за
+    раз, каждый пакет уведомлений пишется одной короткой транзакцией.
+    Повторный запуск не создаёт дублей, но может завысить счётчик в кеше
+    до его истечения.
+    """
+    last_pk = 0
+    while True:
+        follows = list(
+            Follow.objects.filter(author_id=author_id, pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'user_id')
+            [:settings.NOTIFICATION_BATCH_SIZE]
+        )
+        if not follows:
+            return
+        last_pk = follows[-1][0]
+        user_ids = [user_id for _, user_id in follows]
+        run_write(
+            'notify_followers', Notification.objects.bulk_create,
+            [
+                Notification(
+                    user_id=user_id, author_id=author_id, post_id=post_id
+                )
+                for user_id in user_ids
+            ],
+            ignore_conflicts=True,
+        )
+        bump_unread(user_ids)
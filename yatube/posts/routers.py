@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import sharding
+
+
+class ShardRouter:
+    """Направляет посты и комментарии на шард автора поста.
+
+    Работает, только если задан POST_SHARDS. Шард определяется по
+    подсказке instance: пост пишется на шард своего автора, комментарий —
+    на шард своего поста, а author.posts и post.comments читаются с
+    нужного шарда. Запросы без подсказки маршрутизатор не решает: для
+    них есть методы PostQuerySet (for_author, across_shards, get_by_pk).
+    Для остальных моделей решение остаётся за следующими
+    маршрутизаторами из DATABASE_ROUTERS.
+    """
+
+    def db_for_read(self, model, **hints):
+        return self.shard(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self.shard(model, hints.get('instance'))
+
+    def shard(self, model, instance):
+        if not sharding.enabled() or instance is None:
+            return None
+        if model._meta.label_lower not in sharding.SHARDED_MODELS:
+            # Пользователи и группы постов с шарда лежат в основной базе.
+            if instance._state.db in sharding.shards():
+                return DEFAULT_DB_ALIAS
+            return None
+        label = instance._meta.label_lower
+        # У несохранённого объекта _state.db заполняется при присваивании
+        # внешних ключей и шард не означает.
+        if (label in sharding.SHARDED_MODELS
+                and not instance._state.adding and instance._state.db):
+            return instance._state.db
+        if label == 'posts.post':
+            return sharding.shard_for_author(instance.author_id)
+        if label == 'posts.comment':
+            post = instance._meta.get_field('post')
+            if post.is_cached(instance):
+                return self.shard(model, instance.post)
+            return sharding.shards_for_pk(instance.post_id)[0]
+        if (label == settings.AUTH_USER_MODEL.lower()
+                and model._meta.label_lower == 'posts.post'):
+            return sharding.shard_for_author(instance.pk)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not sharding.enabled():
+            return None
+        databases = {DEFAULT_DB_ALIAS, *sharding.shards()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
@@ -0,0 +1,303 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from sorl import thumbnail
+
+from core.db import run_write
+from core.jobs import enqueue
+
+from . import feeds, likes, sharding
+from .cache import bump_page_generation
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, DeletionTask, Follow, Group,
+    Like, Notification, Post, PostCounter, User
+)
+
+
+def post_databases():
+    return sharding.shards() or [DEFAULT_DB_ALIAS]
+
+
+def batches(queryset):
+    """Выдаёт pk строк запроса пакетами по DELETION_BATCH_SIZE.
+
+    Вызывающий удаляет или меняет каждый пакет, так что следующий
+    запрос читает уже новые строки.
+    """
+    while True:
+        pks = list(
+            queryset.values_list('pk', flat=True)
+            [:settings.DELETION_BATCH_SIZE]
+        )
+        if not pks:
+            return
+        yield pks
+
+
+def apply(queryset, pks, changes=None):
+    batch = queryset.model._base_manager.using(queryset.db).filter(
+        pk__in=pks
+    )
+    if changes is None:
+        batch.delete()
+    else:
+        batch.update(**changes)
+
+
+class Deletion:
+    """Шаги удаления одного объекта.
+
+    Каждый шаг — запрос, строки которого удаляются (или обновляются)
+    пакетами по DELETION_BATCH_SIZE в отдельных коротких транзакциях,
+    так что база не блокируется надолго. Последним шагом удаляется сам
+    объект: к этому времени его каскад уже пуст.
+    """
+
+    def __init__(self, task, obj):
+        self.task = task
+        self.obj = obj
+
+    def steps(self):
+        """Пары (queryset, изменения для update или None для delete)."""
+        raise NotImplementedError
+
+    def count(self):
+        return sum(queryset.count() for queryset, _ in self.steps()) + 1
+
+    def run(self):
+        for queryset, changes in self.steps():
+            for pks in batches(queryset):
+                run_write(
+                    'deletion', apply, queryset, pks, changes,
+                    using=queryset.db,
+                )
+                self.advance(len(pks))
+        run_write('deletion', self.obj.delete, using=self.obj._state.db)
+        self.finish()
+        self.advance(1)
+
+    def advance(self, count):
+        self.task.processed += count
+        DeletionTask.objects.filter(pk=self.task.pk).update(
+            processed=self.task.processed
+        )
+
+    def finish(self):
+        pass
+
+
+class PostDeletion(Deletion):
+    def steps(self):
+        return [
+            (Comment.all_objects.using(self.obj._state.db).filter(
+                post=self.obj
+            ), None),
+            (Like.objects.filter(post_id=self.obj.pk), None),
+            (PostCounter.objects.filter(post_id=self.obj.pk), None),
+        ]
+
+
+class UserDeletion(Deletion):
+    def run(self):
+        liked = list(Like.objects.filter(user=self.obj).values_list(
+            'post_id', flat=True
+        ))
+        # Лайки и счётчики постов пользователя лежат в default без
+        # внешнего ключа, так что каскад постов их не удалит. Их id
+        # собираются до удаления постов: после него узнать их уже нельзя,
+        # а id поста может достаться новому посту (make_pk).
+        for pks in likes.chunks(self.post_ids(), likes.SAVE_BATCH_SIZE):
+            run_write('deletion', likes.forget_posts, pks)
+        super().run()
+        # Лайки пользователя удалены пакетами, минуя счётчики.
+        likes.recount(liked)
+
+    def post_ids(self):
+        ids = [
+            pk
+            for alias in post_databases()
+            for pk in Post.all_objects.using(alias).filter(
+                author=self.obj
+            ).values_list('pk', flat=True)
+        ]
+        ids.extend(ArchivedPost.objects.filter(
+            author=self.obj
+        ).values_list('pk', flat=True))
+        return ids
+
+    def steps(self):
+        user = self.obj
+        steps = [
+            (Comment.all_objects.using(alias).filter(post__author=user), None)
+            for alias in post_databases()
+        ]
+        steps.append((Post.all_objects.for_author(user), None))
+        steps.extend(
+            (
+                Comment.all_objects.using(alias).filter(author=user)
+                .exclude(post__author=user),
+                None,
+            )
+            for alias in post_databases()
+        )
+        steps.extend([
+            (ArchivedComment.objects.filter(post__author=user), None),
+            (
+                ArchivedComment.objects.filter(author=user)
+                .exclude(post__author=user),
+                None,
+            ),
+            (ArchivedPost.objects.filter(author=user), None),
+            (Follow.objects.filter(user=user), None),
+            (Follow.objects.filter(author=user), None),
+            (Notification.objects.filter(user=user), None),
+            (Notification.objects.filter(author=user), None),
+            (Like.objects.filter(user=user), None),
+        ])
+        return steps
+
+
+class GroupDeletion(Deletion):
+    def steps(self):
+        group = self.obj
+        steps = [
+            (
+                Post.all_objects.using(alias).filter(group=group),
+                {'group': None},
+            )
+            for alias in post_databases()
+        ]
+        steps.append(
+            (ArchivedPost.objects.filter(group=group), {'group': None})
+        )
+        return steps
+
+    def finish(self):
+        # update() не вызывает сигналов, поэтому кеши сбрасываются здесь.
+        feeds.invalidate_group_feeds(self.obj.pk)
+        feeds.bump_objects_version()
+        bump_page_generation()
+
+
+DELETIONS = {
+    'post': (PostDeletion, Post),
+    'user': (UserDeletion, User),
+    'group': (GroupDeletion, Group),
+}
+
+
+def target_of(obj):
+    for target, (_, model) in DELETIONS.items():
+        if isinstance(obj, model):
+            return target
+    raise ValueError(f'Удаление {type(obj).__name__} не поддерживается.')
+
+
+def get_object(task):
+    model = DELETIONS[task.target][1]
+    if task.target == 'post':
+        return model.objects.get_by_pk(task.object_id)
+    return model.objects.get(pk=task.object_id)
+
+
+def schedule_deletion(obj):
+    """Ставит удаление объекта в очередь и возвращает DeletionTask.
+
+    Если DELETION_IN_BACKGROUND выключен, удаление выполняется сразу.
+    """
+    target = target_of(obj)
+    task = DeletionTask.objects.create(
+        target=target, object_id=obj.pk, label=str(obj)[:200]
+    )
+    task.total = DELETIONS[target][0](task, obj).count()
+    task.save(update_fields=['total'])
+    if settings.DELETION_IN_BACKGROUND:
+        enqueue('posts.run_deletion', task.pk)
+    else:
+        run_task(task)
+    return task
+
+
+def delete_post(post):
+    """Помечает пост удалённым; строки и картинку удалит purge_deleted."""
+    run_write('deletion', post.soft_delete, using=post._state.db)
+
+
+def delete_comment(comment):
+    run_write('deletion', comment.soft_delete, using=comment._state.db)
+
+
+def purge_deleted(before):
+    """Удаляет посты и комментарии, помеченные удалёнными до before.
+
+    Возвращает количество удалённых постов и комментариев. Картинки
+    постов и их миниатюры удаляются после удаления строк.
+    """
+    purged_posts = purged_comments = 0
+    for alias in post_databases():
+        comments = Comment.all_objects.using(alias)
+        posts = Post.all_objects.using(alias).filter(
+            is_deleted=True, deleted_at__lte=before
+        )
+        for queryset in (
+            comments.filter(is_deleted=True, deleted_at__lte=before),
+            comments.filter(
+                post__is_deleted=True, post__deleted_at__lte=before
+            ),
+        ):
+            for pks in batches(queryset):
+                run_write('purge', apply, queryset, pks, using=alias)
+                purged_comments += len(pks)
+        for pks in batches(posts):
+            images = list(
+                posts.filter(pk__in=pks).exclude(image='')
+                .values_list('image', flat=True)
+            )
+            run_write('purge', apply, posts, pks, using=alias)
+            run_write('purge', likes.forget_posts, pks)
+            for name in images:
+                thumbnail.delete(name)
+            purged_posts += len(pks)
+    return purged_posts, purged_comments
+
+
+def claim_next():
+    for task in DeletionTask.objects.filter(
+        status=DeletionTask.PENDING
+    ).order_by('pk'):
+        claimed = DeletionTask.objects.filter(
+            pk=task.pk, status=DeletionTask.PENDING
+        ).update(status=DeletionTask.RUNNING)
+        if claimed:
+            task.status = DeletionTask.RUNNING
+            return task
+    return None
+
+
+def run_task(task):
+    DeletionTask.objects.filter(pk=task.pk).update(
+        status=DeletionTask.RUNNING
+    )
+    try:
+        obj = get_object(task)
+    except (Post.DoesNotExist, User.DoesNotExist, Group.DoesNotExist):
+        obj = None
+    try:
+        if obj is not None:
+            DELETIONS[task.target][0](task, obj).run()
+    except Exception as error:
+        task.status = DeletionTask.FAILED
+        task.error = repr(error)
+    else:
+        task.status = DeletionTask.DONE
+    task.save(update_fields=['status', 'error', 'updated'])
+
+
+def run_pending():
+    """Выполняет все задачи из очереди, возвращает их количество."""
+    done = 0
+    while True:
+        task = claim_next()
+        if task is None:
+            return done
+        run_task(task)
+        done += 1
@@ -0,0 +1,119 @@
+import heapq
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+from django.conf import settings
+from django.db import models
+
+from core.db import next_value
+
+# Модели, строки которых живут на шардах. Комментарии хранятся на том же
+# шарде, что и пост, поэтому post.comments не выходит за пределы шарда.
+SHARDED_MODELS = ('posts.post', 'posts.comment')
+
+
+def enabled():
+    return bool(settings.POST_SHARDS)
+
+
+def shards():
+    return list(settings.POST_SHARDS)
+
+
+def shard_for_author(author_id):
+    aliases = shards()
+    return aliases[author_id % len(aliases)]
+
+
+def shards_for_pk(pk):
+    """Шарды в порядке поиска строки по первичному ключу.
+
+    Ключ, выданный make_pk, указывает на свой шард остатком от деления,
+    поэтому обычно хватает первого запроса. Остальные шарды проверяются
+    для строк, перенесённых командой move_posts_to_shards со старыми id.
+    """
+    aliases = shards()
+    first = aliases[pk % len(aliases)]
+    return [first] + [alias for alias in aliases if alias != first]
+
+
+def make_pk(model, using):
+    """Выдаёт первичный ключ, уникальный между шардами.
+
+    Номер берётся из общего счётчика в default и кодирует шард: остаток
+    от деления ключа на число шардов равен номеру шарда.
+    """
+    aliases = shards()
+    return next_value(model._meta.label_lower) * len(aliases) + (
+        aliases.index(using)
+    )
+
+
+class ShardedQuerySet(models.QuerySet):
+    """QuerySet моделей, которые хранятся на шардах."""
+
+    def create(self, **kwargs):
+        # Обычный create сохраняет в базу запроса, выбранную без объекта,
+        # а шард можно определить только по самому объекту.
+        if not enabled() or self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
+
+    def select_related(self, *fields):
+        # Авторы и группы лежат в default, и JOIN на шарде их не найдёт:
+        # связанные объекты догружаются отдельными запросами.
+        if enabled() and fields != (None,):
+            return self.prefetch_related(*fields)
+        return super().select_related(*fields)
+
+
+class ShardedFeed:
+    """Лента постов, собранная из запросов к нескольким шардам.
+
+    Каждый запрос должен быть отсортирован по убыванию pub_date. Для
+    среза [start:stop] с каждого шарда читается не больше stop постов,
+    и потоки сливаются по дате. Поддерживает протокол Paginator: count()
+    и срезы.
+    """
+
+    def __init__(self, querysets):
+        self.querysets = list(querysets)
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        parts = [list(queryset[:stop]) for queryset in self.querysets]
+        merged = heapq.merge(
+            *parts, key=attrgetter('pub_date'), reverse=True
+        )
+        return list(islice(merged, start, stop))
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def select_related(self, *fields):
+        return ShardedFeed(
+            queryset.select_related(*fields) for queryset in self.querysets
+        )
+
+    def filter(self, *args, **kwargs):
+        return ShardedFeed(
+            queryset.filter(*args, **kwargs) for queryset in self.querysets
+        )
+
+    def pks(self, limit):
+        parts = [
+            list(queryset.values_list('pub_date', 'pk')[:limit])
+            for queryset in self.querysets
+        ]
+        merged = heapq.merge(*parts, key=itemgetter(0), reverse=True)
+        return [pk for _, pk in islice(merged, limit)]
@@ -0,0 +1,209 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import dates, feeds, jobs, live, sharding
+from .cache import bump_page_generation
+from .identity import forget_group_slug, forget_username
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Group, Post, User
+)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def invalidate_pages(sender, **kwargs):
+    bump_page_generation()
+
+
+@receiver(post_save, sender=User)
+def invalidate_pages_on_user_change(sender, created=False,
+                                    update_fields=None, **kwargs):
+    # Нового пользователя ещё нет ни на одной странице, а вход обновляет
+    # только last_login — в обоих случаях страницы не меняются.
+    if created:
+        return
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_page_generation()
+    feeds.bump_objects_version()
+
+
+@receiver(post_save, sender=Group)
+def invalidate_posts_on_group_change(sender, **kwargs):
+    feeds.bump_objects_version()
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, using, **kwargs):
+    if instance.pk:
+        (
+            instance.previous_group_id,
+            instance.was_deleted,
+            instance.previous_image,
+        ) = (
+            Post.all_objects.using(using).filter(pk=instance.pk)
+            .values_list('group_id', 'is_deleted', 'image').first()
+            or (None, False, '')
+        )
+
+
+def tombstoned(instance):
+    """Пост только что помечен удалённым."""
+    return instance.is_deleted and not getattr(instance, 'was_deleted', True)
+
+
+@receiver(post_save, sender=Post)
+def update_feeds_on_save(sender, instance, created, **kwargs):
+    if created:
+        feeds.add_to_feeds(instance)
+        return
+    if tombstoned(instance):
+        feeds.remove_from_feeds(instance)
+    feeds.forget_post(instance)
+    previous_group_id = getattr(instance, 'previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        feeds.invalidate_group_feeds(previous_group_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def update_feeds_on_delete(sender, instance, **kwargs):
+    feeds.remove_from_feeds(instance)
+    feeds.forget_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def make_thumbnail_on_save(sender, instance, created, using, raw=False,
+                           **kwargs):
+    # Задача ставится после фиксации, иначе исполнитель может не найти пост.
+    if raw or not instance.image:
+        return
+    if created or instance.image.name != getattr(
+        instance, 'previous_image', None
+    ):
+        transaction.on_commit(
+            lambda: jobs.make_thumbnail.delay(instance.pk), using=using
+        )
+
+
+@receiver(post_save, sender=Post)
+def notify_followers_on_create(sender, instance, created, using, raw=False,
+                               **kwargs):
+    if created and not raw:
+        transaction.on_commit(
+            lambda: jobs.notify_followers.delay(
+                instance.pk, instance.author_id
+            ),
+            using=using,
+        )
+
+
+@receiver(post_save, sender=Post)
+def update_month_counts_on_save(sender, instance, created, **kwargs):
+    if created:
+        dates.record_posts([instance], 1)
+        return
+    if tombstoned(instance):
+        dates.record_posts([instance], -1)
+        return
+    previous_group_id = getattr(instance, 'previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        dates.move_group(instance, previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def update_month_counts_on_delete(sender, instance, **kwargs):
+    # Помеченный пост вычтен из счётчиков ещё при пометке.
+    if not getattr(instance, 'is_deleted', False):
+        dates.record_posts([instance], -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comments_version(sender, instance, **kwargs):
+    live.bump_comments_version(instance.post_id)
+
+
+@receiver(pre_save, sender=User)
+def forget_renamed_username(sender, instance, update_fields=None, **kwargs):
+    if not instance.pk:
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(
+        'username', flat=True
+    ).first()
+    if previous is not None and previous != instance.username:
+        forget_username(previous)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_username(sender, instance, **kwargs):
+    forget_username(instance.username)
+
+
+@receiver(pre_save, sender=Group)
+def forget_renamed_group_slug(sender, instance, update_fields=None, **kwargs):
+    if not instance.pk:
+        return
+    if update_fields is not None and 'slug' not in update_fields:
+        return
+    previous = Group.objects.filter(pk=instance.pk).values_list(
+        'slug', flat=True
+    ).first()
+    if previous is not None and previous != instance.slug:
+        forget_group_slug(previous)
+
+
+@receiver(post_delete, sender=Group)
+def forget_deleted_group_slug(sender, instance, **kwargs):
+    forget_group_slug(instance.slug)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def assign_sharded_pk(sender, instance, using, raw=False, **kwargs):
+    if instance.pk is None and not raw and using in sharding.shards():
+        instance.pk = sharding.make_pk(sender, using)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_posts(sender, instance, **kwargs):
+    # Каскадное удаление Django работает в пределах одной базы, поэтому
+    # посты и комментарии пользователя на шардах удаляются отдельно.
+    if not sharding.enabled():
+        return
+    Post.all_objects.for_author(instance).delete()
+    for alias in sharding.shards():
+        Comment.all_objects.using(alias).filter(author=instance).delete()
+
+
+@receiver(pre_delete, sender=Group)
+def detach_sharded_posts(sender, instance, **kwargs):
+    if not sharding.enabled():
+        return
+    for alias in sharding.shards():
+        Post.all_objects.using(alias).filter(group=instance).update(
+            group=None
+        )
+    feeds.bump_objects_version()
+
+
+@receiver(pre_delete, sender=User)
+def delete_archived_posts(sender, instance, **kwargs):
+    # Архив связан с пользователями без каскада в БД.
+    ArchivedPost.objects.filter(author=instance).delete()
+    ArchivedComment.objects.filter(author=instance).delete()
+
+
+@receiver(pre_delete, sender=Group)
+def detach_archived_posts(sender, instance, **kwargs):
+    ArchivedPost.objects.filter(group=instance).update(group=None)
@@ -0,0 +1,91 @@
+import datetime as dt
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import ChainedFeed
+from ..models import ArchivedComment, ArchivedPost, Comment, Post
+
+User = get_user_model()
+
+
+class ArchivePostsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test_author')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.fresh = Post.objects.create(text='Свежий пост', author=self.user)
+        self.old = Post.objects.create(text='Старый пост', author=self.user)
+        Post.objects.filter(pk=self.old.pk).update(
+            pub_date=timezone.now() - dt.timedelta(days=400)
+        )
+        Comment.objects.create(
+            text='Старый комментарий', post=self.old, author=self.user
+        )
+        call_command('archive_posts', days=365, stdout=io.StringIO())
+
+    def test_old_posts_are_moved_to_archive(self):
+        """Старые посты с комментариями переносятся в архив."""
+        self.assertFalse(Post.objects.filter(pk=self.old.pk).exists())
+        self.assertTrue(Post.objects.filter(pk=self.fresh.pk).exists())
+        archived = ArchivedPost.objects.get(pk=self.old.pk)
+        self.assertEqual(archived.text, 'Старый пост')
+        self.assertEqual(
+            list(archived.comments.values_list('text', flat=True)),
+            ['Старый комментарий'],
+        )
+
+    def test_post_detail_falls_back_to_archive(self):
+        """Архивный пост открывается по прежнему адресу без формы."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.old.pk,))
+        )
+        self.assertContains(response, 'Старый пост')
+        self.assertContains(response, 'Старый комментарий')
+        self.assertTrue(response.context['is_archived'])
+        self.assertNotContains(
+            response, reverse('posts:add_comment', args=(self.old.pk,))
+        )
+        self.assertEqual(response.context['post_count'], 2)
+
+    def test_profile_lists_archived_posts_last(self):
+        response = self.client.get(
+            reverse('posts:profile', args=(self.user.username,))
+        )
+        self.assertEqual(response.context['post_count'], 2)
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.fresh.pk, self.old.pk],
+        )
+
+    def test_index_skips_archived_posts(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.fresh.pk],
+        )
+
+    def test_deleting_author_removes_archive(self):
+        self.user.delete()
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(ArchivedComment.objects.exists())
+
+
+class ListFeed(list):
+    def count(self):
+        return len(self)
+
+
+class ChainedFeedTest(SimpleTestCase):
+    def test_slices_cross_feed_boundary(self):
+        feed = ChainedFeed(ListFeed([1, 2, 3]), ListFeed([4, 5]))
+        self.assertEqual(feed.count(), 5)
+        self.assertEqual(feed[2:4], [3, 4])
+        self.assertEqual(feed[3:10], [4, 5])
+        self.assertEqual(feed[0], 1)
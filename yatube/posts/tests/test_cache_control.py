@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class CacheControlHeadersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CacheControlHeadersTest.user)
+
+    def policy_pages(self):
+        """URL для каждой политики из CACHE_CONTROL_POLICIES."""
+        post = CacheControlHeadersTest.post
+        group = post.group.slug
+        author = post.author.username
+        year, month = post.pub_date.year, post.pub_date.month
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse('posts:group_list', args=[group]),
+            'posts:profile': reverse('posts:profile', args=[author]),
+            'posts:post_detail': reverse(
+                'posts:post_detail', args=[post.pk]
+            ),
+            'posts:group_month': reverse(
+                'posts:group_month', args=[group, year, month]
+            ),
+            'posts:profile_month': reverse(
+                'posts:profile_month', args=[author, year, month]
+            ),
+            'posts:index_new_posts': reverse('posts:index_new_posts'),
+            'posts:group_new_posts': reverse(
+                'posts:group_new_posts', args=[group]
+            ),
+        }
+
+    def header_parts(self, value):
+        return {part.strip() for part in value.split(',')}
+
+    def test_every_policy_is_tested(self):
+        self.assertEqual(
+            set(self.policy_pages()), set(settings.CACHE_CONTROL_POLICIES)
+        )
+
+    def public_headers(self, name):
+        policy = settings.CACHE_CONTROL_POLICIES[name]
+        return {'public'} | {
+            f"{key.replace('_', '-')}={value}"
+            for key, value in policy.items()
+        }
+
+    def test_anonymous_headers(self):
+        """Анонимам страницы отдаются как public с политикой URL."""
+        for name, url in self.policy_pages().items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    self.header_parts(response['Cache-Control']),
+                    self.public_headers(name),
+                )
+                if name in settings.SHARED_PAGE_VIEWS:
+                    self.assertFalse(response.has_header('Vary'))
+                else:
+                    self.assertEqual(response['Vary'], 'Cookie')
+
+    def test_authenticated_headers(self):
+        """Авторизованным страницы отдаются как private, no-cache.
+
+        Общие страницы одинаковы для всех и остаются public.
+        """
+        for name, url in self.policy_pages().items():
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                if name in settings.SHARED_PAGE_VIEWS:
+                    self.assertEqual(
+                        self.header_parts(response['Cache-Control']),
+                        self.public_headers(name),
+                    )
+                    self.assertFalse(response.has_header('Vary'))
+                    continue
+                self.assertEqual(
+                    response['Cache-Control'], 'private, no-cache'
+                )
+                self.assertEqual(response['Vary'], 'Cookie')
+
+    def test_pages_without_policy(self):
+        """Страницы без политики и ошибки не получают Cache-Control."""
+        urls = [
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+            reverse('posts:profile', args=['nobody']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertFalse(response.has_header('Cache-Control'))
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentFormCsrfTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client(enforce_csrf_checks=True)
+        self.authorized_client.force_login(CommentFormCsrfTest.user)
+
+    def test_post_detail_has_no_per_user_token(self):
+        """Страница поста не содержит токен и не ставит CSRF-cookie."""
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, reverse('core:csrf_token'))
+        self.assertNotContains(response, 'name="csrfmiddlewaretoken" value')
+        self.assertNotIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+    def test_comment_with_lazy_token(self):
+        """Комментарий отправляется с токеном, полученным отдельно."""
+        response = self.authorized_client.get(reverse('core:csrf_token'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        token = response.json()['token']
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Комментарий', 'csrfmiddlewaretoken': token},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Comment.objects.filter(text='Комментарий').exists())
@@ -0,0 +1,142 @@
+import datetime as dt
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import dates
+from ..archive import archive_batch
+from ..models import Group, Post, PostMonthCount
+
+User = get_user_model()
+
+
+class MonthCountsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_author')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        self.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_group',
+            description='Тестовое описание',
+        )
+        self.month = dates.month_start(timezone.now())
+
+    def count(self, **owner):
+        row = PostMonthCount.objects.filter(month=self.month, **owner).first()
+        return row.count if row else 0
+
+    def test_counts_follow_create_move_and_delete(self):
+        """Счётчики меняются при создании, переносе и удалении поста."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        Post.objects.create(text='Без группы', author=self.user)
+        self.assertEqual(self.count(author=self.user), 2)
+        self.assertEqual(self.count(group=self.group), 1)
+
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.count(group=self.group), 0)
+        self.assertEqual(self.count(group=self.other_group), 1)
+
+        post.delete()
+        self.assertEqual(self.count(author=self.user), 1)
+        self.assertEqual(self.count(group=self.other_group), 0)
+
+    def test_archived_posts_stay_counted(self):
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        archive_batch([post])
+        self.assertEqual(self.count(author=self.user), 1)
+        self.assertEqual(self.count(group=self.group), 1)
+
+    def test_rebuild_matches_incremental_counts(self):
+        for group in (self.group, self.group, None):
+            Post.objects.create(text='Пост', author=self.user, group=group)
+        expected = set(PostMonthCount.objects.values_list(
+            'author', 'group', 'month', 'count'
+        ))
+        PostMonthCount.objects.all().delete()
+        call_command('rebuild_month_counts', stdout=io.StringIO())
+        self.assertEqual(set(PostMonthCount.objects.values_list(
+            'author', 'group', 'month', 'count'
+        )), expected)
+
+
+class MonthArchiveViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.march = Post.objects.create(
+            text='Мартовский пост', author=cls.user, group=cls.group
+        )
+        cls.april = Post.objects.create(
+            text='Апрельский пост', author=cls.user, group=cls.group
+        )
+        for post, month in ((cls.march, 3), (cls.april, 4)):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.make_aware(dt.datetime(2021, month, 15))
+            )
+        call_command('rebuild_month_counts', stdout=io.StringIO())
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_archive_lists_months(self):
+        response = self.client.get(
+            reverse('posts:group_archive', args=(self.group.slug,))
+        )
+        year, months = response.context['years'][0]
+        self.assertEqual(year, 2021)
+        self.assertEqual(
+            [(row.month.month, row.count) for row in months], [(4, 1), (3, 1)]
+        )
+
+    def test_month_page_shows_only_that_month(self):
+        """Страница месяца показывает только посты этого месяца."""
+        for name, args in (
+            ('posts:group_month', (self.group.slug, 2021, 3)),
+            ('posts:profile_month', (self.user.username, 2021, 3)),
+        ):
+            response = self.client.get(reverse(name, args=args))
+            self.assertEqual(
+                list(response.context['page_obj']), [self.march]
+            )
+
+    def test_empty_month_is_not_found(self):
+        for args in ((2021, 5), (2021, 13)):
+            response = self.client.get(
+                reverse('posts:group_month', args=(self.group.slug, *args))
+            )
+            self.assertEqual(response.status_code, 404)
+
+    def test_month_query_uses_index(self):
+        """Выборка постов месяца — диапазонный проход по индексу."""
+        start, end = dates.month_bounds(2021, 3)
+        query = Post.objects.filter(
+            group=self.group, pub_date__gte=start, pub_date__lt=end
+        )[:10].query
+        sql, params = query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('post_group_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
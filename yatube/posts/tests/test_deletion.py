@@ -0,0 +1,148 @@
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+
+from .. import services
+from ..models import (
+    ArchivedPost, Comment, DeletionTask, Follow, Group, Post
+)
+
+User = get_user_model()
+
+
+@override_settings(DELETION_IN_BACKGROUND=False, DELETION_BATCH_SIZE=2)
+class DeletionServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='prolific')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='big-group', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {n}', author=self.author, group=self.group
+            )
+            for n in range(5)
+        ]
+        for post in self.posts:
+            Comment.objects.create(
+                text='Комментарий', post=post, author=self.reader
+            )
+        Comment.objects.create(
+            text='Свой', post=self.posts[0], author=self.author
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_user_deletion_removes_cascade_in_batches(self):
+        """Пользователь удаляется вместе с постами и комментариями."""
+        task = services.schedule_deletion(self.author)
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.DONE)
+        # 6 комментариев, 5 постов, подписка и сам пользователь.
+        self.assertEqual(task.total, 13)
+        self.assertEqual(task.processed, task.total)
+        self.assertEqual(task.progress, 100)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertTrue(User.objects.filter(pk=self.reader.pk).exists())
+
+    def test_group_deletion_detaches_posts(self):
+        ArchivedPost.objects.create(
+            id=1000, text='Архив', author=self.author, group=self.group,
+            pub_date=self.posts[0].pub_date,
+        )
+        task = services.schedule_deletion(self.group)
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.DONE)
+        self.assertEqual(task.processed, 7)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 5)
+        self.assertIsNone(ArchivedPost.objects.get(pk=1000).group)
+
+    @override_settings(DELETION_IN_BACKGROUND=True)
+    def test_background_deletion_goes_through_job_queue(self):
+        task = services.schedule_deletion(self.author)
+        self.assertEqual(
+            Job.objects.get().name, 'posts.run_deletion'
+        )
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.PENDING)
+        jobs.run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.DONE)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+
+    def test_missing_object_finishes_task(self):
+        task = DeletionTask.objects.create(target='group', object_id=999)
+        services.run_task(task)
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.DONE)
+
+    def test_failure_is_recorded(self):
+        task = DeletionTask.objects.create(
+            target='user', object_id=self.author.pk
+        )
+        with mock.patch.object(
+            services, 'run_write', side_effect=RuntimeError('locked')
+        ):
+            services.run_task(task)
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.FAILED)
+        self.assertIn('locked', task.error)
+
+    def test_run_deletions_command_processes_queue(self):
+        DeletionTask.objects.create(target='user', object_id=self.author.pk)
+        out = io.StringIO()
+        call_command('run_deletions', stdout=out)
+        self.assertIn('Выполнено задач: 1', out.getvalue())
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+
+
+@override_settings(DELETION_IN_BACKGROUND=False)
+class PostDeleteViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.post = Post.objects.create(text='Удаляемый', author=self.author)
+        Comment.objects.create(
+            text='Комментарий', post=self.post, author=self.other
+        )
+        self.url = reverse('posts:post_delete', args=(self.post.pk,))
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_get_shows_confirmation(self):
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, 'posts/post_delete.html')
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_author_deletes_post(self):
+        """Пост помечается удалённым, строки удалит purge_deleted."""
+        response = self.client.post(self.url)
+        self.assertRedirects(
+            response, reverse('posts:profile', args=('author',))
+        )
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Post.all_objects.get(pk=self.post.pk).is_deleted)
+        self.assertFalse(DeletionTask.objects.exists())
+
+    def test_other_user_cannot_delete(self):
+        client = Client()
+        client.force_login(self.other)
+        response = client.post(self.url)
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
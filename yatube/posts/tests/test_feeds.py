@@ -0,0 +1,117 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feeds
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(FEED_CACHE_TIMEOUT=300, FEED_CACHE_SIZE=20)
+class CachedFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_group',
+            description='Тестовое описание',
+        )
+        for i in range(15):
+            Post.objects.create(
+                text='Тестовый пост' + str(i),
+                author=cls.user,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def feed_ids(self, feed):
+        return [post.pk for post in feed[:feed.count()]]
+
+    def test_pages_match_database_order(self):
+        """Страницы ленты совпадают с выборкой из БД."""
+        response = self.guest_client.get(reverse('posts:index') + '?page=2')
+        expected = list(Post.objects.order_by('-pub_date')[10:15])
+        self.assertEqual(response.context['page_obj'].object_list, expected)
+        self.assertEqual(response.context['page_obj'].paginator.count, 15)
+
+    def test_warm_feed_costs_no_queries(self):
+        """Повторное чтение страницы не обращается к БД."""
+        feeds.index_feed()[0:10]
+        with self.assertNumQueries(0):
+            feeds.index_feed()[0:10]
+
+    def test_cold_posts_loaded_by_primary_key(self):
+        """Промахи кеша постов дочитываются одним запросом."""
+        feed = feeds.index_feed()
+        feed.ids()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(feed[0:10]), 10)
+
+    def test_create_and_delete_update_feeds(self):
+        """Создание и удаление поста обновляют закешированные ленты."""
+        self.feed_ids(feeds.index_feed())
+        self.feed_ids(feeds.group_feed(self.group))
+        post = Post.objects.create(
+            text='Новый пост', author=self.user, group=self.group
+        )
+        self.assertEqual(feeds.index_feed().ids()[0], post.pk)
+        self.assertEqual(feeds.group_feed(self.group).ids()[0], post.pk)
+        post.delete()
+        self.assertNotIn(post.pk, feeds.index_feed().ids())
+        self.assertNotIn(post.pk, feeds.author_feed(self.user).ids())
+
+    def test_concurrent_updates_keep_both_ids(self):
+        """Список, который меняет другой процесс, не теряет новый id."""
+        key = feeds.feed_key('test')
+        cache.set(key, [1], 300)
+        # Другой процесс держит блокировку и добавляет в список id 2.
+        cache.add(f'{key}:lock', 1, feeds.UPDATE_LOCK_TIMEOUT)
+        thread = threading.Thread(
+            target=feeds.prepend, args=(key, 3, 10, 300)
+        )
+        thread.start()
+        thread.join(0.1)
+        cache.set(key, [2, 1], 300)
+        cache.delete(f'{key}:lock')
+        thread.join()
+        self.assertEqual(cache.get(key), [3, 2, 1])
+
+    def test_group_change_moves_post(self):
+        """Смена группы переносит пост между лентами групп."""
+        post = Post.objects.filter(group=self.group).first()
+        self.feed_ids(feeds.group_feed(self.group))
+        self.feed_ids(feeds.group_feed(self.other_group))
+        post.group = self.other_group
+        post.save()
+        self.assertNotIn(post.pk, feeds.group_feed(self.group).ids())
+        self.assertIn(post.pk, feeds.group_feed(self.other_group).ids())
+
+    def test_edit_refreshes_cached_post(self):
+        """Редактирование поста сбрасывает его копию в кеше."""
+        post = Post.objects.first()
+        feeds.index_feed()[0:10]
+        post.text = 'Исправленный текст'
+        post.save()
+        self.assertEqual(feeds.index_feed()[0:1][0].text, 'Исправленный текст')
+
+    @override_settings(FEED_CACHE_SIZE=5)
+    def test_deep_pages_fall_back_to_query(self):
+        """Страницы за пределами окна читаются запросом к БД."""
+        feed = feeds.index_feed()
+        self.assertEqual(feed.count(), 15)
+        expected = list(Post.objects.order_by('-pub_date')[10:15])
+        self.assertEqual(feed[10:15], expected)
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core import identity
+
+from ..identity import get_group_or_404, get_user_or_404
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class IdentityMapTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        cls.reader = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+        for i in range(3):
+            Comment.objects.create(
+                text='Комментарий' + str(i), post=cls.post, author=cls.reader
+            )
+
+    def setUp(self):
+        cache.clear()
+        identity.activate()
+        self.addCleanup(identity.deactivate)
+        self.request = RequestFactory().get('/')
+        self.request.user = IdentityMapTest.reader
+
+    def test_user_fetched_once_per_request(self):
+        """Пользователь читается из БД один раз за запрос."""
+        with self.assertNumQueries(1):
+            first = get_user_or_404(self.request, 'test_author')
+            second = get_user_or_404(self.request, 'test_author')
+        self.assertIs(first, second)
+
+    def test_request_user_not_fetched(self):
+        """Текущий пользователь берётся из запроса без запроса к БД."""
+        with self.assertNumQueries(0):
+            self.assertIs(
+                get_user_or_404(self.request, 'test_user'), self.request.user
+            )
+
+    def test_username_resolved_by_pk_across_requests(self):
+        """В новом запросе пользователь читается по pk из кеша."""
+        get_user_or_404(self.request, 'test_author')
+        identity.activate()
+        with self.assertNumQueries(1) as context:
+            get_user_or_404(self.request, 'test_author')
+        self.assertIn('"id" =', context.captured_queries[0]['sql'])
+
+    def test_rename_invalidates_username(self):
+        """Переименование сбрасывает закешированный username."""
+        user = User.objects.create_user(username='old_name')
+        get_user_or_404(self.request, 'old_name')
+        user.username = 'new_name'
+        user.save()
+        identity.activate()
+        with self.assertRaises(Http404):
+            get_user_or_404(self.request, 'old_name')
+        self.assertEqual(get_user_or_404(self.request, 'new_name'), user)
+
+    def test_group_fetched_once_per_request(self):
+        """Группа читается из БД один раз за запрос."""
+        with self.assertNumQueries(1):
+            get_group_or_404('test_group')
+            get_group_or_404('test_group')
+
+    def test_post_detail_shares_comment_authors(self):
+        """Авторы комментариев на странице поста — один объект."""
+        client = Client()
+        response = client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        authors = {id(c.author) for c in response.context['comments']}
+        self.assertEqual(len(authors), 1)
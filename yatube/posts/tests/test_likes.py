@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import likes, services
+from ..models import Like, Post, PostCounter
+
+User = get_user_model()
+
+
+class LikesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        likes.buffer.reset_process()
+        self.author = User.objects.create_user(username='author')
+        self.users = [
+            User.objects.create_user(username=f'user{n}') for n in range(3)
+        ]
+        self.post = Post.objects.create(text='Пост', author=self.author)
+
+    def tearDown(self):
+        likes.buffer.reset_process()
+
+    def count(self):
+        return likes.like_counts([self.post.pk])[self.post.pk]
+
+    def test_likes_are_written_in_one_flush(self):
+        for user in self.users:
+            likes.set_liked(user, self.post.pk)
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(self.count(), 0)
+        likes.buffer.flush()
+        self.assertEqual(Like.objects.count(), 3)
+        self.assertEqual(
+            PostCounter.objects.get(post_id=self.post.pk).likes, 3
+        )
+        # Запись сбросила закешированный счётчик.
+        self.assertEqual(self.count(), 3)
+
+    def test_repeated_likes_counted_once(self):
+        user = self.users[0]
+        likes.set_liked(user, self.post.pk)
+        likes.buffer.flush()
+        likes.set_liked(user, self.post.pk)
+        likes.buffer.flush()
+        self.assertEqual(self.count(), 1)
+
+    def test_last_action_within_interval_wins(self):
+        user = self.users[0]
+        likes.set_liked(user, self.post.pk)
+        likes.set_liked(user, self.post.pk, liked=False)
+        likes.buffer.flush()
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(self.count(), 0)
+
+    def test_unlike(self):
+        for user in self.users:
+            likes.set_liked(user, self.post.pk)
+        likes.buffer.flush()
+        likes.set_liked(self.users[0], self.post.pk, liked=False)
+        likes.set_liked(self.author, self.post.pk, liked=False)
+        likes.buffer.flush()
+        self.assertEqual(self.count(), 2)
+
+    def test_is_liked_sees_pending_change(self):
+        user = self.users[0]
+        self.assertFalse(likes.is_liked(user, self.post.pk))
+        likes.set_liked(user, self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(likes.is_liked(user, self.post.pk))
+
+    @override_settings(WRITE_BUFFER_FLUSH_INTERVAL=0)
+    def test_like_view(self):
+        client = Client()
+        client.force_login(self.users[0])
+        client.post(reverse('posts:post_like', args=[self.post.pk]))
+        response = client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(response.context['requested_post'].like_count, 1)
+        viewer = client.get(
+            reverse('posts:post_viewer', args=[self.post.pk])
+        ).json()
+        self.assertIn('liked', viewer['roles'])
+        client.post(reverse('posts:post_unlike', args=[self.post.pk]))
+        self.assertFalse(Like.objects.exists())
+
+    def test_feed_shows_denormalized_count(self):
+        PostCounter.objects.create(post_id=self.post.pk, likes=42)
+        response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'][0].like_count, 42)
+        self.assertContains(response, 'Нравится: 42')
+
+    @override_settings(DELETION_IN_BACKGROUND=False)
+    def test_deleted_user_likes_are_uncounted(self):
+        for user in self.users:
+            likes.set_liked(user, self.post.pk)
+        likes.buffer.flush()
+        services.schedule_deletion(self.users[0])
+        self.assertEqual(self.count(), 2)
+
+    @override_settings(DELETION_IN_BACKGROUND=False)
+    def test_deleted_author_likes_are_forgotten(self):
+        for user in self.users:
+            likes.set_liked(user, self.post.pk)
+        likes.buffer.flush()
+        services.schedule_deletion(self.author)
+        self.assertFalse(Like.objects.filter(post_id=self.post.pk).exists())
+        self.assertFalse(PostCounter.objects.exists())
+        self.assertEqual(self.count(), 0)
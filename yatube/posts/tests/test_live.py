@@ -0,0 +1,111 @@
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from .. import live, services
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENT_POLL_INTERVAL=0.01)
+class CommentStreamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        self.first = Comment.objects.create(
+            post=self.post, author=self.author, text='Первый'
+        )
+        self.url = reverse('posts:comment_stream', args=[self.post.pk])
+        self.client = Client()
+
+    def test_returns_comments_after_cursor_at_once(self):
+        second = Comment.objects.create(
+            post=self.post, author=self.author, text='Второй'
+        )
+        data = self.client.get(self.url, {'after': self.first.pk}).json()
+        self.assertEqual(data['cursor'], second.pk)
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']], [second.pk]
+        )
+        self.assertEqual(data['comments'][0]['author'], 'author')
+
+    def test_empty_response_after_timeout(self):
+        data = self.client.get(
+            self.url, {'after': self.first.pk, 'timeout': 0.05}
+        ).json()
+        self.assertEqual(data, {'cursor': self.first.pk, 'comments': []})
+
+    def test_wakes_up_on_new_comment(self):
+        def comment_arrives(seconds):
+            Comment.objects.create(
+                post=self.post, author=self.author, text='Пока ждали'
+            )
+
+        with mock.patch.object(
+            live.time, 'sleep', side_effect=comment_arrives
+        ) as sleep:
+            data = self.client.get(
+                self.url, {'after': self.first.pk, 'timeout': 5}
+            ).json()
+        sleep.assert_called_once()
+        self.assertEqual(data['comments'][0]['text'], 'Пока ждали')
+
+    def test_waiting_reads_only_cache(self):
+        version = live.comments_version(self.post.pk)
+        with self.assertNumQueries(1):
+            live.wait_for_comments(self.post, self.first.pk, 0.05)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Второй'
+        )
+        self.assertNotEqual(live.comments_version(self.post.pk), version)
+
+    def test_html_fragment(self):
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Второй'
+        )
+        response = self.client.get(
+            self.url, {'after': self.first.pk, 'format': 'html'}
+        )
+        self.assertContains(response, 'Второй')
+        self.assertNotContains(response, 'Первый')
+        self.assertEqual(
+            int(response['X-Comments-Cursor']),
+            Comment.objects.latest('pk').pk,
+        )
+
+    def test_bad_cursor(self):
+        response = self.client.get(self.url, {'after': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_deleted_post(self):
+        services.delete_post(self.post)
+        response = self.client.get(self.url, {'timeout': 0})
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_detail_starts_from_newest_comment(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(response, f'data-cursor="{self.first.pk}"')
+
+
+@override_settings(COMMENT_POLL_INTERVAL=0.01)
+class CommentsLoadTestCommandTest(TransactionTestCase):
+    def test_delivers_every_comment_to_every_poller(self):
+        out = io.StringIO()
+        call_command(
+            'comments_load_test', pollers=3, threads=2, duration=0.3,
+            interval=0.1, timeout=0.5, stdout=out,
+        )
+        self.assertIn('ошибок: 0', out.getvalue())
+        self.assertIn('доставлено комментариев: 9 из 9', out.getvalue())
+        self.assertFalse(Post.all_objects.exists())
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import services
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(LATEST_POSTS_SIZE=3)
+class NewPostsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.first = Post.objects.create(
+            text='Первый', author=self.author, group=self.group
+        )
+        self.client = Client()
+
+    def poll(self, url, since):
+        return self.client.get(url, {'since': since}).json()
+
+    def test_reports_newer_posts_from_cache(self):
+        url = reverse('posts:index_new_posts')
+        self.assertEqual(
+            self.poll(url, self.first.pk),
+            {'latest': self.first.pk, 'count': 0, 'ids': [], 'more': False},
+        )
+        second = Post.objects.create(text='Второй', author=self.author)
+        # Список новых id дополнен сигналом, запрос к БД не нужен.
+        with self.assertNumQueries(0):
+            data = self.poll(url, self.first.pk)
+        self.assertEqual(data['ids'], [second.pk])
+        self.assertEqual(data['latest'], second.pk)
+
+    def test_group_feed_only_counts_group_posts(self):
+        url = reverse('posts:group_new_posts', args=('group',))
+        self.poll(url, self.first.pk)
+        Post.objects.create(text='Без группы', author=self.author)
+        in_group = Post.objects.create(
+            text='В группе', author=self.author, group=self.group
+        )
+        with self.assertNumQueries(0):
+            data = self.poll(url, self.first.pk)
+        self.assertEqual(data['ids'], [in_group.pk])
+
+    def test_more_flag_when_list_overflows(self):
+        url = reverse('posts:index_new_posts')
+        for n in range(4):
+            Post.objects.create(text=f'Пост {n}', author=self.author)
+        data = self.poll(url, self.first.pk)
+        self.assertEqual(data['count'], 3)
+        self.assertTrue(data['more'])
+
+    def test_deleted_post_drops_out(self):
+        url = reverse('posts:index_new_posts')
+        second = Post.objects.create(text='Второй', author=self.author)
+        self.poll(url, self.first.pk)
+        services.delete_post(second)
+        self.assertEqual(self.poll(url, self.first.pk)['count'], 0)
+
+    def test_bad_cursor_and_unknown_group(self):
+        response = self.client.get(
+            reverse('posts:index_new_posts'), {'since': 'abc'}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            reverse('posts:group_new_posts', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_index_page_has_poller(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, f'data-since="{self.first.pk}"'
+        )
+
+    def test_renamed_group_slug_is_forgotten(self):
+        self.poll(reverse('posts:group_new_posts', args=('group',)), 0)
+        self.group.slug = 'renamed'
+        self.group.save()
+        response = self.client.get(
+            reverse('posts:group_new_posts', args=('group',))
+        )
+        self.assertEqual(response.status_code, 404)
+        url = reverse('posts:group_new_posts', args=('renamed',))
+        self.assertEqual(self.poll(url, 0)['ids'], [self.first.pk])
+
+    def test_reused_slug_points_to_new_group(self):
+        url = reverse('posts:group_new_posts', args=('group',))
+        self.poll(url, 0)
+        self.group.delete()
+        group = Group.objects.create(
+            title='Новая группа', slug='group', description='Описание'
+        )
+        post = Post.objects.create(
+            text='В новой группе', author=self.author, group=group
+        )
+        self.assertEqual(self.poll(url, 0)['ids'], [post.pk])
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from core.models import Job
+
+from .. import notifications
+from ..models import Follow, Notification, Post
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_BATCH_SIZE=2)
+class NotificationFanOutTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.followers = [
+            User.objects.create_user(username=f'follower{n}')
+            for n in range(5)
+        ]
+        for follower in self.followers:
+            Follow.objects.create(user=follower, author=self.author)
+        self.post = Post.objects.create(text='Новый пост', author=self.author)
+
+    def test_followers_get_notifications(self):
+        notifications.notify_followers(self.post.pk, self.author.pk)
+        self.assertEqual(
+            set(Notification.objects.values_list('user_id', flat=True)),
+            {follower.pk for follower in self.followers},
+        )
+
+    def test_repeated_fan_out_does_not_duplicate(self):
+        notifications.notify_followers(self.post.pk, self.author.pk)
+        notifications.notify_followers(self.post.pk, self.author.pk)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_unread_counter_is_cached_and_bumped(self):
+        follower = self.followers[0]
+        self.assertEqual(notifications.unread_count(follower), 0)
+        notifications.notify_followers(self.post.pk, self.author.pk)
+        # Счётчик увеличен в кеше, запрос к БД не нужен.
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(follower), 1)
+
+    def test_unread_endpoint(self):
+        notifications.notify_followers(self.post.pk, self.author.pk)
+        client = Client()
+        client.force_login(self.followers[0])
+        response = client.get(reverse('posts:notifications_unread'))
+        self.assertEqual(response.json(), {'unread': 1})
+
+        response = Client().get(reverse('posts:notifications_unread'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_inbox_marks_notifications_read(self):
+        notifications.notify_followers(self.post.pk, self.author.pk)
+        client = Client()
+        client.force_login(self.followers[0])
+        response = client.get(reverse('posts:notifications'))
+        self.assertContains(response, 'Новый пост')
+        self.assertEqual(notifications.unread_count(self.followers[0]), 0)
+        self.assertFalse(
+            Notification.objects.filter(
+                user=self.followers[0], is_read=False
+            ).exists()
+        )
+
+
+class NotifyOnCreateTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_post_create_queues_fan_out(self):
+        self.client.post(reverse('posts:post_create'), {'text': 'Пост'})
+        self.assertEqual(Job.objects.get().name, 'posts.notify_followers')
+        self.assertFalse(Notification.objects.exists())
+
+    @override_settings(JOB_QUEUE_EAGER=True)
+    def test_eager_queue_notifies_followers(self):
+        self.client.post(reverse('posts:post_create'), {'text': 'Пост'})
+        self.assertEqual(
+            Notification.objects.get().user_id, self.follower.pk
+        )
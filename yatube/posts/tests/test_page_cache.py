@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=60)
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group,
+        )
+        cls.pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(AnonymousPageCacheTest.user)
+
+    def test_anonymous_pages_cached(self):
+        """Повторный запрос анонима отдаётся из кеша."""
+        for url in AnonymousPageCacheTest.pages:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                second = self.guest_client.get(url)
+                self.assertEqual(first['X-Page-Cache'], 'MISS')
+                self.assertEqual(second['X-Page-Cache'], 'HIT')
+                self.assertEqual(first.content, second.content)
+
+    def test_authenticated_bypass_cache(self):
+        """Авторизованный пользователь получает страницу без кеша."""
+        self.guest_client.get(reverse('posts:index'))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'Выйти')
+
+    def test_shared_page_cached_for_everyone(self):
+        """Страница поста одна для всех и отдаётся вошедшим из кеша."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        first = self.guest_client.get(url)
+        second = self.authorized_client.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'MISS')
+        self.assertEqual(second['X-Page-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+
+    @override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+    def test_shared_page_does_not_depend_on_user(self):
+        """Без кеша страница поста тоже не зависит от пользователя."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        anonymous = self.guest_client.get(url)
+        author = self.authorized_client.get(url)
+        self.assertEqual(anonymous.content, author.content)
+        self.assertContains(author, '<span data-viewer-username></span>')
+
+    def test_post_viewer_roles(self):
+        """Личные части страницы поста открываются по ролям viewer."""
+        url = reverse('posts:post_viewer', kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(response.json()['roles'], ['anonymous'])
+
+        data = self.authorized_client.get(url).json()
+        self.assertEqual(data['username'], self.user.username)
+        self.assertEqual(
+            data['roles'], ['authenticated', 'author', 'not-liked']
+        )
+
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='reader'))
+        data = reader.get(url).json()
+        self.assertEqual(data['roles'], ['authenticated', 'not-liked'])
+
+    def test_post_change_invalidates_pages(self):
+        """Новый пост сбрасывает закешированные страницы."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.guest_client.get(url)
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Новый пост')
+
+    def test_signup_keeps_pages(self):
+        """Новый пользователь не сбрасывает закешированные страницы."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        User.objects.create_user(username='newcomer')
+        self.assertEqual(self.guest_client.get(url)['X-Page-Cache'], 'HIT')
+
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сбрасывает кеш страницы поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.guest_client.get(url)
+        Comment.objects.create(
+            text='Новый комментарий', post=self.post, author=self.user
+        )
+        self.assertContains(self.guest_client.get(url), 'Новый комментарий')
+
+    def test_not_found_not_cached(self):
+        """Ответ 404 не попадает в кеш."""
+        url = reverse('posts:profile', kwargs={'username': 'nobody'})
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        User.objects.create_user(username='nobody')
+        self.assertEqual(self.guest_client.get(url).status_code, 200)
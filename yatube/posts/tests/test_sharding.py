@@ -0,0 +1,182 @@
+import datetime as dt
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import sharding
+from ..models import Comment, Follow, Group, Post, PostMonthCount
+
+User = get_user_model()
+
+SHARDS = ['shard0', 'shard1']
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardingTest(TestCase):
+    databases = {'default', *SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        cls.first = User.objects.create_user(username='first_author')
+        cls.second = User.objects.create_user(username='second_author')
+        cls.reader = User.objects.create_user(username='reader')
+        now = timezone.now()
+        cls.posts = []
+        for i in range(12):
+            author = (cls.first, cls.second)[i % 2]
+            post = Post.objects.create(
+                text=f'Пост {i}', author=author, group=cls.group
+            )
+            # Чётные посты у одного автора, нечётные у другого: даты
+            # перемешивают шарды в общей ленте.
+            Post.objects.using(post._state.db).filter(pk=post.pk).update(
+                pub_date=now - dt.timedelta(minutes=i)
+            )
+            cls.posts.append(post)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_authors_live_on_different_shards(self):
+        self.assertNotEqual(
+            sharding.shard_for_author(self.first.pk),
+            sharding.shard_for_author(self.second.pk),
+        )
+
+    def test_post_is_written_to_author_shard(self):
+        """Пост пишется на шард автора, id указывает на этот шард."""
+        post = self.posts[0]
+        shard = sharding.shard_for_author(self.first.pk)
+        self.assertEqual(post._state.db, shard)
+        self.assertEqual(sharding.shards_for_pk(post.pk)[0], shard)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_comment_lives_with_post(self):
+        """Комментарий хранится на шарде поста, а не своего автора."""
+        post = self.posts[1]
+        self.client.force_login(self.first)
+        self.client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            {'text': 'Комментарий'},
+        )
+        comment = Comment.objects.using(post._state.db).get()
+        self.assertEqual(comment.author, self.first)
+        self.assertEqual(list(post.comments.all()), [comment])
+
+    def test_index_merges_shards_by_date(self):
+        """Главная страница сливает шарды по дате публикации."""
+        response = self.client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 12)
+        self.assertEqual(
+            [post.pk for post in page_obj], [p.pk for p in self.posts[:10]]
+        )
+        response = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [p.pk for p in self.posts[10:]],
+        )
+
+    def test_group_posts_across_shards(self):
+        response = self.client.get(
+            reverse('posts:group_list', args=(self.group.slug,))
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+
+    def test_profile_reads_single_shard(self):
+        """Профиль показывает посты автора с его шарда."""
+        response = self.client.get(
+            reverse('posts:profile', args=(self.second.username,))
+        )
+        self.assertEqual(response.context['post_count'], 6)
+        self.assertEqual(
+            {post.author for post in response.context['page_obj']},
+            {self.second},
+        )
+
+    def test_post_detail_finds_post_on_shard(self):
+        for post in self.posts[:2]:
+            response = self.client.get(
+                reverse('posts:post_detail', args=(post.pk,))
+            )
+            self.assertEqual(response.context['requested_post'], post)
+            self.assertEqual(response.context['post_count'], 6)
+
+    def test_follow_index_reads_followed_shards(self):
+        Follow.objects.create(user=self.reader, author=self.first)
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 6)
+        self.assertEqual(
+            {post.author for post in page_obj}, {self.first}
+        )
+
+    def test_get_by_pk_falls_back_to_other_shards(self):
+        """Пост со старым id находится на любом шарде."""
+        legacy = Post(pk=10001, text='Старый пост', author=self.first)
+        wrong_shard = sharding.shards_for_pk(legacy.pk)[1]
+        Post.objects.using(wrong_shard).bulk_create([legacy])
+        self.assertEqual(
+            Post.objects.get_by_pk(legacy.pk).text, 'Старый пост'
+        )
+
+    def test_deleting_author_removes_sharded_posts(self):
+        author = User.objects.create_user(username='leaving_author')
+        post = Post.objects.create(text='Пост', author=author)
+        Comment.objects.create(text='Комментарий', post=post, author=author)
+        author_id = author.pk
+        author.delete()
+        self.assertFalse(
+            Post.objects.using(post._state.db).filter(
+                author_id=author_id
+            ).exists()
+        )
+        self.assertFalse(
+            Comment.objects.using(post._state.db).exists()
+        )
+
+
+class MovePostsToShardsTest(TestCase):
+    databases = {'default', *SHARDS}
+
+    def test_posts_and_comments_are_moved(self):
+        """Команда переносит посты с комментариями и сохраняет их id."""
+        user = User.objects.create_user(username='test_author')
+        post = Post.objects.create(text='Тестовый пост', author=user)
+        Comment.objects.create(text='Комментарий', post=post, author=user)
+
+        with override_settings(POST_SHARDS=SHARDS):
+            call_command('move_posts_to_shards', stdout=open('/dev/null', 'w'))
+            self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+            moved = Post.objects.get_by_pk(post.pk)
+            self.assertEqual(moved.comments.count(), 1)
+            new_post = Post.objects.create(text='Новый пост', author=user)
+            self.assertGreater(new_post.pk, post.pk)
+
+    def test_month_counts_survive_move(self):
+        """Удаление из default при переносе не вычитает посты из счётчиков."""
+        user = User.objects.create_user(username='test_author')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.create(text='Первый', author=user, group=group)
+        Post.objects.create(text='Второй', author=user, group=group)
+        Post.objects.create(text='Удалённый', author=user).soft_delete()
+
+        with override_settings(POST_SHARDS=SHARDS):
+            call_command('move_posts_to_shards', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(PostMonthCount.objects.get(author=user).count, 2)
+        self.assertEqual(PostMonthCount.objects.get(group=group).count, 2)
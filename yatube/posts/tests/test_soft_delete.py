@@ -0,0 +1,145 @@
+import datetime as dt
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import services
+from ..models import Comment, Group, Post, PostMonthCount
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, DELETION_BATCH_SIZE=2)
+class SoftDeleteTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            text='Удаляемый пост', author=self.user, group=self.group,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.kept = Post.objects.create(text='Живой пост', author=self.user)
+        self.comments = [
+            Comment.objects.create(
+                text=f'Комментарий {n}', post=self.post, author=self.user
+            )
+            for n in range(3)
+        ]
+        self.client = Client()
+
+    def test_deleted_post_is_hidden(self):
+        services.delete_post(self.post)
+        self.assertEqual(list(Post.objects.all()), [self.kept])
+        self.assertEqual(Post.all_objects.count(), 2)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Удаляемый пост')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_deleted_post_leaves_month_counts(self):
+        services.delete_post(self.post)
+        self.assertFalse(
+            PostMonthCount.objects.filter(group=self.group, count__gt=0)
+            .exists()
+        )
+        self.assertEqual(
+            PostMonthCount.objects.get(author=self.user).count, 1
+        )
+
+    def test_deleted_comment_is_hidden(self):
+        services.delete_comment(self.comments[0])
+        self.assertEqual(self.post.comments.count(), 2)
+        self.assertEqual(Comment.all_objects.count(), 3)
+
+    def test_admin_soft_deletes_comments(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'secret'
+        )
+        self.client.force_login(admin)
+        self.client.post(
+            reverse(
+                'admin:posts_comment_delete', args=(self.comments[0].pk,)
+            ),
+            {'post': 'yes'},
+        )
+        self.client.post(reverse('admin:posts_comment_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [self.comments[1].pk],
+            'post': 'yes',
+        })
+        self.assertEqual(list(self.post.comments.all()), [self.comments[2]])
+        self.assertEqual(
+            Comment.all_objects.filter(is_deleted=True).count(), 2
+        )
+
+    def test_admin_soft_deletes_posts(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'secret'
+        )
+        self.client.force_login(admin)
+        self.client.post(
+            reverse('admin:posts_post_delete', args=(self.post.pk,)),
+            {'post': 'yes'},
+        )
+        self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [self.kept.pk],
+            'post': 'yes',
+        })
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(Post.all_objects.filter(is_deleted=True).count(), 2)
+        self.assertEqual(Comment.all_objects.count(), 3)
+
+    def test_purge_removes_rows_and_image(self):
+        image = self.post.image.name
+        services.delete_comment(Comment.objects.create(
+            text='Чужой', post=self.kept, author=self.user
+        ))
+        services.delete_post(self.post)
+        out = io.StringIO()
+        call_command('purge_deleted', days=0, stdout=out)
+        self.assertIn('Удалено постов: 1, комментариев: 4', out.getvalue())
+        self.assertEqual(list(Post.all_objects.all()), [self.kept])
+        self.assertFalse(Comment.all_objects.exists())
+        self.assertFalse(default_storage.exists(image))
+        self.assertEqual(
+            PostMonthCount.objects.get(author=self.user).count, 1
+        )
+
+    def test_purge_keeps_recent_tombstones(self):
+        services.delete_post(self.post)
+        Post.all_objects.filter(pk=self.post.pk).update(
+            deleted_at=timezone.now() - dt.timedelta(hours=1)
+        )
+        call_command('purge_deleted', days=1, stdout=io.StringIO())
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import tracking
+from ..models import Post, PostCounter
+
+User = get_user_model()
+
+
+class ViewTrackingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        tracking.buffer.reset_process()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def tearDown(self):
+        tracking.buffer.reset_process()
+
+    def test_views_are_buffered_until_flush(self):
+        for _ in range(3):
+            Client().get(self.url)
+        self.assertFalse(PostCounter.objects.exists())
+        tracking.buffer.flush()
+        self.assertEqual(tracking.view_stats(self.post.pk), (3, 1))
+
+    @override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=60)
+    def test_cached_page_is_counted(self):
+        client = Client()
+        client.get(self.url)
+        self.assertEqual(client.get(self.url)['X-Page-Cache'], 'HIT')
+        self.assertEqual(tracking.buffer.get(self.post.pk)[0], 2)
+
+    def test_unique_viewers(self):
+        client = Client()
+        client.force_login(self.author)
+        client.get(self.url)
+        client.get(self.url)
+        Client(REMOTE_ADDR='10.0.0.1').get(self.url)
+        Client(REMOTE_ADDR='10.0.0.2').get(self.url)
+        tracking.buffer.flush()
+        Client(REMOTE_ADDR='10.0.0.1').get(self.url)
+        tracking.buffer.flush()
+        self.assertEqual(tracking.view_stats(self.post.pk), (5, 3))
+
+    def test_missing_post_not_counted(self):
+        Client().get(reverse('posts:post_detail', args=[self.post.pk + 1]))
+        self.assertEqual(len(tracking.buffer), 0)
+
+    def test_post_detail_shows_counts(self):
+        PostCounter.objects.create(post_id=self.post.pk, views=7)
+        response = Client().get(self.url)
+        self.assertEqual(response.context['views'], 7)
+        self.assertEqual(response.context['viewers'], 0)
+
+    def test_post_detail_reads_counters_once(self):
+        """Повторная страница поста не читает PostCounter: всё в кеше."""
+        PostCounter.objects.create(post_id=self.post.pk, likes=2, views=7)
+        Client().get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(self.url)
+        self.assertEqual(response.context['views'], 7)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if PostCounter._meta.db_table in query['sql']
+        ])
+
+    def test_flush_refreshes_cached_stats(self):
+        Client().get(self.url)
+        self.assertEqual(tracking.view_stats(self.post.pk), (0, 0))
+        tracking.buffer.flush()
+        self.assertEqual(tracking.view_stats(self.post.pk), (1, 1))
@@ -0,0 +1,69 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class WarmCachesCommandTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='test_author')
+        self.follower = User.objects.create_user(username='test_user')
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание',
+        )
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x01\x00'
+            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+            b'\x00\x00\x01\x00\x01\x00\x00\x02'
+            b'\x02\x4c\x01\x00\x3b'
+        )
+        for i in range(12):
+            Post.objects.create(
+                text='Тестовый пост' + str(i),
+                author=self.author,
+                group=self.group,
+                image=SimpleUploadedFile(
+                    name='small.gif', content=small_gif,
+                    content_type='image/gif'
+                ),
+            )
+
+    def test_warm_caches(self):
+        """warm_caches запрашивает страницы и заполняет кеш фрагментов."""
+        stdout = io.StringIO()
+        # Тестовая БД в памяти блокирует таблицы целиком,
+        # поэтому параллельные потоки здесь не используем.
+        call_command(
+            'warm_caches', pages=2, groups=1, profiles=1, workers=1,
+            stdout=stdout, stderr=io.StringIO(),
+        )
+        self.assertIn('Прогрето страниц: 4 из 4, миниатюр: 12.',
+                      stdout.getvalue())
+        for page in (1, 2):
+            with self.subTest(page=page):
+                key = make_template_fragment_key('sidebar', [page])
+                self.assertIsNotNone(cache.get(key))
@@ -0,0 +1,108 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from core.buffers import WriteBuffer
+from core.db import run_write
+from core.hll import HyperLogLog, hash_value
+
+from .likes import SAVE_BATCH_SIZE, chunks
+from .models import PostCounter
+
+
+def stats_key(post_id):
+    return f'posts:views:{post_id}'
+
+
+def viewer_id(request):
+    # Пользователя не трогаем, чтобы не читать сессию на общей странице:
+    # у вошедшего зрителя есть cookie сессии, у анонима его отличают
+    # адрес и браузер.
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session:
+        return f'session:{session}'
+    return 'anon:{}:{}'.format(
+        request.META.get('REMOTE_ADDR', ''),
+        request.META.get('HTTP_USER_AGENT', ''),
+    )
+
+
+def merge(old, new):
+    hits, viewers = old
+    viewers.update(new[1])
+    return hits + new[0], viewers
+
+
+def save_batch(changes):
+    counters = PostCounter.objects.in_bulk(list(changes))
+    created = []
+    for post_id, (hits, viewers) in changes.items():
+        counter = counters.get(post_id)
+        sketch = HyperLogLog.from_bytes(
+            counter.viewers if counter else b'',
+            settings.VIEWER_SKETCH_PRECISION,
+        )
+        for value in viewers:
+            sketch.add_hash(value)
+        if counter is None:
+            created.append(PostCounter(
+                post_id=post_id, views=hits, viewers=sketch.to_bytes()
+            ))
+        else:
+            PostCounter.objects.filter(post_id=post_id).update(
+                views=F('views') + hits, viewers=sketch.to_bytes()
+            )
+    PostCounter.objects.bulk_create(created)
+
+
+def save_views(changes):
+    """Записывает накопленные просмотры {post_id: (hits, хеши зрителей)}.
+
+    Хеши зрителей за интервал добавляются в скетч поста, так что
+    отдельной строки на зрителя нет.
+    """
+    for batch in chunks(list(changes.items()), SAVE_BATCH_SIZE):
+        run_write('views', save_batch, dict(batch))
+        cache.delete_many([stats_key(post_id) for post_id, _ in batch])
+
+
+buffer = WriteBuffer('views', save_views, merge)
+
+
+def record_view(post_id, viewer):
+    buffer.add(post_id, (1, {hash_value(viewer)}))
+
+
+def count_views(view_func):
+    """Учитывает успешный GET страницы поста в буфере просмотров.
+
+    Ставится поверх anonymous_cache_page, чтобы считать и страницы,
+    отданные из кеша.
+    """
+    @wraps(view_func)
+    def wrapper(request, post_id, *args, **kwargs):
+        response = view_func(request, post_id, *args, **kwargs)
+        if request.method == 'GET' and response.status_code == 200:
+            record_view(post_id, viewer_id(request))
+        return response
+    return wrapper
+
+
+def view_stats(post_id):
+    """Число просмотров и оценка числа уникальных зрителей поста.
+
+    Значение берётся из кеша и сбрасывается записью просмотров, так что
+    страница поста читает PostCounter не чаще одного сброса буфера.
+    """
+    stats = cache.get(stats_key(post_id))
+    if stats is None:
+        counter = PostCounter.objects.filter(post_id=post_id).first()
+        if counter is None:
+            stats = (0, 0)
+        else:
+            sketch = HyperLogLog.from_bytes(counter.viewers)
+            stats = (counter.views, sketch.count())
+        cache.set(stats_key(post_id), stats, settings.VIEW_STATS_TIMEOUT)
+    return stats
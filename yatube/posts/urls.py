@@ -6,17 +6,78 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('new/', views.index_new_posts, name='index_new_posts'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/new/',
+        views.group_new_posts,
+        name='group_new_posts'
+    ),
+    path(
+        'group/<slug:slug>/archive/',
+        views.group_archive,
+        name='group_archive'
+    ),
+    path(
+        'group/<slug:slug>/<int:year>/<int:month>/',
+        views.group_month,
+        name='group_month'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/archive/',
+        views.profile_archive,
+        name='profile_archive'
+    ),
+    path(
+        'profile/<str:username>/<int:year>/<int:month>/',
+        views.profile_month,
+        name='profile_month'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/viewer/',
+        views.post_viewer,
+        name='post_viewer'
+    ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comment_stream,
+        name='comment_stream'
+    ),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/delete/',
+        views.post_delete,
+        name='post_delete'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/like/',
+        views.post_like,
+        name='post_like'
+    ),
+    path(
+        'posts/<int:post_id>/unlike/',
+        views.post_unlike,
+        name='post_unlike'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'notifications/',
+        views.notification_list,
+        name='notifications'
+    ),
+    path(
+        'notifications/unread/',
+        views.notifications_unread,
+        name='notifications_unread'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,14 +1,50 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import router
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.cache import never_cache
 
+from core.db import run_write
+from core.identity import share_related
+
+from . import (
+    dates, feeds, likes, live, notifications, services, tracking
+)
+from .archive import ChainedFeed
+from .cache import anonymous_cache_page
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
+from .identity import (
+    get_group_or_404, get_group_pk_or_404, get_user_or_404
+)
+from .models import ArchivedPost, Comment, Notification, Post, Follow
 from .utils import posts_paginator
 
 
+def get_post_or_404(post_id, queryset=Post.objects):
+    try:
+        return queryset.get_by_pk(post_id)
+    except Post.DoesNotExist:
+        raise Http404(f'Пост {post_id} не найден.')
+
+
+def get_post_or_archived_404(post_id):
+    try:
+        return Post.objects.select_related('author', 'group').get_by_pk(
+            post_id
+        )
+    except Post.DoesNotExist:
+        return get_object_or_404(
+            ArchivedPost.objects.select_related('author', 'group'),
+            id=post_id,
+        )
+
+
+@anonymous_cache_page
 def index(request):
-    post_list = Post.objects.select_related('group', 'author').all()
-    page_obj = posts_paginator(request, post_list)
+    page_obj = posts_paginator(request, feeds.index_feed())
+    share_related(page_obj, 'author', 'group')
+    likes.attach_counts(page_obj)
 
     template = 'posts/index.html'
     context = {
@@ -17,10 +53,12 @@ def index(request):
     return render(request, template, context)
 
 
+@anonymous_cache_page
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = posts_paginator(request, post_list)
+    group = get_group_or_404(slug)
+    page_obj = posts_paginator(request, feeds.group_feed(group))
+    share_related(page_obj, 'author', 'group')
+    likes.attach_counts(page_obj)
     template = 'posts/group_list.html'
     context = {
         'group': group,
@@ -29,11 +67,41 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+def new_posts_response(request, ids):
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'error': 'since должен быть числом.'}, status=400)
+    newer, more = feeds.newer_than(ids, since)
+    return JsonResponse({
+        'latest': newer[0] if newer else since,
+        'count': len(newer),
+        'ids': newer,
+        'more': more,
+    })
+
+
+def index_new_posts(request):
+    return new_posts_response(request, feeds.index_latest())
+
+
+def group_new_posts(request, slug):
+    return new_posts_response(
+        request, feeds.group_latest(get_group_pk_or_404(slug))
+    )
+
+
+@anonymous_cache_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_user_or_404(request, username)
+    post_list = ChainedFeed(
+        feeds.author_feed(author),
+        author.archived_posts.select_related('author', 'group'),
+    )
     post_count = post_list.count()
     page_obj = posts_paginator(request, post_list)
+    share_related(page_obj, 'author', 'group')
+    likes.attach_counts(page_obj)
     template = 'posts/profile.html'
     following = (request.user.is_authenticated
                  and author.following.filter(user=request.user).exists())
@@ -47,15 +115,88 @@ def profile(request, username):
     return render(request, template, context)
 
 
+def month_archive_page(request, month_counts, posts, archived, year, month):
+    start, end = dates.month_bounds(year, month)
+    if not month_counts.filter(month=start.date(), count__gt=0).exists():
+        raise Http404('В этом месяце постов нет.')
+    in_month = {'pub_date__gte': start, 'pub_date__lt': end}
+    page_obj = posts_paginator(request, ChainedFeed(
+        posts.filter(**in_month).across_shards(),
+        archived.filter(**in_month).select_related('author', 'group'),
+    ))
+    share_related(page_obj, 'author', 'group')
+    likes.attach_counts(page_obj)
+    return {'month': start, 'page_obj': page_obj}
+
+
+@anonymous_cache_page
+def group_archive(request, slug):
+    group = get_group_or_404(slug)
+    template = 'posts/date_archive.html'
+    context = {
+        'group': group,
+        'years': dates.months_by_year(group.month_counts.all()),
+    }
+    return render(request, template, context)
+
+
+@anonymous_cache_page
+def group_month(request, slug, year, month):
+    group = get_group_or_404(slug)
+    context = month_archive_page(
+        request,
+        group.month_counts.all(),
+        Post.objects.filter(group=group).select_related('author', 'group'),
+        group.archived_posts.all(),
+        year,
+        month,
+    )
+    context['group'] = group
+    return render(request, 'posts/month_archive.html', context)
+
+
+@anonymous_cache_page
+def profile_archive(request, username):
+    author = get_user_or_404(request, username)
+    template = 'posts/date_archive.html'
+    context = {
+        'author_obj': author,
+        'years': dates.months_by_year(author.month_counts.all()),
+    }
+    return render(request, template, context)
+
+
+@anonymous_cache_page
+def profile_month(request, username, year, month):
+    author = get_user_or_404(request, username)
+    context = month_archive_page(
+        request,
+        author.month_counts.all(),
+        Post.objects.select_related('author', 'group').for_author(author),
+        author.archived_posts.all(),
+        year,
+        month,
+    )
+    context['author_obj'] = author
+    return render(request, 'posts/month_archive.html', context)
+
+
+@tracking.count_views
+@anonymous_cache_page
 def post_detail(request, post_id):
-    requested_post = get_object_or_404(Post, id=post_id)
+    requested_post = get_post_or_archived_404(post_id)
+    share_related([requested_post], 'author', 'group')
+    likes.attach_counts([requested_post])
     requested_post_author = requested_post.author
-    post_count = Post.objects.filter(
-        author=requested_post_author
-    ).count()
+    post_count = (
+        Post.objects.for_author(requested_post_author).count()
+        + requested_post_author.archived_posts.count()
+    )
 
     form = CommentForm(request.POST or None)
-    comments = requested_post.comments.all()
+    comments = share_related(
+        list(requested_post.comments.select_related('author')), 'author'
+    )
 
     template = 'posts/post_detail.html'
     context = {
@@ -63,10 +204,86 @@ def post_detail(request, post_id):
         'post_count': post_count,
         'form': form,
         'comments': comments,
+        'is_archived': isinstance(requested_post, ArchivedPost),
     }
+    context['views'], context['viewers'] = tracking.view_stats(
+        requested_post.pk
+    )
     return render(request, template, context)
 
 
+@never_cache
+def post_viewer(request, post_id):
+    """Роли пользователя для личных частей общей страницы поста.
+
+    Страница поста одна для всех (SHARED_PAGE_VIEWS), а кнопки автора,
+    лайк, форму комментария и меню пользователя открывает viewer.js
+    по ролям из этого ответа.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return JsonResponse(
+            {'authenticated': False, 'username': '', 'roles': ['anonymous']}
+        )
+    roles = ['authenticated']
+    try:
+        post = Post.objects.get_by_pk(post_id)
+    except Post.DoesNotExist:
+        # У архивного поста нет ни кнопок автора, ни лайка.
+        post = None
+    if post is not None:
+        if post.author_id == user.pk:
+            roles.append('author')
+        liked = likes.is_liked(user, post.pk)
+        roles.append('liked' if liked else 'not-liked')
+    return JsonResponse(
+        {'authenticated': True, 'username': user.username, 'roles': roles}
+    )
+
+
+@never_cache
+def comment_stream(request, post_id):
+    """Долгий опрос новых комментариев к посту.
+
+    Параметры: after — id самого нового комментария у клиента, timeout —
+    сколько секунд ждать (не больше COMMENT_POLL_TIMEOUT), format=html —
+    вернуть фрагмент разметки вместо JSON.
+    """
+    post = get_post_or_404(post_id)
+    try:
+        cursor = int(request.GET.get('after', 0))
+        timeout = float(
+            request.GET.get('timeout', settings.COMMENT_POLL_TIMEOUT)
+        )
+    except ValueError:
+        return JsonResponse(
+            {'error': 'after и timeout должны быть числами.'}, status=400
+        )
+    timeout = max(0, min(timeout, settings.COMMENT_POLL_TIMEOUT))
+
+    comments = live.wait_for_comments(post, cursor, timeout)
+    cursor = max([comment.pk for comment in comments], default=cursor)
+    if request.GET.get('format') == 'html':
+        response = render(
+            request, 'posts/includes/comment_list.html',
+            {'comments': comments},
+        )
+        response['X-Comments-Cursor'] = cursor
+        return response
+    return JsonResponse({
+        'cursor': cursor,
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+    })
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -75,7 +292,10 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        run_write(
+            'post_create', post.save,
+            using=router.db_for_write(Post, instance=post),
+        )
         return redirect('posts:profile', username=request.user)
 
     return render(request, template, {'form': form})
@@ -84,7 +304,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post_or_404(post_id)
 
     if post.author != request.user:
         return redirect('posts:post_detail', post_id=post_id)
@@ -107,24 +327,58 @@ def post_edit(request, post_id):
     return render(request, template, context)
 
 
+@login_required
+def post_delete(request, post_id):
+    post = get_post_or_404(post_id)
+
+    if post.author != request.user:
+        return redirect('posts:post_detail', post_id=post_id)
+
+    if request.method == 'POST':
+        services.delete_post(post)
+        return redirect('posts:profile', username=request.user)
+
+    return render(request, 'posts/post_delete.html', {'post': post})
+
+
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post_or_404(post_id)
     form = CommentForm(request.POST or None)
 
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        run_write(
+            'add_comment', comment.save,
+            using=router.db_for_write(Comment, instance=comment),
+        )
 
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@login_required
+def post_like(request, post_id):
+    post = get_post_or_404(post_id)
+    if request.method == 'POST':
+        likes.set_liked(request.user, post.pk)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+def post_unlike(request, post_id):
+    post = get_post_or_404(post_id)
+    if request.method == 'POST':
+        likes.set_liked(request.user, post.pk, liked=False)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = Post.objects.followed_by(request.user)
     page_obj = posts_paginator(request, post_list)
+    likes.attach_counts(page_obj)
 
     template = 'posts/follow.html'
     context = {
@@ -133,18 +387,47 @@ def follow_index(request):
     return render(request, template, context)
 
 
+@login_required
+def notification_list(request):
+    page_obj = posts_paginator(
+        request,
+        Notification.objects.filter(user=request.user).select_related(
+            'author'
+        ),
+    )
+    posts = Post.objects.in_bulk_across_shards(
+        [notification.post_id for notification in page_obj]
+    )
+    for notification in page_obj:
+        notification.post = posts.get(notification.post_id)
+    notifications.mark_read(request.user)
+
+    template = 'posts/notifications.html'
+    return render(request, template, {'page_obj': page_obj})
+
+
+@never_cache
+def notifications_unread(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'unread': 0}, status=401)
+    return JsonResponse({'unread': notifications.unread_count(request.user)})
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(request, username)
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        run_write(
+            'profile_follow', Follow.objects.get_or_create,
+            user=request.user, author=author,
+        )
 
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(request, username)
     Follow.objects.filter(user=request.user, author=author).delete()
 
     return redirect('posts:profile', username=username)
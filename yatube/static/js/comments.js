@@ -0,0 +1,36 @@
+// Держит открытым долгий опрос новых комментариев к посту и вставляет
+// пришедшую разметку в начало списка. Сервер отвечает сразу, как только
+// появился комментарий, или пустым ответом по истечении ожидания.
+document.addEventListener('DOMContentLoaded', function () {
+  var RETRY_SECONDS = 5;
+  var MAX_RETRY_SECONDS = 60;
+  var list = document.querySelector('[data-comments-url]');
+  if (!list) {
+    return;
+  }
+  var retry = RETRY_SECONDS;
+
+  function poll() {
+    var url = list.dataset.commentsUrl + '?format=html&after=' +
+      list.dataset.cursor;
+    fetch(url, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.status);
+        }
+        list.dataset.cursor = response.headers.get('X-Comments-Cursor');
+        return response.text();
+      })
+      .then(function (html) {
+        list.insertAdjacentHTML('afterbegin', html);
+        retry = RETRY_SECONDS;
+        poll();
+      })
+      .catch(function () {
+        setTimeout(poll, retry * 1000);
+        retry = Math.min(retry * 2, MAX_RETRY_SECONDS);
+      });
+  }
+
+  poll();
+});
@@ -0,0 +1,28 @@
+// Подставляет CSRF-токен в формы, отрисованные без {% csrf_token %}.
+// Так страница не зависит от пользователя и может кешироваться.
+// Формы в скрытых блоках общей страницы ждут, пока их откроет viewer.js,
+// чтобы анонимы не запрашивали токен зря.
+document.addEventListener('DOMContentLoaded', function () {
+  var filled = false;
+
+  function fill() {
+    var inputs = Array.prototype.filter.call(
+      document.querySelectorAll('input[data-csrf-url]'),
+      function (input) { return !input.closest('[hidden]'); }
+    );
+    if (filled || !inputs.length) {
+      return;
+    }
+    filled = true;
+    fetch(inputs[0].dataset.csrfUrl, {credentials: 'same-origin'})
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        document.querySelectorAll('input[data-csrf-url]').forEach(
+          function (input) { input.value = data.token; }
+        );
+      });
+  }
+
+  fill();
+  document.addEventListener('viewer:ready', fill);
+});
@@ -0,0 +1,28 @@
+// Опрашивает ленту на новые посты и показывает плашку со ссылкой на
+// обновление страницы. Ответ собирается из кеша, а не из ленты целиком.
+document.addEventListener('DOMContentLoaded', function () {
+  var POLL_SECONDS = 20;
+  var banner = document.querySelector('[data-new-posts-url]');
+  if (!banner) {
+    return;
+  }
+  var counter = banner.querySelector('[data-new-posts-count]');
+
+  function poll() {
+    if (document.hidden) {
+      return;
+    }
+    var url = banner.dataset.newPostsUrl + '?since=' + banner.dataset.since;
+    fetch(url, {credentials: 'same-origin'})
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        if (data.count) {
+          counter.textContent = data.more ? data.count + '+' : data.count;
+          banner.hidden = false;
+        }
+      });
+  }
+
+  setInterval(poll, POLL_SECONDS * 1000);
+  document.addEventListener('visibilitychange', poll);
+});
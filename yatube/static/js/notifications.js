@@ -0,0 +1,38 @@
+// Опрашивает число непрочитанных уведомлений для значка в шапке.
+// Ответ берётся из кеша, поэтому опрос дешевле перезагрузки ленты.
+// В скрытой вкладке опрос приостанавливается.
+document.addEventListener('DOMContentLoaded', function () {
+  var POLL_SECONDS = 30;
+  var badge = document.querySelector('[data-unread-url]');
+  if (!badge) {
+    return;
+  }
+
+  function poll() {
+    if (document.hidden) {
+      return;
+    }
+    fetch(badge.dataset.unreadUrl, {credentials: 'same-origin'})
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        badge.textContent = data.unread ? data.unread : '';
+      });
+  }
+
+  function start() {
+    poll();
+    setInterval(poll, POLL_SECONDS * 1000);
+    document.addEventListener('visibilitychange', poll);
+  }
+
+  if (badge.closest('[hidden]')) {
+    // На общей странице меню пользователя открывает viewer.js.
+    document.addEventListener('viewer:ready', function (event) {
+      if (event.detail.authenticated) {
+        start();
+      }
+    });
+    return;
+  }
+  start();
+});
@@ -0,0 +1,24 @@
+// Показывает личные части общей страницы. Страница одна для всех и
+// кешируется целиком, а роли текущего пользователя (authenticated или
+// anonymous, author, liked или not-liked) приходят отдельным запросом.
+// Элементы с data-viewer="<роль>" отрисованы скрытыми и открываются,
+// если роль есть в ответе; после этого рассылается событие viewer:ready.
+document.addEventListener('DOMContentLoaded', function () {
+  var root = document.querySelector('[data-viewer-url]');
+  if (!root) {
+    return;
+  }
+  fetch(root.dataset.viewerUrl, {credentials: 'same-origin'})
+    .then(function (response) { return response.json(); })
+    .then(function (viewer) {
+      document.querySelectorAll('[data-viewer]').forEach(function (element) {
+        element.hidden = viewer.roles.indexOf(element.dataset.viewer) === -1;
+      });
+      document.querySelectorAll('[data-viewer-username]').forEach(
+        function (element) { element.textContent = viewer.username; }
+      );
+      document.dispatchEvent(
+        new CustomEvent('viewer:ready', {detail: viewer})
+      );
+    });
+});
@@ -29,13 +29,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.identity.IdentityMapMiddleware',
+    'core.middleware.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.cache_control.CacheControlMiddleware',
+    'core.middleware.profiling.SamplingProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -54,6 +59,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.shared_page.shared_page',
             ],
         },
     },
@@ -68,11 +74,157 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 60,
+    },
+    'replica': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
+    'shard0': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.shard0.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'FOREIGN_KEYS': False,
+    },
+    'shard1': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.shard1.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'FOREIGN_KEYS': False,
+    },
+}
+
+DATABASE_ROUTERS = [
+    'posts.routers.ShardRouter',
+    'core.routers.ReplicaRouter',
+]
+
+# Реплики для чтения. Алиасы из DATABASES, на которые уходят чтения view
+# из REPLICA_VIEWS. Пустой список — всё читается из default. Для SQLite
+# реплика — копия основного файла, обновляемая командой refresh_replicas.
+# После изменяющего запроса клиент REPLICA_PIN_SECONDS секунд читает из
+# основной базы, чтобы увидеть свои изменения.
+
+DATABASE_REPLICAS = []
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:group_archive',
+    'posts:group_month',
+    'posts:profile_archive',
+    'posts:profile_month',
+    'posts:notifications_unread',
+    'posts:index_new_posts',
+    'posts:group_new_posts',
+)
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+# Шарды для постов и комментариев: алиасы из DATABASES. Пост хранится на
+# шарде author_id % len(POST_SHARDS), комментарии — рядом со своим
+# постом. Пустой список — всё хранится в default. Шарды создаются
+# командой migrate --database <алиас>, существующие посты переносит
+# move_posts_to_shards. Список шардов после этого менять нельзя.
+
+POST_SHARDS = []
+
+# Посты старше этого числа дней команда archive_posts переносит в архивные
+# таблицы. Архивные посты доступны по прежним ссылкам и в профиле автора,
+# но не попадают в общие ленты.
+
+POST_ARCHIVE_AFTER_DAYS = 365
+
+# Удаление пользователей, групп и постов с большим каскадом выполняется
+# пакетами по DELETION_BATCH_SIZE строк, каждый в своей короткой
+# транзакции. При DELETION_IN_BACKGROUND задачи ставятся в очередь
+# фоновых задач, иначе выполняются сразу в запросе. Невыполненные задачи
+# можно доработать командой run_deletions.
+
+DELETION_BATCH_SIZE = 500
+DELETION_IN_BACKGROUND = True
+
+# Пользователь удаляет пост или комментарий пометкой is_deleted. Строки,
+# помеченные раньше этого числа дней назад, вместе с картинками удаляет
+# команда purge_deleted (её запускает планировщик, например cron).
+
+PURGE_DELETED_AFTER_DAYS = 7
+
+# Уведомления подписчикам о новых постах раздаёт фоновая задача пакетами
+# по NOTIFICATION_BATCH_SIZE. Число непрочитанных хранится в кеше
+# NOTIFICATION_COUNT_TIMEOUT секунд и увеличивается при раздаче; шапка
+# сайта опрашивает его через /notifications/unread/.
+
+NOTIFICATION_BATCH_SIZE = 500
+NOTIFICATION_COUNT_TIMEOUT = 3600
+
+# Частые мелкие записи (лайки, просмотры) копятся в памяти процесса и
+# пишутся в БД одной транзакцией: раз в WRITE_BUFFER_FLUSH_INTERVAL
+# секунд по окончании запроса, при накоплении WRITE_BUFFER_MAX_SIZE
+# ключей и при выходе процесса. 0 — писать сразу.
+
+WRITE_BUFFER_FLUSH_INTERVAL = 5
+WRITE_BUFFER_MAX_SIZE = 500
+
+# Число лайков поста хранится в кеше LIKE_COUNT_TIMEOUT секунд; запись
+# лайков сбрасывает его.
+
+LIKE_COUNT_TIMEOUT = 3600
+
+# Просмотры постов копятся в том же буфере записи. Уникальные зрители
+# считаются приближённо: скетч HyperLogLog на 2**VIEWER_SKETCH_PRECISION
+# байт на пост (10 — 1 КБ, ошибка около 3%). Счётчики просмотров для
+# страницы поста кешируются на VIEW_STATS_TIMEOUT секунд и сбрасываются
+# записью буфера.
+
+VIEWER_SKETCH_PRECISION = 10
+VIEW_STATS_TIMEOUT = 3600
+
+# PRAGMA для каждого нового соединения с SQLite. WAL позволяет читать
+# во время записи, synchronous=NORMAL в режиме WAL безопасен и убирает
+# fsync на каждую транзакцию, busy_timeout ждёт блокировку вместо ошибки
+# «database is locked». cache_size задан в КиБ (отрицательное значение).
+
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
 }
 
+# Повторы пишущих транзакций при блокировке базы (core.db.run_write).
+# Пауза перед n-й попыткой случайна в пределах
+# min(DB_WRITE_MAX_BACKOFF, DB_WRITE_BACKOFF * 2 ** (n - 1)) секунд.
+
+DB_WRITE_ATTEMPTS = 5
+DB_WRITE_BACKOFF = 0.05
+DB_WRITE_MAX_BACKOFF = 1.0
+
+# Очередь фоновых задач (core.jobs) в таблице core_job. Задачи выполняет
+# команда run_worker пулом из JOB_WORKERS потоков или процессов
+# (JOB_WORKER_POOL = 'thread' или 'process'). Исполнитель берёт задачу
+# в аренду на JOB_LEASE_SECONDS; после ошибки задача повторяется через
+# min(JOB_MAX_RETRY_DELAY, JOB_RETRY_DELAY * 2 ** (n - 1)) секунд, после
+# JOB_MAX_ATTEMPTS попыток остаётся в статусе dead. JOB_QUEUE_EAGER
+# выполняет задачи сразу при постановке — для разработки и тестов.
+
+JOB_WORKERS = 2
+JOB_WORKER_POOL = 'thread'
+JOB_POLL_INTERVAL = 1.0
+JOB_LEASE_SECONDS = 300
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_MAX_RETRY_DELAY = 3600
+JOB_QUEUE_EAGER = False
+
 
 # Password validation
 
@@ -118,19 +270,159 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Email Sending
-
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# EMAIL_BACKEND только ставит письма в очередь, отправляет их фоновая
+# задача через EMAIL_DELIVERY_BACKEND: пачками по EMAIL_BATCH_SIZE через
+# одно соединение и не чаще EMAIL_RATE_LIMIT писем в секунду (0 — без
+# ограничения). Письмо с ошибкой повторяется с теми же паузами, что и
+# фоновые задачи, после EMAIL_MAX_ATTEMPTS попыток остаётся в статусе
+# failed. Для проверки с SMTP укажите
+# 'django.core.mail.backends.smtp.EmailBackend' и локальный сервер,
+# например python -m aiosmtpd -n -l localhost:1025 (EMAIL_PORT = 1025).
+
+EMAIL_BACKEND = 'core.backends.mail.QueuedEmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_BATCH_SIZE = 50
+EMAIL_RATE_LIMIT = 10
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_LEASE_SECONDS = 300
 
 # Other variables
 
 NUM_OF_POSTS = 10
 
 
-# Подключение бэкенда кеширования
+# Подключение бэкенда кеширования. default — двухуровневый кеш:
+# LRU в памяти процесса поверх общего для всех процессов кеша shared.
+# В продакшене shared нужно перевести на FileBasedCache, DatabaseCache
+# или memcached, чтобы воркеры WSGI-сервера делили один кеш.
+# Изменения ключей рассылаются процессам через журнал на LOG_SIZE
+# записей; счётчики непрочитанных уведомлений увеличиваются пачками на
+# каждого подписчика, поэтому они живут только в shared (L2_ONLY_PREFIXES)
+# и не вытесняют из журнала остальные ключи.
 
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'OPTIONS': {
+            'L2_CACHE': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            'SYNC_INTERVAL': 0.5,
+            'LOG_SIZE': 1024,
+            'L2_ONLY_PREFIXES': ('posts:notifications:unread:',),
+        },
+    },
+    'shared': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# Кеширование страниц целиком для анонимных пользователей, в секундах.
+# 0 — кеш выключен. Страницы инвалидируются при изменении постов,
+# комментариев, групп и пользователей.
+
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 0
+
+
+# Ленты index, group_list и profile как закешированные списки id постов.
+# FEED_CACHE_TIMEOUT = 0 — ленты читаются запросами к БД напрямую.
+
+FEED_CACHE_TIMEOUT = 0
+FEED_CACHE_SIZE = 1000
+POST_CACHE_TIMEOUT = 300
+
+# Id самых новых постов лент index и group_list для опроса «есть ли
+# новые посты» (/new/?since=<id>). Списки пополняются при создании
+# постов и работают независимо от FEED_CACHE_TIMEOUT.
+
+LATEST_POSTS_SIZE = 50
+LATEST_POSTS_TIMEOUT = 3600
+
+# Долгий опрос комментариев (/posts/<id>/comments/?after=<id>): запрос
+# ждёт новые комментарии не дольше COMMENT_POLL_TIMEOUT секунд, проверяя
+# версию комментариев поста в кеше раз в COMMENT_POLL_INTERVAL секунд.
+# Каждый ожидающий клиент занимает поток воркера, поэтому число потоков
+# должно покрывать число открытых обсуждений (см. comments_load_test).
+
+COMMENT_POLL_TIMEOUT = 25
+COMMENT_POLL_INTERVAL = 0.25
+
+# Соответствие username → pk и slug группы → pk в общем кеше.
+
+USERNAME_CACHE_TIMEOUT = 3600
+GROUP_SLUG_CACHE_TIMEOUT = 3600
+
+
+# HTTP-кеширование страниц браузерами и прокси: политика по имени URL.
+# Анонимы получают public с указанными параметрами, авторизованные
+# пользователи — private, no-cache. Страницы из SHARED_PAGE_VIEWS не
+# зависят от пользователя: всё личное (кнопки автора, лайк, форма
+# комментария, меню пользователя) подгружается отдельным запросом,
+# поэтому они отдаются public и кешируются одной копией для всех.
+
+CACHE_CONTROL_POLICIES = {
+    'posts:index_new_posts': {
+        'max_age': 5,
+    },
+    'posts:group_new_posts': {
+        'max_age': 5,
+    },
+    'posts:index': {
+        'max_age': 20,
+        'stale_while_revalidate': 60,
+        'stale_if_error': 86400,
+    },
+    'posts:group_list': {
+        'max_age': 60,
+        'stale_while_revalidate': 300,
+        'stale_if_error': 86400,
+    },
+    'posts:profile': {
+        'max_age': 60,
+        'stale_while_revalidate': 300,
+        'stale_if_error': 86400,
+    },
+    'posts:post_detail': {
+        'max_age': 60,
+        'stale_while_revalidate': 600,
+        'stale_if_error': 86400,
+    },
+    'posts:group_month': {
+        'max_age': 300,
+        'stale_while_revalidate': 3600,
+        'stale_if_error': 86400,
+    },
+    'posts:profile_month': {
+        'max_age': 300,
+        'stale_while_revalidate': 3600,
+        'stale_if_error': 86400,
+    },
 }
+SHARED_PAGE_VIEWS = (
+    'posts:post_detail',
+)
+
+
+# Профилирование медленных запросов
+
+PROFILER_ENABLED = False
+PROFILER_SAMPLE_RATE = 0.05
+PROFILER_SLOW_MS = 500
+PROFILER_NAMESPACES = ('posts', 'users')
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILER_MAX_FILES = 200
+
+
+# Метрики в формате Prometheus. При запуске под несколькими процессами
+# WSGI-сервера задайте METRICS_DIR: общий каталог, через который
+# процессы обмениваются накопленными значениями. Файлы завершившихся
+# процессов сворачиваются в retired.json при сборе метрик.
+
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')